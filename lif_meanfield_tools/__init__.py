@@ -1,9 +1,12 @@
 import pint as _pint
 ureg = _pint.UnitRegistry()
 
+__version__ = '0.2'
+
 from . import (input_output,
                meanfield_calcs,
-               aux_calcs)
+               aux_calcs,
+               fast,
+               cache)
 from .network import Network
-
-__version__ = '0.2'
+from .sweeps import sweep
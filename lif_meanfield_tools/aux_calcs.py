@@ -1,6 +1,10 @@
 """
 This module contains lots of auxiliary calculations. It is sometimes called by meanfield_calcs.
 
+Classes:
+SiegertTable
+PsiEvaluator
+
 Functions:
 nu0_fb433
 nu_0
@@ -10,6 +14,10 @@ Phi
 Phi_prime_mu
 d_nu_d_mu_fb433
 d_nu_d_mu
+Phi_prime_sigma
+d_nu_d_sigma_fb433
+d_nu_d_sigma
+pcfu
 Psi
 d_Psi
 d_2_Psi
@@ -17,6 +25,14 @@ Psi_x_r
 dPsi_x_r
 d2Psi_x_r
 d_nu_d_nu_fb
+nu_0_vec
+nu0_fb433_vec
+nu0_fb_vec
+d_nu_d_mu_vec
+d_nu_d_mu_fb433_vec
+d_nu_d_sigma_vec
+d_nu_d_sigma_fb433_vec
+d_nu_d_nu_in_fb_vec
 determinant
 determinant_same_rows
 p_hat_boxcar
@@ -24,8 +40,11 @@ solve_chareq_rate_boxcar
 """
 
 from __future__ import print_function
+import os
+import warnings
+from collections import OrderedDict
 from scipy.integrate import quad
-from scipy.special import erf, zetac, lambertw
+from scipy.special import erf, erfcx, dawsn, zetac, lambertw
 import scipy
 import numpy as np
 import math
@@ -262,15 +281,15 @@ def Phi(s):
     Reduction of colored noise in excitable systems to white
     noise and dynamic boundary conditions. 1–23 (2014).
     """
-    return np.sqrt(np.pi / 2.) * (np.exp(s**2 / 2.) * (1 + erf(s / np.sqrt(2))))
+    # erfcx(-x) = exp(x**2) * (1 + erf(x)), but stays finite for x << 0
+    return np.sqrt(np.pi / 2.) * erfcx(-s / np.sqrt(2))
 
 
 def Phi_prime_mu(s, sigma):
     """
     Derivative of the helper function Phi(s) with respect to the mean input
     """
-    return -np.sqrt(np.pi) / sigma * (s * np.exp(s**2 / 2.)
-    * (1 + erf(s / np.sqrt(2)))
+    return -np.sqrt(np.pi) / sigma * (s * erfcx(-s / np.sqrt(2))
     + np.sqrt(2) / np.sqrt(np.pi))
 
 
@@ -352,11 +371,278 @@ def d_nu_d_mu(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
             * (np.exp(y_th**2) * (1 + erf(y_th)) - np.exp(y_r**2)
                * (1 + erf(y_r))))
 
+
+def Phi_prime_sigma(s, sigma):
+    """
+    Derivative of the helper function Phi(s) with respect to the standard
+    deviation of the input
+    """
+    return s / np.sqrt(2) * Phi_prime_mu(s, sigma)
+
+
+def d_nu_d_sigma_fb433(tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Derivative of the stationary firing rates with synaptic filtering
+    with respect to the standard deviation of the input
+
+    Counterpart of d_nu_d_mu_fb433, obtained by differentiating Eq. 433 in
+    Fourcaud & Brunel (2002) with respect to sigma.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_s: float
+        Synaptic time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    mu: float
+        Mean neuron activity in mV.
+    sigma:
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    float:
+        Something in Hz/mV.
+    """
+    alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
+    x_th = np.sqrt(2) * (V_th_rel - mu) / sigma
+    x_r = np.sqrt(2) * (V_0_rel - mu) / sigma
+    dnudsigma = d_nu_d_sigma(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    # same branch as in nu0_fb433, preventing overflow in Phi(s)
+    if x_th > 20.0 / np.sqrt(2.):
+        return dnudsigma
+    r = nu_0(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    prefactor = np.sqrt(tau_s / tau_m) * alpha / (tau_m * np.sqrt(2))
+    dPhi_prime = Phi_prime_sigma(x_th, sigma) - Phi_prime_sigma(x_r, sigma)
+    dPhi = Phi(x_th) - Phi(x_r)
+    return (dnudsigma * (1 - 2 * prefactor * dPhi * r * tau_m**2)
+            - prefactor * dPhi_prime * (r * tau_m)**2)
+
+
+def d_nu_d_sigma(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Derivative of the stationary firing rate without synaptic filtering
+    with respect to the standard deviation of the input
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    mu: float
+        Mean neuron activity in mV.
+    sigma:
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    float:
+        Something in Hz/mV.
+    """
+    y_th = (V_th_rel - mu)/sigma
+    y_r = (V_0_rel - mu)/sigma
+    nu0 = nu_0(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    # erfcx(-y) = exp(y**2) * (1 + erf(y)), but stays accurate for y << 0
+    return (np.sqrt(np.pi) * tau_m * nu0**2 / sigma
+            * (y_th * erfcx(-y_th) - y_r * erfcx(-y_r)))
+
+
+# start points of the backward integration of U(a, x) as used by
+# _pcfu_start, and number of terms of the asymptotic expansion
+_PCFU_START_POINTS = np.array([6., 8., 10., 12., 15., 20., 25., 30., 40., 50.,
+                               70., 100., 150., 200.])
+_PCFU_ASYMPTOTIC_TERMS = 60
+
+
+def _pcfu_asymptotic(a, x):
+    """
+    Asymptotic expansion of U(a, x) and its derivative for large x > 0.
+
+    (Eq.: 12.9.1 in http://dlmf.nist.gov/12.9, differentiated termwise)
+
+    Returns the real logarithm of a common scale factor and the scaled values
+    of U and dU/dx.
+    """
+    s = np.arange(_PCFU_ASYMPTOTIC_TERMS)[:, np.newaxis]
+    ratios = -(0.5 + a + 2 * s) * (1.5 + a + 2 * s) / ((s + 1) * 2 * x**2)
+    terms = np.concatenate([np.ones((1, len(a)), dtype=complex),
+                            np.cumprod(ratios[:-1], axis=0)])
+    series = terms.sum(axis=0)
+    d_series = (terms * (-2 * s / x)).sum(axis=0)
+    log_prefactor = -x**2 / 4 - (a + 0.5) * np.log(x)
+    phase = np.exp(1j * log_prefactor.imag)
+    U = phase * series
+    dU = phase * (series * (-x / 2 - (a + 0.5) / x) + d_series)
+    return log_prefactor.real, U, dU
+
+
+def _pcfu_start(a):
+    """
+    Smallest start point at which the asymptotic expansion of U(a, x) is
+    accurate to double precision, or nan if there is none.
+    """
+    s = np.arange(_PCFU_ASYMPTOTIC_TERMS)[:, np.newaxis, np.newaxis]
+    x = _PCFU_START_POINTS[:, np.newaxis]
+    ratios = np.abs((0.5 + a + 2 * s) * (1.5 + a + 2 * s)
+                    / ((s + 1) * 2 * x**2))
+    accurate = np.min(np.cumsum(np.log(ratios), axis=0), axis=0) < -40
+    return np.where(np.any(accurate, axis=0),
+                    _PCFU_START_POINTS[np.argmax(accurate, axis=0)], np.nan)
+
+
+def _pcfu_mpmath(a, x):
+    """
+    U(a, x) and dU/dx from mpmath.pcfu, scaled like _pcfu_log_scaled.
+
+    (dU/dx from Eq.: 12.8.3 in http://dlmf.nist.gov/12.8)
+    """
+    U = mpmath.pcfu(a, x)
+    dU = x / 2 * U - mpmath.pcfu(a - 1, x)
+    scale = abs(U) + abs(dU)
+    return float(mpmath.log(scale)), complex(U / scale), complex(dU / scale)
+
+
+def _pcfu_log_scaled(a, x, order=40, max_step=2.):
+    """
+    Vectorized parabolic cylinder function U(a, x) for complex a and real x.
+
+    U(a, x) is recessive for x -> infinity and grows for decreasing x. It is
+    therefore evaluated by the asymptotic expansion at a sufficiently large
+    start point and integrated backwards to x, which is numerically stable,
+    using Taylor steps of the defining differential equation
+    U'' = (x**2 / 4 + a) U (Eq.: 12.2.2 in http://dlmf.nist.gov/12.2). The
+    solution is renormalized after each step to avoid over- and underflow.
+
+    The asymptotic expansion needs start points x**2 well above |a|, of which
+    the largest one used is 200. For |a| up to about 1000 the relative error
+    compared to mpmath.pcfu is about 1e-13 for |Im a| <= 100 and below 1e-10
+    for |Im a| <= 1000 (tested for -0.5 <= Re a <= 1.5 and |x| <= 20, which
+    covers Psi in the transfer function for frequencies up to
+    1000 / (2 pi tau_m)). Elements of larger |a| are evaluated by
+    mpmath.pcfu, which is accurate but slow.
+
+    Parameters:
+    -----------
+    a: complex or np.ndarray
+        First parameter of U.
+    x: float or np.ndarray
+        Second parameter of U.
+    order: int
+        Order of the Taylor steps.
+    max_step: float
+        Step size times square root of the local frequency of U.
+
+    Returns:
+    --------
+    tuple of np.ndarray:
+        Real logarithm of scale factor, scaled U(a, x) and scaled dU/dx, such
+        that U(a, x) = exp(log_scale) * U.
+    """
+    a, x = np.broadcast_arrays(np.asarray(a, dtype=complex),
+                               np.asarray(x, dtype=float))
+    shape = a.shape
+    a = a.ravel()
+    x = x.ravel()
+
+    start = _pcfu_start(a)
+    exact = np.isnan(start)
+    log_scale = np.empty(a.shape)
+    U = np.empty(a.shape, dtype=complex)
+    dU = np.empty(a.shape, dtype=complex)
+    for i in np.flatnonzero(exact):
+        log_scale[i], U[i], dU[i] = _pcfu_mpmath(a[i], x[i])
+    if not np.all(exact):
+        fast = ~exact
+        log_scale[fast], U[fast], dU[fast] = _pcfu_integrate(
+            a[fast], x[fast], start[fast], order, max_step)
+
+    return (log_scale.reshape(shape), U.reshape(shape), dU.reshape(shape))
+
+
+def _pcfu_integrate(a, x, start, order, max_step):
+    """
+    Integrate U(a, x) backwards from the asymptotic expansion at start to x,
+    see _pcfu_log_scaled.
+    """
+    pos = np.maximum(start, x)
+    log_scale, U, dU = _pcfu_asymptotic(a, pos)
+    while True:
+        remaining = x - pos
+        active = remaining < 0
+        if not np.any(active):
+            break
+        q = pos**2 / 4 + a
+        h = np.where(active,
+                     np.maximum(remaining, -max_step / np.sqrt(np.abs(q) + 1)),
+                     0.)
+        # Taylor coefficients c_k h**k of U around pos from the recurrence
+        # (k + 2)(k + 1) c_{k+2} = q c_k + pos / 2 c_{k-1} + 1 / 4 c_{k-2}
+        A = h**2 * q
+        B = h**3 * pos / 2
+        C = h**4 / 4
+        coeffs = [U, h * dU, A * U / 2]
+        new_U = coeffs[0] + coeffs[1] + coeffs[2]
+        new_dU_h = coeffs[1] + 2 * coeffs[2]
+        for k in range(1, order - 2):
+            c = (A * coeffs[k] + B * coeffs[k - 1]
+                 + (C * coeffs[k - 2] if k >= 2 else 0.)) / ((k + 2) * (k + 1))
+            coeffs.append(c)
+            new_U = new_U + c
+            new_dU_h = new_dU_h + (k + 2) * c
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dU = np.where(active, new_dU_h / h, dU)
+        # finished elements are left untouched, such that results do not
+        # depend on which other elements are evaluated in the same batch
+        scale = np.where(active, np.abs(new_U) + np.abs(dU), 1.)
+        U = new_U / scale
+        dU = dU / scale
+        log_scale = log_scale + np.log(scale)
+        pos = pos + h
+
+    return log_scale, U, dU
+
+
+def pcfu(a, x):
+    """
+    Parabolic cylinder function U(a, x) for complex a and real x.
+
+    Vectorized double precision replacement of mpmath.pcfu, see
+    _pcfu_log_scaled for the accuracy and the supported range of a.
+
+    Parameters:
+    -----------
+    a: complex or np.ndarray
+        First parameter.
+    x: float or np.ndarray
+        Argument.
+
+    Returns:
+    --------
+    complex or np.ndarray
+    """
+    log_scale, U, _ = _pcfu_log_scaled(a, x)
+    return (np.exp(log_scale) * U)[()]
+
+
 def Psi(z, x):
     """
-    Calcs Psi(z,x)=exp(x**2/4)*U(z,x), with U(z,x) the parabolic cylinder func.
+    Calcs Psi(z,x)=exp(x**2/4)*U(z,-x), with U(z,x) the parabolic cylinder func.
+
+    Vectorized in z and x.
     """
-    return np.exp(0.25*x**2) * complex(mpmath.pcfu(z, -x))
+    log_scale, U, _ = _pcfu_log_scaled(z, -np.asarray(x))
+    return (np.exp(0.25 * np.asarray(x)**2 + log_scale) * U)[()]
 
 
 def d_Psi(z, x):
@@ -379,17 +665,116 @@ def d_2_Psi(z, x):
 
 def Psi_x_r(z, x, y):
     """Difference of Psi for same first argument z."""
-    return Psi(z, x) - Psi(z, y)
+    z, x, y = np.broadcast_arrays(z, x, y)
+    psi = Psi(z, np.stack([x, y]))
+    return psi[0] - psi[1]
 
 
 def dPsi_x_r(z, x, y):
     """Difference of derivatives of Psi for same first argument z."""
-    return d_Psi(z, x) - d_Psi(z, y)
+    z, x, y = np.broadcast_arrays(z, x, y)
+    d_psi = d_Psi(z, np.stack([x, y]))
+    return d_psi[0] - d_psi[1]
 
 
 def d2Psi_x_r(z, x, y):
     """Difference of second derivatives of Psi for same first argument z."""
-    return d_2_Psi(z, x) - d_2_Psi(z, y)
+    z, x, y = np.broadcast_arrays(z, x, y)
+    d_2_psi = d_2_Psi(z, np.stack([x, y]))
+    return d_2_psi[0] - d_2_psi[1]
+
+
+class PsiEvaluator(object):
+    """
+    Evaluates the family Psi(z + n, x) for n = 0, ..., order and x in
+    (x_t, x_r) in one batch and serves Psi and its derivatives from it.
+
+    The derivatives follow the recurrences of d_Psi and d_2_Psi, so that
+    order=1 suffices for dPsi_x_r and order=2 for d2Psi_x_r. Single values
+    Psi(z, x) are kept in a bounded LRU cache shared by all instances, such
+    that repeated queries, e.g. of the same frequency in
+    sensitivity_measure, are not recomputed.
+
+    Parameters:
+    -----------
+    z: complex or np.ndarray
+        First argument of Psi.
+    x_t: float or np.ndarray
+        Second argument of Psi at threshold.
+    x_r: float or np.ndarray
+        Second argument of Psi at reset.
+    order: int
+        Largest shift n of the first argument.
+    """
+
+    cache_size = 2**16
+    _cache = OrderedDict()
+
+    def __init__(self, z, x_t, x_r, order=2):
+        z, x_t, x_r = np.broadcast_arrays(np.asarray(z, dtype=complex),
+                                          np.asarray(x_t, dtype=float),
+                                          np.asarray(x_r, dtype=float))
+        self.z = z
+        self.order = order
+        shifts = np.arange(order + 1).reshape((-1, 1) + (1,) * z.ndim)
+        # axes: shift n, boundary (threshold, reset), shape of z
+        self._family = self._evaluate(z + shifts, np.stack([x_t, x_r]))
+
+    @classmethod
+    def _evaluate(cls, z, x):
+        """ Psi(z, x) on arrays, using cached values where available. """
+        z, x = np.broadcast_arrays(z, x)
+        values = np.empty(z.size, dtype=complex)
+        missing = []
+        keys = list(zip(z.ravel().tolist(), x.ravel().tolist()))
+        for i, key in enumerate(keys):
+            try:
+                values[i] = cls._cache[key]
+                cls._cache.move_to_end(key)
+            except KeyError:
+                missing.append(i)
+        if missing:
+            values[missing] = Psi(z.ravel()[missing], x.ravel()[missing])
+            for i in missing:
+                cls._cache[keys[i]] = values[i]
+            while len(cls._cache) > cls.cache_size:
+                cls._cache.popitem(last=False)
+        return values.reshape(z.shape)
+
+    @classmethod
+    def clear_cache(cls):
+        """ Remove all cached values. """
+        cls._cache.clear()
+
+    def Psi(self, n=0):
+        """ Psi(z + n, x) at threshold and reset, stacked along first axis. """
+        if n > self.order:
+            raise ValueError('PsiEvaluator of order {} cannot provide '
+                             'Psi(z + {}, x).'.format(self.order, n))
+        return self._family[n]
+
+    def d_Psi(self):
+        """ First derivative of Psi at threshold and reset. """
+        return (1. / 2. + self.z) * self.Psi(1)
+
+    def d_2_Psi(self):
+        """ Second derivative of Psi at threshold and reset. """
+        return (1. / 2. + self.z) * (3. / 2. + self.z) * self.Psi(2)
+
+    def Psi_x_r(self):
+        """ Difference of Psi at threshold and reset. """
+        psi = self.Psi()
+        return (psi[0] - psi[1])[()]
+
+    def dPsi_x_r(self):
+        """ Difference of first derivatives of Psi at threshold and reset. """
+        d_psi = self.d_Psi()
+        return (d_psi[0] - d_psi[1])[()]
+
+    def d2Psi_x_r(self):
+        """ Difference of second derivatives of Psi at threshold and reset. """
+        d_2_psi = self.d_2_Psi()
+        return (d_2_psi[0] - d_2_psi[1])[()]
 
 
 def d_nu_d_nu_in_fb(tau_m, tau_s, tau_r, V_th, V_r, j, mu, sigma):
@@ -445,6 +830,576 @@ def d_nu_d_nu_in_fb(tau_m, tau_s, tau_r, V_th, V_r, j, mu, sigma):
 
     return lin + sqr, lin, sqr
 
+# nodes and weights of the fixed-node Gauss-Legendre quadrature used by the
+# vectorized Siegert formula
+_GL_NODES, _GL_WEIGHTS = np.polynomial.legendre.leggauss(40)
+
+
+def _erfcx_integral(x):
+    """
+    Integral of erfcx(t) from 0 to x >= 0, elementwise for arrays.
+
+    Uses fixed-node Gauss-Legendre quadrature in s = log(1 + t), in which the
+    integrand erfcx(t) * (1 + t) is smooth and bounded for all t >= 0.
+    """
+    x = np.asarray(x, dtype=float)[..., np.newaxis]
+    s_max = np.log1p(x)
+    t = np.expm1(s_max * (_GL_NODES + 1) / 2.)
+    integral = np.sum(_GL_WEIGHTS * erfcx(t) * (1 + t), axis=-1)
+    return integral * s_max[..., 0] / 2.
+
+
+def _siegert_antiderivative(y):
+    """
+    Antiderivative of exp(y**2) * (1 + erf(y)), vanishing at y = 0.
+
+    For y < 0 this is -int_0^-y erfcx(t) dt. For y > 0 it is rewritten as
+    2 * int_0^y exp(t**2) dt - int_0^y erfcx(t) dt, where the first integral is
+    given in closed form by the Dawson function. Arguments are clipped at 20,
+    where the Siegert formula predicts vanishing rates.
+    """
+    y = np.asarray(y, dtype=float)
+    y_pos = np.clip(y, 0, 20)
+    y_neg = np.clip(-y, 0, None)
+    return np.where(y >= 0,
+                    2 * np.exp(y_pos**2) * dawsn(y_pos) - _erfcx_integral(y_pos),
+                    -_erfcx_integral(y_neg))
+
+
+def nu_0_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Vectorized version of nu_0.
+
+    Calculates stationary firing rates for delta shaped PSCs for arrays of mu
+    and sigma in one call. The Siegert integral is evaluated in closed form
+    using the Dawson function and a fixed-node quadrature of erfcx, instead of
+    one adaptive quadrature per element.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float or np.ndarray
+        Relative threshold potential in mV.
+    V_0_rel: float or np.ndarray
+        Relative reset potential in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Stationary firing rates in Hz.
+    """
+    y_th = np.asarray((V_th_rel - mu) / sigma, dtype=float)
+    y_r = np.asarray((V_0_rel - mu) / sigma, dtype=float)
+    integral = _siegert_antiderivative(y_th) - _siegert_antiderivative(y_r)
+    # check preventing overflow, as in siegert1
+    return np.where(y_th >= 20, 0.,
+                    1.0 / (tau_r + np.sqrt(np.pi) * integral * tau_m))
+
+
+def nu0_fb433_vec(tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Vectorized version of nu0_fb433.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_s: float
+        Synaptic time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Stationary firing rates in Hz.
+    """
+    r = nu_0_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    return _apply_fb433_correction(tau_m, tau_s, V_th_rel, V_0_rel, mu, sigma,
+                                   r)
+
+
+def _apply_fb433_correction(tau_m, tau_s, V_th_rel, V_0_rel, mu, sigma, r):
+    """
+    Correct white noise rates r for synaptic filtering as in nu0_fb433.
+    """
+    alpha = np.sqrt(2.) * abs(zetac(0.5) + 1)
+    x_th = np.sqrt(2.) * (V_th_rel - mu) / sigma
+    x_r = np.sqrt(2.) * (V_0_rel - mu) / sigma
+    # preventing overflow in np.exponent in Phi(s)
+    with np.errstate(over='ignore', invalid='ignore'):
+        dPhi = Phi(x_th) - Phi(x_r)
+        correction = (np.sqrt(tau_s / tau_m) * alpha / (tau_m * np.sqrt(2))
+                      * dPhi * (r * tau_m)**2)
+    return np.where(x_th > 20.0 / np.sqrt(2.), r, r - correction)
+
+
+def nu0_fb_vec(tau_m, tau_s, tau_r, V_th, V_r, mu, sigma):
+    """
+    Vectorized version of nu0_fb.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_s: float
+        Synaptic time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Stationary firing rates in Hz.
+    """
+    alpha = np.sqrt(2)*abs(zetac(0.5)+1)
+    # effective threshold
+    V_th1 = V_th + sigma*alpha/2.*np.sqrt(tau_s/tau_m)
+    # effective reset
+    V_r1 = V_r + sigma*alpha/2.*np.sqrt(tau_s/tau_m)
+    # use standard Siegert with modified threshold and reset
+    return nu_0_vec(tau_m, tau_r, V_th1, V_r1, mu, sigma)
+
+
+def d_nu_d_mu_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Vectorized version of d_nu_d_mu.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Something in Hz/mV.
+    """
+    y_th = (V_th_rel - mu)/sigma
+    y_r = (V_0_rel - mu)/sigma
+    nu0 = nu_0_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    # vanishing rates would multiply 0 with the overflowing erfcx
+    with np.errstate(over='ignore', invalid='ignore'):
+        result = (np.sqrt(np.pi) * tau_m * nu0**2 / sigma
+                  * (erfcx(-y_th) - erfcx(-y_r)))
+    return np.where(nu0 > 0, result, 0.)
+
+
+def d_nu_d_mu_fb433_vec(tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Vectorized version of d_nu_d_mu_fb433.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_s: float
+        Synaptic time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Something in Hz/mV.
+    """
+    alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
+    x_th = np.sqrt(2) * (V_th_rel - mu) / sigma
+    x_r = np.sqrt(2) * (V_0_rel - mu) / sigma
+    nu0 = nu_0_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    prefactor = np.sqrt(tau_s / tau_m) * alpha / (tau_m * np.sqrt(2))
+    dnudmu = d_nu_d_mu_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    with np.errstate(over='ignore', invalid='ignore'):
+        dPhi_prime = Phi_prime_mu(x_th, sigma) - Phi_prime_mu(x_r, sigma)
+        dPhi = Phi(x_th) - Phi(x_r)
+        # phi / integral**3 of d_nu_d_mu_fb433 with integral = 1 / (nu0 * tau_m)
+        phi = (dPhi_prime * nu0 * tau_m * nu0 * tau_m
+               + (2 * np.sqrt(2) / sigma) * (dPhi * nu0 * tau_m)**2 * nu0 * tau_m)
+        result = dnudmu - prefactor * phi
+    return np.where(nu0 > 0, result, 0.)
+
+
+def d_nu_d_sigma_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Vectorized version of d_nu_d_sigma.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Something in Hz/mV.
+    """
+    y_th = (V_th_rel - mu)/sigma
+    y_r = (V_0_rel - mu)/sigma
+    nu0 = nu_0_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    # vanishing rates would multiply 0 with the overflowing erfcx
+    with np.errstate(over='ignore', invalid='ignore'):
+        result = (np.sqrt(np.pi) * tau_m * nu0**2 / sigma
+                  * (y_th * erfcx(-y_th) - y_r * erfcx(-y_r)))
+    return np.where(nu0 > 0, result, 0.)
+
+
+def d_nu_d_sigma_fb433_vec(tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu, sigma):
+    """
+    Vectorized version of d_nu_d_sigma_fb433.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_s: float
+        Synaptic time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Something in Hz/mV.
+    """
+    alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
+    x_th = np.sqrt(2) * (V_th_rel - mu) / sigma
+    x_r = np.sqrt(2) * (V_0_rel - mu) / sigma
+    dnudsigma = d_nu_d_sigma_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    r = nu_0_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+    prefactor = np.sqrt(tau_s / tau_m) * alpha / (tau_m * np.sqrt(2))
+    # same branch as in nu0_fb433, preventing overflow in Phi(s)
+    with np.errstate(over='ignore', invalid='ignore'):
+        dPhi_prime = Phi_prime_sigma(x_th, sigma) - Phi_prime_sigma(x_r, sigma)
+        dPhi = Phi(x_th) - Phi(x_r)
+        result = (dnudsigma * (1 - 2 * prefactor * dPhi * r * tau_m**2)
+                  - prefactor * dPhi_prime * (r * tau_m)**2)
+    return np.where((x_th > 20.0 / np.sqrt(2.)) | (r == 0), dnudsigma, result)
+
+
+def d_nu_d_nu_in_fb_vec(tau_m, tau_s, tau_r, V_th, V_r, j, mu, sigma):
+    """
+    Vectorized version of d_nu_d_nu_in_fb.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in seconds.
+    tau_s: float
+        Synaptic time constant in seconds.
+    tau_r: float
+        Refractory time in seconds.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    j: float or np.ndarray
+        Effective connectivity weight in mV.
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+
+    Returns:
+    --------
+    np.ndarray:
+        Derivative in Hz/mV (sum of linear (mu) and squared (sigma^2) contribution).
+    np.ndarray:
+        Derivative in Hz/mV (linear (mu) contribution).
+    np.ndarray:
+        Derivative in Hz/mV (squared (sigma^2) contribution).
+    """
+    alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
+
+    y_th = (V_th - mu) / sigma
+    y_r = (V_r - mu) / sigma
+
+    y_th_fb = y_th + alpha / 2. * np.sqrt(tau_s / tau_m)
+    y_r_fb = y_r + alpha / 2. * np.sqrt(tau_s / tau_m)
+
+    nu0 = nu0_fb_vec(tau_m, tau_s, tau_r, V_th, V_r, mu, sigma)
+
+    with np.errstate(over='ignore', invalid='ignore'):
+        # linear contribution
+        lin = np.sqrt(np.pi) * (tau_m * nu0)**2 * j / sigma * (
+            erfcx(-y_th_fb) - erfcx(-y_r_fb))
+
+        # quadratic contribution
+        sqr = np.sqrt(np.pi) * (tau_m * nu0)**2 * j / sigma * (
+            erfcx(-y_th_fb) * 0.5 * y_th * j / sigma
+            - erfcx(-y_r_fb) * 0.5 * y_r * j / sigma)
+
+    # vanishing rates would multiply 0 with the overflowing erfcx
+    lin = np.where(nu0 > 0, lin, 0.)
+    sqr = np.where(nu0 > 0, sqr, 0.)
+    return lin + sqr, lin, sqr
+
+
+class SiegertTable(object):
+    """
+    Precomputed, error-bounded lookup table for the Siegert formula.
+
+    The Siegert integral int_{y_r}^{y_th} exp(y**2) * (1 + erf(y)) dy depends
+    on threshold and reset only via the difference H(y_th) - H(y_r) of its
+    antiderivative H. The table therefore stores H (scaled by
+    exp(-max(y, 0)**2)) and its exact derivative on an adaptively refined
+    grid and evaluates it by cubic Hermite spline interpolation. The grid is
+    refined until the relative interpolation error of H, checked at the
+    midpoint and quarter points of each interval, is below rtol /
+    max_amplification. Lookups whose cancellation in H(y_th) - H(y_r) would
+    amplify this error by more than max_amplification, points outside the
+    table, and y_th >= 20 are computed by the exact nu_0_vec instead, such
+    that the relative error of the returned rates is bounded by rtol.
+
+    The table is stored as a .npy file, which is memory-mapped when loaded.
+
+    Parameters:
+    -----------
+    file_name: str
+        Optional path to a .npy file. If the file exists, the table is loaded
+        from it, otherwise the table is computed and saved there. A stored
+        table built with a looser rtol than requested is rebuilt and
+        overwritten.
+    rtol: float
+        Guaranteed relative error of the interpolated rates.
+    y_min: float
+        Smallest tabulated (V - mu) / sigma.
+    y_max: float
+        Largest tabulated (V - mu) / sigma.
+    max_amplification: float
+        Largest admitted error amplification due to cancellation.
+    """
+
+    def __init__(self, file_name='', rtol=1e-8, y_min=-100., y_max=20.,
+                 max_amplification=10.):
+        loaded = False
+        if file_name and os.path.exists(file_name):
+            self._load(file_name)
+            loaded = self.rtol <= rtol
+            if not loaded:
+                warnings.warn('SiegertTable {} was built with rtol={}, '
+                              'rebuilding it with rtol={}.'.format(
+                                  file_name, self.rtol, rtol))
+                # release memory map before overwriting the file
+                del self.nodes, self.values, self.derivatives
+        if not loaded:
+            self.rtol = rtol
+            self.max_amplification = max_amplification
+            self.nodes, self.values, self.derivatives = \
+                self._build(y_min, y_max, rtol / max_amplification)
+            if file_name:
+                self.save(file_name)
+        self.y_min = self.nodes[0]
+        self.y_max = self.nodes[-1]
+
+    @staticmethod
+    def _scaled_antiderivative(y):
+        """ Returns H(y) * exp(-max(y, 0)**2) and its derivative. """
+        y = np.asarray(y, dtype=float)
+        y_pos = np.clip(y, 0, None)
+        g = _siegert_antiderivative(y) * np.exp(-y_pos**2)
+        # erfcx(-y) * exp(-y**2) = 1 + erf(y)
+        dg = np.where(y > 0, 1 + erf(y_pos) - 2 * y_pos * g, erfcx(-y))
+        return g, dg
+
+    @staticmethod
+    def _interpolate(y, nodes, values, derivatives):
+        """ Cubic Hermite interpolation of tabulated values. """
+        i = np.clip(np.searchsorted(nodes, y, side='right') - 1, 0,
+                    len(nodes) - 2)
+        h = nodes[i + 1] - nodes[i]
+        t = (y - nodes[i]) / h
+        return ((2 * t**3 - 3 * t**2 + 1) * values[i]
+                + (t**3 - 2 * t**2 + t) * h * derivatives[i]
+                + (-2 * t**3 + 3 * t**2) * values[i + 1]
+                + (t**3 - t**2) * h * derivatives[i + 1])
+
+    def _build(self, y_min, y_max, tol):
+        """ Refine grid until interpolation error is below tol. """
+        # node at zero, because the scaling is not smooth there
+        nodes = np.union1d(np.linspace(y_min, 0, int(-y_min) + 1),
+                           np.linspace(0, y_max, 4 * int(y_max) + 1))
+        while True:
+            values, derivatives = self._scaled_antiderivative(nodes)
+            h = np.diff(nodes)
+            test = (nodes[:-1, np.newaxis]
+                    + h[:, np.newaxis] * np.array([0.25, 0.5, 0.75]))
+            exact = self._scaled_antiderivative(test)[0]
+            approx = self._interpolate(test, nodes, values, derivatives)
+            err = np.max(np.abs(approx - exact) / np.abs(exact), axis=1)
+            refine = err > tol
+            if not np.any(refine):
+                return nodes, values, derivatives
+            nodes = np.union1d(nodes, nodes[:-1][refine] + h[refine] / 2)
+
+    def _load(self, file_name):
+        """ Memory-map table from .npy file. """
+        data = np.load(file_name, mmap_mode='r')
+        # first column holds rtol and max_amplification
+        self.rtol, self.max_amplification = float(data[0, 0]), float(data[1, 0])
+        self.nodes, self.values, self.derivatives = data[:, 1:]
+
+    def save(self, file_name):
+        """ Save table to .npy file. """
+        header = np.array([[self.rtol], [self.max_amplification], [0.]])
+        np.save(file_name, np.hstack([header, np.array([self.nodes,
+                                                        self.values,
+                                                        self.derivatives])]))
+
+    def siegert_integral(self, y_th, y_r):
+        """
+        Interpolated sqrt(pi) * int_{y_r}^{y_th} exp(y**2) * (1 + erf(y)) dy.
+
+        Returns:
+        --------
+        np.ndarray:
+            Interpolated integral.
+        np.ndarray:
+            Boolean mask, False where the interpolation is not guaranteed to
+            meet rtol and the exact formula has to be used instead.
+        """
+        y_th = np.asarray(y_th, dtype=float)
+        y_r = np.asarray(y_r, dtype=float)
+        valid = ((y_r >= self.y_min) & (y_th <= self.y_max) & (y_th < 20)
+                 & (y_r <= y_th))
+        y_th_c = np.clip(y_th, self.y_min, self.y_max)
+        y_r_c = np.clip(y_r, self.y_min, self.y_max)
+        H_th = (self._interpolate(y_th_c, self.nodes, self.values,
+                                  self.derivatives)
+                * np.exp(np.clip(y_th_c, 0, None)**2))
+        H_r = (self._interpolate(y_r_c, self.nodes, self.values,
+                                 self.derivatives)
+               * np.exp(np.clip(y_r_c, 0, None)**2))
+        integral = H_th - H_r
+        with np.errstate(divide='ignore', invalid='ignore'):
+            amplification = (np.abs(H_th) + np.abs(H_r)) / np.abs(integral)
+        valid &= amplification <= self.max_amplification
+        return np.sqrt(np.pi) * integral, valid
+
+    def nu_0(self, tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma):
+        """
+        Tabulated version of nu_0.
+
+        Parameters:
+        -----------
+        tau_m: float
+            Membrane time constant in seconds.
+        tau_r: float
+            Refractory time in seconds.
+        V_th_rel: float or np.ndarray
+            Relative threshold potential in mV.
+        V_0_rel: float or np.ndarray
+            Relative reset potential in mV.
+        mu: float or np.ndarray
+            Mean neuron activity in mV.
+        sigma: float or np.ndarray
+            Standard deviation of neuron activity in mV.
+
+        Returns:
+        --------
+        np.ndarray:
+            Stationary firing rates in Hz.
+        """
+        y_th, y_r = np.broadcast_arrays(
+            np.asarray((V_th_rel - mu) / sigma, dtype=float),
+            np.asarray((V_0_rel - mu) / sigma, dtype=float))
+        integral, valid = self.siegert_integral(y_th, y_r)
+        rates = np.empty(y_th.shape)
+        rates[valid] = 1.0 / (tau_r + integral[valid] * tau_m)
+        # exact formula outside of table (with sigma = 1, mu = 0)
+        rates[~valid] = nu_0_vec(tau_m, tau_r, y_th[~valid], y_r[~valid], 0.,
+                                 1.)
+        return rates
+
+    def nu0_fb433(self, tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu, sigma):
+        """
+        Tabulated version of nu0_fb433.
+
+        Parameters:
+        -----------
+        tau_m: float
+            Membrane time constant in seconds.
+        tau_s: float
+            Synaptic time constant in seconds.
+        tau_r: float
+            Refractory time in seconds.
+        V_th_rel: float
+            Relative threshold potential in mV.
+        V_0_rel: float
+            Relative reset potential in mV.
+        mu: float or np.ndarray
+            Mean neuron activity in mV.
+        sigma: float or np.ndarray
+            Standard deviation of neuron activity in mV.
+
+        Returns:
+        --------
+        np.ndarray:
+            Stationary firing rates in Hz.
+        """
+        r = self.nu_0(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+        return _apply_fb433_correction(tau_m, tau_s, V_th_rel, V_0_rel, mu,
+                                       sigma, r)
+
+
 def determinant(matrix):
     """
     Solve
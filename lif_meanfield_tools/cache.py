@@ -0,0 +1,462 @@
+"""
+In-memory and on-disk caches for results calculated by Network.
+
+Results are stored under canonical keys built from the name of the
+calculated quantity and the arguments passed to the corresponding Network
+method, with quantities normalized to base units. Lookups are O(1) and the
+cache can be restricted to a byte budget, in which case the least recently
+used results are evicted first.
+
+content_hash provides a persistent digest of the same canonical form, which
+is used to identify parameter sets, e.g. in file names, and to store results
+persistently in a DiskCache.
+
+Classes:
+--------
+ResultCache
+DiskCache
+
+Functions:
+----------
+canonical_key
+content_hash
+nbytes
+_update_hash
+_encode
+_decode
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import struct
+import hashlib
+import importlib
+import tempfile
+from collections import OrderedDict
+import numpy as np
+
+from . import ureg
+
+
+def canonical_key(value):
+    """
+    Convert value into a hashable key that is equal for equal values.
+
+    Quantities are converted to base units, such that the same value given in
+    different units leads to the same key. Arrays are represented by dtype,
+    shape and a digest of their data. Objects that cannot be compared by value
+    are identified by their id.
+
+    Parameters:
+    -----------
+    value: object
+        Value to be converted.
+
+    Returns:
+    --------
+    tuple or object
+        Hashable key.
+    """
+    if isinstance(value, ureg.Quantity):
+        value = value.to_base_units()
+        return ('Quantity', str(value.units), canonical_key(value.magnitude))
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return ('ndarray', value.shape, canonical_key(value.tolist()))
+        return ('ndarray', value.dtype.str, value.shape,
+                hashlib.blake2b(np.ascontiguousarray(value),
+                                digest_size=16).digest())
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(canonical_key(v) for v in value)
+    if isinstance(value, dict):
+        return ('dict',) + tuple((key, canonical_key(value[key]))
+                                 for key in sorted(value))
+    if value is None or isinstance(value, (bool, int, float, complex, str)):
+        return value
+    return ('object', id(value))
+
+
+def content_hash(value, digest_size=16):
+    """
+    Calculate a hash of value that only depends on its content.
+
+    In contrast to the builtin hash, the result is the same in every process
+    and session. Quantities are converted to base units, arrays are fed into
+    the hash as dtype, shape and raw data, and containers element by element.
+    Dictionaries are hashed in the order of their sorted keys.
+
+    Parameters:
+    -----------
+    value: object
+        Quantity, np.ndarray, scalar, str, None, or list, tuple or dict of
+        these.
+    digest_size: int
+        Size of the digest in bytes.
+
+    Returns:
+    --------
+    str
+        Hexadecimal blake2b digest.
+    """
+    hasher = hashlib.blake2b(digest_size=digest_size)
+    _update_hash(hasher, value)
+    return hasher.hexdigest()
+
+
+def _update_hash(hasher, value):
+    """
+    Feed canonical byte representation of value into hasher.
+
+    Each value is preceded by a type tag and each variable-length part by its
+    length, such that different values lead to different byte streams.
+    """
+    if isinstance(value, ureg.Quantity):
+        value = value.to_base_units()
+        hasher.update(b'Q')
+        _update_hash(hasher, str(value.units))
+        _update_hash(hasher, value.magnitude)
+    elif isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            hasher.update(b'O')
+            _update_hash(hasher, value.shape)
+            _update_hash(hasher, value.tolist())
+        else:
+            hasher.update(b'A')
+            _update_hash(hasher, value.dtype.str)
+            _update_hash(hasher, value.shape)
+            hasher.update(np.ascontiguousarray(value))
+    elif isinstance(value, np.generic):
+        _update_hash(hasher, value.item())
+    elif value is None:
+        hasher.update(b'N')
+    elif isinstance(value, bool):
+        hasher.update(b'T' if value else b'F')
+    elif isinstance(value, int):
+        data = str(value).encode()
+        hasher.update(b'i' + struct.pack('<Q', len(data)) + data)
+    elif isinstance(value, float):
+        hasher.update(b'f' + struct.pack('<d', value))
+    elif isinstance(value, complex):
+        hasher.update(b'c' + struct.pack('<dd', value.real, value.imag))
+    elif isinstance(value, (str, bytes)):
+        data = value.encode() if isinstance(value, str) else value
+        hasher.update((b's' if isinstance(value, str) else b'b')
+                      + struct.pack('<Q', len(data)) + data)
+    elif isinstance(value, (list, tuple)):
+        hasher.update((b'l' if isinstance(value, list) else b't')
+                      + struct.pack('<Q', len(value)))
+        for item in value:
+            _update_hash(hasher, item)
+    elif isinstance(value, dict):
+        hasher.update(b'd' + struct.pack('<Q', len(value)))
+        for key in sorted(value):
+            _update_hash(hasher, key)
+            _update_hash(hasher, value[key])
+    else:
+        raise TypeError('Cannot hash object of type {}.'.format(
+            type(value).__name__))
+
+
+def nbytes(value):
+    """ Approximate memory used by value in bytes. """
+    if isinstance(value, ureg.Quantity):
+        return nbytes(value.magnitude)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    return sys.getsizeof(value)
+
+
+class ResultCache(object):
+    """
+    Least recently used cache with optional byte budget.
+
+    Parameters:
+    -----------
+    max_bytes: int
+        Maximal memory of the stored results in bytes. If None, the cache is
+        unbounded.
+    on_evict: func
+        Optional function called with key and value of each evicted result.
+    """
+
+    def __init__(self, max_bytes=None, on_evict=None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def items(self):
+        """ Return list of (key, value), least recently used first. """
+        return [(key, value) for key, (value, size) in self._entries.items()]
+
+    def get(self, key, default=None):
+        """
+        Return result stored under key and mark it as recently used.
+
+        Returns default and counts a miss if key is not stored.
+        """
+        try:
+            value, size = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Store value under key and evict least recently used results until the
+        byte budget is met.
+        """
+        self.discard(key)
+        size = nbytes(value)
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        if self.max_bytes is not None:
+            while self._entries and self.nbytes > self.max_bytes:
+                old_key, (old_value, old_size) = self._entries.popitem(
+                    last=False)
+                self.nbytes -= old_size
+                self.evictions += 1
+                if self.on_evict is not None:
+                    self.on_evict(old_key, old_value)
+
+    def discard(self, key):
+        """ Remove result stored under key, if existing. """
+        if key in self._entries:
+            value, size = self._entries.pop(key)
+            self.nbytes -= size
+
+    def clear(self):
+        """ Remove all results and reset counters. """
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def info(self):
+        """
+        Return cache statistics.
+
+        Returns:
+        --------
+        dict
+            Number of hits, misses and evictions, number of stored results,
+            their memory in bytes and the byte budget.
+        """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'nbytes': self.nbytes,
+                'max_bytes': self.max_bytes}
+
+
+class DiskCache(object):
+    """
+    Persistent result store in a directory, shared between processes.
+
+    Each result is stored in a separate .npz file named after its key, which
+    should be a content_hash. Files are written to a temporary file first and
+    then renamed, which is atomic, such that processes reading and writing the
+    same directory never see partially written results. Reading a result
+    updates the modification time of its file, which is used to evict the
+    least recently used results if the directory exceeds max_bytes.
+
+    Parameters:
+    -----------
+    directory: str
+        Directory containing the results. Created if not existing.
+    max_bytes: int
+        Maximal size of all stored results in bytes. If None, the directory
+        is unbounded.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, default=None):
+        """
+        Return result stored under key, or default if it is not stored or
+        cannot be read.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                arrays = dict(data)
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return _decode(json.loads(str(arrays.pop('__structure__'))), arrays)
+
+    def put(self, key, value):
+        """
+        Store value under key and evict least recently used results until the
+        byte budget is met.
+
+        Raises TypeError if value contains objects other than quantities,
+        arrays, scalars, strings, None, lists, tuples, named tuples and dicts.
+        """
+        arrays = {}
+        structure = _encode(value, arrays)
+        arrays['__structure__'] = np.array(json.dumps(structure))
+        handle, temporary = tempfile.mkstemp(dir=self.directory,
+                                             suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+        if self.max_bytes is not None:
+            self.evict(self.max_bytes)
+
+    def discard(self, key):
+        """ Remove result stored under key, if existing. """
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        """ Returns list of (modification time, size, path) of all results. """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.npz'):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, max_bytes):
+        """
+        Remove least recently used results until their total size is at most
+        max_bytes.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                # already removed by another process
+                pass
+            total -= size
+
+    def clear(self):
+        """ Remove all results and reset counters. """
+        self.evict(0)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def info(self):
+        """
+        Return cache statistics.
+
+        Returns:
+        --------
+        dict
+            Number of hits, misses and evictions of this process, number of
+            stored results, their size in bytes and the byte budget.
+        """
+        entries = self._entries()
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(entries),
+                'nbytes': sum(size for mtime, size, path in entries),
+                'max_bytes': self.max_bytes}
+
+
+def _encode(value, arrays):
+    """
+    Returns JSON-serializable description of value, whose arrays are stored
+    in the dictionary arrays.
+    """
+    if isinstance(value, ureg.Quantity):
+        return {'type': 'quantity', 'units': str(value.units),
+                'magnitude': _encode(value.magnitude, arrays)}
+    if isinstance(value, (np.ndarray, np.generic, bool, int, float, complex)):
+        value = np.asarray(value)
+        if value.dtype.hasobject:
+            raise TypeError('Cannot store object arrays.')
+        name = 'array_{}'.format(len(arrays))
+        arrays[name] = value
+        return {'type': 'array', 'name': name}
+    if value is None or isinstance(value, str):
+        return {'type': 'value', 'value': value}
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        return {'type': 'namedtuple', 'module': type(value).__module__,
+                'name': type(value).__qualname__,
+                'items': [_encode(item, arrays) for item in value]}
+    if isinstance(value, (list, tuple)):
+        return {'type': type(value).__name__,
+                'items': [_encode(item, arrays) for item in value]}
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {'type': 'dict',
+                'items': {key: _encode(item, arrays)
+                          for key, item in value.items()}}
+    raise TypeError('Cannot store object of type {}.'.format(
+        type(value).__name__))
+
+
+def _decode(structure, arrays):
+    """ Inverse of _encode. """
+    kind = structure['type']
+    if kind == 'quantity':
+        return ureg.Quantity(_decode(structure['magnitude'], arrays),
+                             structure['units'])
+    if kind == 'array':
+        value = arrays[structure['name']]
+        return value.item() if value.ndim == 0 else value
+    if kind == 'value':
+        return structure['value']
+    if kind == 'namedtuple':
+        cls = getattr(importlib.import_module(structure['module']),
+                      structure['name'])
+        return cls(*[_decode(item, arrays) for item in structure['items']])
+    if kind in ('list', 'tuple'):
+        items = [_decode(item, arrays) for item in structure['items']]
+        return items if kind == 'list' else tuple(items)
+    return {key: _decode(item, arrays)
+            for key, item in structure['items'].items()}
@@ -0,0 +1,1105 @@
+"""
+Unit-free implementations of the hot mean-field calculations.
+
+All functions take and return plain floats and np.ndarrays, with times in
+s, frequencies in Hz and voltages in mV, i.e. in the units used by the
+ureg.wraps decorators of meanfield_calcs. Units are stripped once at the
+boundary in meanfield_calcs and network.py, and all inner loops run on
+magnitudes.
+
+Functions on frequency grids use f(-omega) = conj(f(omega)): on grids
+containing mirrored (or repeated) frequencies only one representative of
+each absolute frequency is computed and the others are filled in by
+conjugation, see _mirror_map.
+
+Classes:
+--------
+TransferFunctionState
+EigenDecomposition
+Continuation
+
+Functions:
+----------
+firing_rates
+mean
+standard_deviation
+firing_rates_batch
+firing_rates_continuation
+transfer_function_1p_taylor
+transfer_function_1p_shift
+prepare_transfer_function
+transfer_function_kernel
+transfer_function
+delay_dist_matrix
+effective_connectivity
+power_spectra
+eigen_decomposition
+_rate_equations
+_solve_fixed_point_relaxation
+_solve_fixed_point_newton
+_solve_fixed_point_anderson
+_lambda_derivative
+_continuation_tangent
+_continuation_corrector
+_max_real_eigenvalue
+_map_grid_chunks
+_delay_dist_matrix_chunk
+_mirror_map
+_unfold_mirrored
+_batch_dot
+"""
+
+from __future__ import print_function
+import os
+import functools
+import warnings
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from scipy.special import zetac, erf
+
+from . import aux_calcs
+
+
+def firing_rates(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J, j,
+                  nu_ext, K_ext, g, nu_e_ext, nu_i_ext, solver='relaxation',
+                  tol=1e-5, maxiter=1000, siegert_table=None, nu_init=None):
+    """ Unit-free version of meanfield_calcs.firing_rates(). """
+
+    get_rate_difference, get_jacobian = _rate_equations(
+        dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J, j, nu_ext,
+        K_ext, g, nu_e_ext, nu_i_ext, siegert_table=siegert_table)
+
+    if nu_init is None:
+        nu_init = np.zeros(int(dimension))
+    else:
+        nu_init = np.array(nu_init, dtype=float)
+
+    if solver == 'newton':
+        nu = _solve_fixed_point_newton(get_rate_difference, get_jacobian,
+                                       nu_init, tol, maxiter)
+    elif solver == 'anderson':
+        nu = _solve_fixed_point_anderson(get_rate_difference, nu_init, tol,
+                                         maxiter)
+    elif solver == 'relaxation':
+        nu = None
+    else:
+        raise ValueError('Unknown solver: {}'.format(solver))
+
+    if nu is None:
+        if solver != 'relaxation':
+            warnings.warn('Solver {} did not converge, falling back to '
+                          'relaxation.'.format(solver))
+        nu = _solve_fixed_point_relaxation(get_rate_difference, nu_init, tol)
+
+    return nu
+
+
+def _rate_equations(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J,
+                    j, nu_ext, K_ext, g, nu_e_ext, nu_i_ext,
+                    siegert_table=None):
+    """
+    Returns functions get_rate_difference(nu) and get_jacobian(nu) of the
+    self-consistency equation of the rates of the given network.
+    """
+    if siegert_table is None:
+        nu0_fb433 = aux_calcs.nu0_fb433_vec
+    else:
+        nu0_fb433 = siegert_table.nu0_fb433
+
+    def rate_function(mu, sigma):
+        """ calculate stationary firing rates with given parameters """
+        return nu0_fb433(tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu, sigma)
+
+    def get_rate_difference(nu):
+        """ calculate difference between new iteration step and previous one """
+        ### new mean
+        mu = mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext)
+
+        ### new std
+        sigma = standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext,
+                                    g, nu_e_ext, nu_i_ext)
+
+        new_nu = rate_function(mu, sigma)
+
+        return -nu + new_nu
+
+    def get_jacobian(nu):
+        """ calculate derivative of the rate difference w.r.t. the rates """
+        mu = mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext)
+        sigma = standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext,
+                                    g, nu_e_ext, nu_i_ext)
+        d_nu_d_mu = aux_calcs.d_nu_d_mu_fb433_vec(tau_m, tau_s, tau_r,
+                                                  V_th_rel, V_0_rel, mu, sigma)
+        d_nu_d_sigma = aux_calcs.d_nu_d_sigma_fb433_vec(tau_m, tau_s, tau_r,
+                                                        V_th_rel, V_0_rel, mu,
+                                                        sigma)
+        # derivatives of _mean and _standard_deviation w.r.t. the rates
+        d_mu_d_nu = tau_m * K * J
+        d_sigma_d_nu = tau_m * K * J**2 / (2 * sigma[:, np.newaxis])
+        return (d_nu_d_mu[:, np.newaxis] * d_mu_d_nu
+                + d_nu_d_sigma[:, np.newaxis] * d_sigma_d_nu
+                - np.identity(int(dimension)))
+
+    return get_rate_difference, get_jacobian
+
+
+def _solve_fixed_point_relaxation(get_rate_difference, nu, tol, dt=0.05):
+    """
+    Find root of get_rate_difference by forward-Euler relaxation.
+
+    Parameters:
+    -----------
+    get_rate_difference: func
+        Function returning the difference between the self-consistent rates
+        and the given rates.
+    nu: np.ndarray
+        Initial rates.
+    tol: float
+        Iteration stops if the maximal change of the rates falls below tol.
+    dt: float
+        Step size.
+
+    Returns:
+    --------
+    np.ndarray
+        Self-consistent rates.
+    """
+    # do iteration procedure, until stationary firing rates are found
+    y = np.zeros((2, len(nu)))
+    y[0] = nu
+    eps = 1.0
+    while eps >= tol:
+        delta_y = get_rate_difference(y[0])
+        y[1] = y[0] + delta_y*dt
+        epsilon = (y[1] - y[0])
+        eps = max(np.abs(epsilon))
+        y[0] = y[1]
+
+    return y[1]
+
+
+def _solve_fixed_point_newton(get_rate_difference, get_jacobian, nu, tol,
+                              maxiter, dt=0.05, max_step=10., max_halvings=5):
+    """
+    Find root of get_rate_difference with a damped Newton iteration.
+
+    Newton steps are limited to max_step and halved until the residual
+    decreases. If this does not happen, a relaxation step of size dt is taken
+    instead, which makes the iteration robust far away from the fixed point.
+    Rates are kept non-negative.
+
+    Parameters:
+    -----------
+    get_rate_difference: func
+        Function returning the difference between the self-consistent rates
+        and the given rates.
+    get_jacobian: func
+        Function returning the Jacobian of get_rate_difference.
+    nu: np.ndarray
+        Initial rates.
+    tol: float
+        Iteration stops if the maximal residual falls below tol.
+    maxiter: int
+        Maximal number of Newton steps.
+    dt: float
+        Size of relaxation steps.
+    max_step: float
+        Maximal change of any rate within one Newton step in Hz.
+    max_halvings: int
+        Maximal number of step halvings in one Newton step.
+
+    Returns:
+    --------
+    np.ndarray or None
+        Self-consistent rates, None if the iteration did not converge.
+    """
+    F = get_rate_difference(nu)
+    for i in range(maxiter):
+        if not np.all(np.isfinite(F)):
+            return None
+        if np.max(np.abs(F)) < tol:
+            return nu
+        res = np.linalg.norm(F)
+        try:
+            step = np.linalg.solve(get_jacobian(nu), -F)
+        except np.linalg.LinAlgError:
+            step = dt * F
+        step *= min(1., max_step / np.max(np.abs(step)))
+        for k in range(max_halvings + 1):
+            nu_new = np.maximum(nu + step, 0)
+            F_new = get_rate_difference(nu_new)
+            if np.linalg.norm(F_new) < res:
+                break
+            step /= 2
+        else:
+            nu_new = np.maximum(nu + dt * F, 0)
+            F_new = get_rate_difference(nu_new)
+        nu, F = nu_new, F_new
+    return None
+
+
+def _solve_fixed_point_anderson(get_rate_difference, nu, tol, maxiter,
+                                dt=0.05, memory=5):
+    """
+    Find root of get_rate_difference with Anderson-accelerated relaxation.
+
+    The next iterate is obtained from the relaxation step of size dt applied
+    to the combination of the last memory iterates that minimizes the
+    linearized residual.
+
+    Parameters:
+    -----------
+    get_rate_difference: func
+        Function returning the difference between the self-consistent rates
+        and the given rates.
+    nu: np.ndarray
+        Initial rates.
+    tol: float
+        Iteration stops if the maximal residual falls below tol.
+    maxiter: int
+        Maximal number of iterations.
+    dt: float
+        Size of relaxation steps.
+    memory: int
+        Number of previous iterates used for extrapolation.
+
+    Returns:
+    --------
+    np.ndarray or None
+        Self-consistent rates, None if the iteration did not converge.
+    """
+    iterates = []
+    residuals = []
+    for i in range(maxiter):
+        F = get_rate_difference(nu)
+        if not np.all(np.isfinite(F)):
+            return None
+        if np.max(np.abs(F)) < tol:
+            return nu
+        iterates.append(nu)
+        residuals.append(F)
+        iterates = iterates[-(memory + 1):]
+        residuals = residuals[-(memory + 1):]
+        if len(residuals) > 1:
+            dX = np.diff(iterates, axis=0).T
+            dF = np.diff(residuals, axis=0).T
+            gamma = np.linalg.lstsq(dF, F, rcond=None)[0]
+            nu = nu + dt * F - np.dot(dX + dt * dF, gamma)
+        else:
+            nu = nu + dt * F
+        nu = np.maximum(nu, 0)
+    return None
+
+
+def mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
+    """ Unit-free version of meanfield_calcs.mean(). """
+    # contribution from within the network
+    m0 = tau_m * _batch_dot(K * J, nu)
+    # contribution from external sources
+    m_ext = tau_m * j * K_ext * nu_ext
+    # contribution from additional excitatory and inhibitory Poisson input
+    m_ext_add =  tau_m * j * (nu_e_ext - g * nu_i_ext)
+    # add them up
+    m = m0 + m_ext + m_ext_add
+
+    return m
+
+
+def standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
+    """ Unit-free version of meanfield_calcs.standard_deviation(). """
+    # contribution from within the network to variance
+    var0 = tau_m * _batch_dot(K * J**2, nu)
+    # contribution from external sources to variance
+    var_ext = tau_m * j**2 * K_ext * nu_ext
+    # contribution from additional excitatory and inhibitory Poisson input
+    var_ext_add =  tau_m * j**2 * (nu_e_ext + g**2 * nu_i_ext)
+    # add them up
+    var = var0 + var_ext + var_ext_add
+    # standard deviation is square root of variance
+    sigma = np.sqrt(var)
+    return sigma
+
+
+def _batch_dot(A, nu):
+    """
+    Matrix-vector product of (stacks of) matrices A and (stacks of) vectors
+    nu, broadcasting over leading batch axes.
+    """
+    if np.ndim(A) <= 2 and np.ndim(nu) <= 1:
+        return np.dot(A, nu)
+    return np.matmul(A, np.asarray(nu)[..., np.newaxis])[..., 0]
+
+
+def firing_rates_batch(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K,
+                       J, j, nu_ext, K_ext, g, nu_e_ext, nu_i_ext, tol=1e-5,
+                       siegert_table=None, nu_init=None, maxiter=10000):
+    """ Unit-free version of meanfield_calcs.firing_rates_batch(). """
+
+    params = {'tau_m': tau_m, 'tau_s': tau_s, 'tau_r': tau_r,
+              'V_0_rel': V_0_rel, 'V_th_rel': V_th_rel, 'K': K, 'J': J,
+              'j': j, 'nu_ext': nu_ext, 'K_ext': K_ext, 'g': g,
+              'nu_e_ext': nu_e_ext, 'nu_i_ext': nu_i_ext}
+
+    # parameters with a leading batch axis get shape (B, dimension) or
+    # (B, dimension, dimension), such that they broadcast with the rates
+    batch_sizes = set()
+    for key, value in params.items():
+        value = np.asarray(value, dtype=float)
+        if value.ndim == _BATCH_BASE_NDIM[key] + 1:
+            batch_sizes.add(value.shape[0])
+            if _BATCH_BASE_NDIM[key] == 0:
+                value = value[:, np.newaxis]
+        elif value.ndim > _BATCH_BASE_NDIM[key] + 1:
+            raise ValueError('{} has too many dimensions.'.format(key))
+        params[key] = value
+    if len(batch_sizes) > 1:
+        raise ValueError('Batch sizes of parameters differ: {}'.format(
+            sorted(batch_sizes)))
+    n_batch = batch_sizes.pop() if batch_sizes else 1
+
+    if siegert_table is None:
+        nu0_fb433 = aux_calcs.nu0_fb433_vec
+    else:
+        nu0_fb433 = siegert_table.nu0_fb433
+
+    def get_rate_difference(nu, p):
+        """ difference between self-consistent and given rates """
+        mu = mean(nu, p['K'], p['J'], p['j'], p['tau_m'], p['nu_ext'],
+                  p['K_ext'], p['g'], p['nu_e_ext'], p['nu_i_ext'])
+        sigma = standard_deviation(nu, p['K'], p['J'], p['j'], p['tau_m'],
+                                   p['nu_ext'], p['K_ext'], p['g'],
+                                   p['nu_e_ext'], p['nu_i_ext'])
+        return -nu + nu0_fb433(p['tau_m'], p['tau_s'], p['tau_r'],
+                               p['V_th_rel'], p['V_0_rel'], mu, sigma)
+
+    shape = (n_batch, int(dimension))
+    if nu_init is None:
+        nu = np.zeros(shape)
+    else:
+        nu = np.array(np.broadcast_to(nu_init, shape), dtype=float)
+
+    # relaxation as in _solve_fixed_point_relaxation, only iterating the
+    # members that have not converged yet
+    dt = 0.05
+    active = np.arange(n_batch)
+    diverged = []
+    for _ in range(maxiter):
+        if not len(active):
+            break
+        p = {key: (value[active] if value.ndim > _BATCH_BASE_NDIM[key]
+                   else value)
+             for key, value in params.items()}
+        delta = get_rate_difference(nu[active], p) * dt
+        nu[active] += delta
+        finite = np.all(np.isfinite(nu[active]), axis=1)
+        diverged.extend(active[~finite])
+        active = active[finite & (np.max(np.abs(delta), axis=1) >= tol)]
+
+    if len(diverged):
+        warnings.warn('Firing rates of batch members {} diverged.'.format(
+            sorted(diverged)))
+    if len(active):
+        warnings.warn('Firing rates of batch members {} did not converge '
+                      'within maxiter={} steps.'.format(list(active),
+                                                        maxiter))
+    return nu
+
+
+# number of dimensions of each parameter of a single network
+_BATCH_BASE_NDIM = {'tau_m': 0, 'tau_s': 0, 'tau_r': 0, 'V_0_rel': 0,
+                    'V_th_rel': 0, 'K': 2, 'J': 2, 'j': 0, 'nu_ext': 0,
+                    'K_ext': 1, 'g': 0, 'nu_e_ext': 1, 'nu_i_ext': 1}
+
+
+Continuation = namedtuple('Continuation', ['lambdas', 'firing_rates',
+                                           'max_eigenvalues', 'stable',
+                                           'folds'])
+
+
+def firing_rates_continuation(get_params, lambda_start, lambda_stop,
+                              nu_init=None, step=None, min_step=None,
+                              max_step=None, tol=1e-9, maxiter=10,
+                              max_points=1000, siegert_table=None):
+    """
+    Unit-free version of meanfield_calcs.firing_rates_continuation().
+
+    get_params(lambda) returns the arguments dimension, ..., nu_i_ext of
+    firing_rates for the parameter value lambda.
+    """
+    lambda_start = float(lambda_start)
+    lambda_stop = float(lambda_stop)
+    direction = np.sign(lambda_stop - lambda_start)
+    if direction == 0:
+        raise ValueError('lambda_start and lambda_stop must differ.')
+    if step is None:
+        step = abs(lambda_stop - lambda_start) / 50
+    if min_step is None:
+        min_step = 1e-4 * step
+    if max_step is None:
+        max_step = 10 * step
+
+    @functools.lru_cache(maxsize=16)
+    def equations(lam):
+        return _rate_equations(*get_params(lam), siegert_table=siegert_table)
+
+    def solve(lam, nu):
+        """ self-consistent rates at fixed lambda, None if not converged """
+        get_rate_difference, get_jacobian = equations(lam)
+        return _solve_fixed_point_newton(get_rate_difference, get_jacobian,
+                                         nu, tol, 10 * maxiter)
+
+    get_rate_difference, get_jacobian = equations(lambda_start)
+    if nu_init is None:
+        nu_init = _solve_fixed_point_relaxation(
+            get_rate_difference, np.zeros(int(get_params(lambda_start)[0])),
+            1e-5)
+    nu = solve(lambda_start, np.array(nu_init, dtype=float))
+    if nu is None:
+        raise RuntimeError('No fixed point found at lambda_start.')
+
+    lambdas = [lambda_start]
+    rates = [nu]
+    max_eigenvalues = [_max_real_eigenvalue(equations(lambda_start)[1], nu)]
+    folds = []
+    tangent = _continuation_tangent(equations, nu, lambda_start,
+                                    direction=direction)
+    ds = step
+    while len(lambdas) < max_points:
+        x = np.append(rates[-1], lambdas[-1])
+        x_pred = x + ds * tangent
+        x_new, n_iter = _continuation_corrector(equations, x_pred, tangent,
+                                                tol, maxiter)
+        if x_new is None:
+            ds /= 2
+            if ds < min_step:
+                warnings.warn('Continuation stopped at lambda={}: step size '
+                              'fell below min_step.'.format(lambdas[-1]))
+                break
+            continue
+
+        nu_new, lam_new = x_new[:-1], x_new[-1]
+        if direction * (lam_new - lambda_stop) >= 0:
+            # land exactly on lambda_stop
+            weight = (lambda_stop - x[-1]) / (lam_new - x[-1])
+            nu_stop = solve(lambda_stop, x[:-1] + weight * (nu_new - x[:-1]))
+            if nu_stop is not None:
+                lambdas.append(lambda_stop)
+                rates.append(nu_stop)
+                max_eigenvalues.append(_max_real_eigenvalue(
+                    equations(lambda_stop)[1], nu_stop))
+            break
+
+        new_tangent = _continuation_tangent(equations, nu_new, lam_new,
+                                            previous=tangent)
+        if np.sign(new_tangent[-1]) != np.sign(tangent[-1]):
+            folds.append(len(lambdas))
+        lambdas.append(lam_new)
+        rates.append(nu_new)
+        max_eigenvalues.append(_max_real_eigenvalue(equations(lam_new)[1],
+                                                    nu_new))
+        tangent = new_tangent
+        if direction * (lam_new - lambda_start) < 0:
+            # path has turned back beyond its starting value
+            break
+
+        if n_iter <= 2:
+            ds = min(1.5 * ds, max_step)
+        elif n_iter > maxiter // 2:
+            ds = max(ds / 2, min_step)
+    else:
+        warnings.warn('Continuation stopped after max_points={} points.'
+                      .format(max_points))
+
+    max_eigenvalues = np.array(max_eigenvalues)
+    return Continuation(np.array(lambdas), np.array(rates), max_eigenvalues,
+                        max_eigenvalues < 0, folds)
+
+
+def _lambda_derivative(equations, nu, lam):
+    """ Central difference quotient of rate difference w.r.t. lambda. """
+    h = 1e-6 * max(1., abs(lam))
+    return (equations(lam + h)[0](nu) - equations(lam - h)[0](nu)) / (2 * h)
+
+
+def _continuation_tangent(equations, nu, lam, previous=None, direction=1):
+    """
+    Unit tangent of the solution path at (nu, lam).
+
+    The tangent spans the null space of the Jacobian [dF/dnu, dF/dlambda].
+    It is oriented along previous, or such that lambda changes in the given
+    direction if previous is None.
+    """
+    jacobian = np.column_stack([equations(lam)[1](nu),
+                                _lambda_derivative(equations, nu, lam)])
+    tangent = np.linalg.svd(jacobian)[2][-1]
+    if previous is None:
+        orientation = direction * tangent[-1]
+    else:
+        orientation = np.dot(tangent, previous)
+    return -tangent if orientation < 0 else tangent
+
+
+def _continuation_corrector(equations, x_pred, tangent, tol, maxiter):
+    """
+    Newton correction of the predicted point x_pred = (nu, lambda) onto the
+    solution path, within the hyperplane perpendicular to tangent.
+
+    Returns the corrected point and the number of Newton steps, or None and
+    maxiter if the iteration did not converge.
+    """
+    x = x_pred.copy()
+    for i in range(maxiter):
+        nu, lam = x[:-1], x[-1]
+        get_rate_difference, get_jacobian = equations(lam)
+        # predictions far off the path may leave the domain of the rate
+        # function, which is handled by reducing the step
+        with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+            F = get_rate_difference(nu)
+        if not np.all(np.isfinite(F)):
+            break
+        residual = np.append(F, np.dot(tangent, x - x_pred))
+        if np.max(np.abs(residual)) < tol:
+            return x, i
+        jacobian = np.vstack([
+            np.column_stack([get_jacobian(nu),
+                             _lambda_derivative(equations, nu, lam)]),
+            tangent])
+        try:
+            x = x - np.linalg.solve(jacobian, residual)
+        except np.linalg.LinAlgError:
+            break
+    return None, maxiter
+
+
+def _max_real_eigenvalue(get_jacobian, nu):
+    """
+    Largest real part of the eigenvalues of the linearized rate dynamics
+    tau d nu / dt = -nu + Phi(nu) at nu, in units of 1 / tau.
+    """
+    return np.max(np.linalg.eigvals(get_jacobian(nu)).real)
+
+
+def transfer_function_1p_taylor(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                                 V_0_rel, omega):
+    """ Unit-free version of meanfield_calcs.transfer_function_1p_taylor(). """
+    state = prepare_transfer_function(mu, sigma, tau_m, tau_s, tau_r,
+                                       V_th_rel, V_0_rel, method='taylor')
+    return transfer_function_kernel(state, omega)
+
+
+def transfer_function_1p_shift(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                                V_0_rel, omega):
+    """ Unit-free version of meanfield_calcs.transfer_function_1p_shift(). """
+    state = prepare_transfer_function(mu, sigma, tau_m, tau_s, tau_r,
+                                       V_th_rel, V_0_rel, method='shift')
+    return transfer_function_kernel(state, omega)
+
+
+# stationary, omega independent quantities entering the transfer functions
+TransferFunctionState = namedtuple('TransferFunctionState',
+                                   ['method', 'tau_m', 'tau_s', 'tau_r',
+                                    'mu', 'sigma', 'V_th_rel', 'V_0_rel',
+                                    'nu', 'nu_fb', 'x_t', 'x_r', 'A'])
+
+# fields of TransferFunctionState that can differ between populations
+_POPULATION_FIELDS = ('mu', 'sigma', 'V_th_rel', 'V_0_rel', 'nu', 'nu_fb',
+                      'x_t', 'x_r', 'A')
+
+
+def prepare_transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                               V_0_rel, method='shift'):
+    """
+    Omega independent part of the transfer functions.
+
+    Parameters:
+    -----------
+    mu: float or np.ndarray
+        Mean neuron activity in mV.
+    sigma: float or np.ndarray
+        Standard deviation of neuron activity in mV.
+    tau_m: float
+        Membrane time constant in s.
+    tau_s: float
+        Synaptic time constant in s.
+    tau_r: float
+        Refractory time in s.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    method: str
+        Transfer function ('shift', 'taylor').
+
+    Returns:
+    --------
+    TransferFunctionState
+        Stationary quantities used by transfer_function_kernel.
+    """
+    mu, sigma = np.broadcast_arrays(np.asarray(mu, dtype=float),
+                                    np.asarray(sigma, dtype=float))
+    alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
+
+    if method == 'shift':
+        # effective threshold and reset
+        V_th_rel = V_th_rel + sigma * alpha / 2. * np.sqrt(tau_s / tau_m)
+        V_0_rel = V_0_rel + sigma * alpha / 2. * np.sqrt(tau_s / tau_m)
+        nu = aux_calcs.nu_0_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+        nu_fb = nu
+        A = None
+    elif method == 'taylor':
+        V_th_rel = np.full(mu.shape, V_th_rel, dtype=float)
+        V_0_rel = np.full(mu.shape, V_0_rel, dtype=float)
+        nu = aux_calcs.nu_0_vec(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
+        nu_fb = aux_calcs.nu0_fb433_vec(tau_m, tau_s, tau_r, V_th_rel,
+                                        V_0_rel, mu, sigma)
+        k = np.sqrt(tau_s / tau_m)
+        A = alpha * tau_m * nu * k / np.sqrt(2)
+    else:
+        raise ValueError('Unknown transfer function method: {}'.format(method))
+
+    x_t = np.sqrt(2.) * (V_th_rel - mu) / sigma
+    x_r = np.sqrt(2.) * (V_0_rel - mu) / sigma
+    return TransferFunctionState(method, tau_m, tau_s, tau_r, mu, sigma,
+                                  V_th_rel, V_0_rel, nu, nu_fb, x_t, x_r, A)
+
+
+def transfer_function_kernel(state, omega):
+    """
+    Omega dependent part of the transfer functions.
+
+    Parameters:
+    -----------
+    state: TransferFunctionState
+        Result of prepare_transfer_function.
+    omega: float, complex or np.ndarray
+        Input frequencies in Hz, broadcast against the populations of state.
+
+    Returns:
+    --------
+    complex or np.ndarray
+        Transfer function in Hz/mV.
+    """
+    tau_m, tau_s, tau_r = state.tau_m, state.tau_s, state.tau_r
+    shape = np.broadcast(state.mu, omega).shape
+    omega = np.broadcast_to(omega, shape)
+    mu, sigma, V_th_rel, V_0_rel, nu, nu_fb, x_t, x_r = [
+        np.broadcast_to(value, shape) for value in
+        (state.mu, state.sigma, state.V_th_rel, state.V_0_rel, state.nu,
+         state.nu_fb, state.x_t, state.x_r)]
+    result = np.zeros(shape, dtype=complex)
+
+    # for frequency zero the exact expression is given by the derivative of
+    # f-I-curve
+    zero = np.abs(omega - 0.) < 1e-15
+    if np.any(zero):
+        if state.method == 'shift':
+            result[zero] = np.vectorize(aux_calcs.d_nu_d_mu)(
+                tau_m, tau_r, V_th_rel[zero], V_0_rel[zero], mu[zero],
+                sigma[zero])
+        else:
+            result[zero] = np.vectorize(aux_calcs.d_nu_d_mu_fb433)(
+                tau_m, tau_s, tau_r, V_th_rel[zero], V_0_rel[zero], mu[zero],
+                sigma[zero])
+    nonzero = ~zero
+    if np.any(nonzero):
+        omega_nz = omega[nonzero]
+        z = -0.5 + 1j * omega_nz * tau_m
+        if state.method == 'shift':
+            psi = aux_calcs.PsiEvaluator(z, x_t[nonzero], x_r[nonzero],
+                                         order=1)
+            frac = psi.dPsi_x_r() / psi.Psi_x_r()
+            result[nonzero] = (np.sqrt(2.) / sigma[nonzero] * nu[nonzero]
+                               / (1. + 1j * omega_nz * tau_m) * frac)
+        else:
+            A = np.broadcast_to(state.A, shape)[nonzero]
+            psi = aux_calcs.PsiEvaluator(z, x_t[nonzero], x_r[nonzero],
+                                         order=2)
+            a0 = psi.Psi_x_r()
+            a1 = psi.dPsi_x_r() / a0
+            a3 = (A / tau_m / nu_fb[nonzero]
+                  * (-a1**2 + psi.d2Psi_x_r() / a0))
+            result[nonzero] = (np.sqrt(2.) / sigma[nonzero] * nu_fb[nonzero]
+                               / (1. + 1j * omega_nz * tau_m) * (a1 + a3))
+
+    # additional low-pass filter due to perturbation to the input current
+    return (result / (1. + 1j * omega * tau_s))[()]
+
+def transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
+                      omegas, method='shift', workers=1, executor=None):
+    """
+    Transfer functions of all populations at all omegas.
+
+    Parameters:
+    -----------
+    mu: np.ndarray
+        Mean input of each population in mV.
+    sigma: np.ndarray
+        Standard deviation of input of each population in mV.
+    tau_m: float
+        Membrane time constant in s.
+    tau_s: float
+        Synaptic time constant in s.
+    tau_r: float
+        Refractory time in s.
+    V_th_rel: float
+        Relative threshold potential in mV.
+    V_0_rel: float
+        Relative reset potential in mV.
+    omegas: np.ndarray
+        Input angular frequencies in Hz.
+    method: str
+        Transfer function ('shift', 'taylor').
+    workers: int
+        Number of processes evaluating chunks of the (omega, population)
+        grid in parallel.
+    executor: concurrent.futures.Executor
+        Optional executor used instead of a new process pool.
+
+    Returns:
+    --------
+    np.ndarray
+        Transfer functions in Hz/mV with shape (len(omegas), len(mu)).
+    """
+    mirror = _mirror_map(omegas)
+    if mirror is not None:
+        rep, inverse, conj = mirror
+        half = transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+                                 V_0_rel, np.asarray(omegas)[rep],
+                                 method=method, workers=workers,
+                                 executor=executor)
+        return _unfold_mirrored(half, inverse, conj)
+
+    state = prepare_transfer_function(mu, sigma, tau_m, tau_s, tau_r,
+                                      V_th_rel, V_0_rel, method=method)
+    omegas = np.asarray(omegas)[:, np.newaxis]
+    shape = (len(omegas), len(state.mu))
+
+    if executor is None and workers <= 1:
+        return transfer_function_kernel(state, omegas)
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = _map_grid_chunks(pool, state, omegas, 4 * workers)
+    else:
+        chunks = _map_grid_chunks(executor, state, omegas,
+                                  4 * max(workers, os.cpu_count() or 1))
+    return np.concatenate(chunks).reshape(shape)
+
+
+def _map_grid_chunks(executor, state, omegas, n_chunks):
+    """
+    Evaluate transfer_function_kernel on chunks of the flattened
+    (omega, population) grid.
+
+    Returns the list of results of the chunks in order.
+    """
+    shape = np.broadcast(state.mu, omegas).shape
+    n_chunks = min(n_chunks, int(np.prod(shape)))
+    split = {key: np.array_split(np.broadcast_to(getattr(state, key),
+                                                 shape).ravel(), n_chunks)
+             for key in _POPULATION_FIELDS if getattr(state, key) is not None}
+    states = [state._replace(**{key: split[key][i] for key in split})
+              for i in range(n_chunks)]
+    omegas = np.array_split(np.broadcast_to(omegas, shape).ravel(), n_chunks)
+    return list(executor.map(transfer_function_kernel, states, omegas))
+
+
+def delay_dist_matrix(Delay, Delay_sd, delay_dist, omegas, out=None,
+                      chunk_size=None):
+    """
+    Delay distribution matrices for all omegas.
+
+    Assumes lower boundary for truncated Gaussian distributed delays to be
+    zero (exact would be dt, the minimal time step).
+
+    Parameters:
+    -----------
+    Delay: np.ndarray
+        Delay matrix in s.
+    Delay_sd: np.ndarray
+        Delay standard deviation matrix in s.
+    delay_dist: str
+        Delay distribution ('none', 'truncated_gaussian', 'gaussian').
+    omegas: np.ndarray
+        Input angular frequencies in Hz.
+    out: np.ndarray
+        Optional complex buffer of shape (len(omegas),) + Delay.shape the
+        result is written to.
+    chunk_size: int
+        If given, the matrices are computed for at most chunk_size omegas at a
+        time, which bounds the memory of intermediate results.
+
+    Returns:
+    --------
+    np.ndarray
+        Delay distribution matrices with shape (len(omegas),) + Delay.shape.
+    """
+    if delay_dist not in ('none', 'truncated_gaussian', 'gaussian'):
+        raise ValueError('Unknown delay distribution: {}'.format(delay_dist))
+    omegas = np.ravel(omegas)
+    shape = (len(omegas),) + np.shape(Delay)
+    if out is None:
+        out = np.empty(shape, dtype=complex)
+    elif out.shape != shape or out.dtype != complex:
+        raise ValueError('out must be a complex array of shape {}.'.format(
+            shape))
+    mirror = _mirror_map(omegas)
+    if mirror is not None:
+        rep, inverse, conj = mirror
+        half = delay_dist_matrix(Delay, Delay_sd, delay_dist, omegas[rep],
+                                 chunk_size=chunk_size)
+        return _unfold_mirrored(half, inverse, conj, out=out)
+    if chunk_size is None:
+        chunk_size = max(len(omegas), 1)
+
+    for start in range(0, len(omegas), chunk_size):
+        chunk = slice(start, start + chunk_size)
+        _delay_dist_matrix_chunk(Delay, Delay_sd, delay_dist, omegas[chunk],
+                                 out[chunk])
+    return out
+
+
+def _delay_dist_matrix_chunk(Delay, Delay_sd, delay_dist, omegas, out):
+    """ Writes delay distribution matrices for omegas to out. """
+    omegas = omegas.reshape((-1,) + (1,) * np.ndim(Delay))
+    np.exp(-1j * omegas * Delay, out=out)
+
+    if delay_dist == 'truncated_gaussian':
+        a0 = 0.5 * (1 + erf((-Delay/Delay_sd+1j*omegas*Delay_sd) / np.sqrt(2)))
+        a1 = 0.5 * (1 + erf((-Delay/Delay_sd) / np.sqrt(2)))
+        b0 = np.exp(-0.5*np.power(Delay_sd*omegas,2))
+        out *= (1.0-a0)/(1.0-a1)*b0
+    elif delay_dist == 'gaussian':
+        out *= np.exp(-0.5*np.power(Delay_sd*omegas,2))
+
+
+def _mirror_map(omegas):
+    """
+    Map a frequency grid containing mirrored frequencies onto its
+    non-negative half.
+
+    All quantities computed on frequency grids here satisfy
+    f(-omega) = conj(f(omega)), so only one of omega and -omega (and any
+    repeated frequency) needs to be evaluated.
+
+    Parameters:
+    -----------
+    omegas: np.ndarray
+        Input angular frequencies.
+
+    Returns:
+    --------
+    tuple or None
+        None if omegas is not a real 1d grid containing the same absolute
+        frequency more than once. Otherwise (rep, inverse, conj), with rep
+        indexing one representative of each absolute frequency in omegas,
+        preferring non-negative ones, inverse mapping each frequency to its
+        representative in omegas[rep] and conj masking the frequencies
+        whose values are the conjugates of the ones of their representative.
+
+    Absolute frequencies are considered equal if they differ by less than
+    _MIRROR_RTOL times the largest absolute frequency, such that grids built
+    with np.arange or np.linspace, whose mirrored frequencies differ by
+    rounding errors, are detected.
+    """
+    omegas = np.asarray(omegas)
+    if (omegas.ndim != 1 or np.iscomplexobj(omegas)
+            or not np.any(omegas < 0)):
+        return None
+    absolute = np.abs(omegas)
+    tol = _MIRROR_RTOL * np.max(absolute)
+    order = np.argsort(absolute, kind='stable')
+    new_group = np.concatenate([[True], np.diff(absolute[order]) > tol])
+    group = np.cumsum(new_group) - 1
+    if group[-1] + 1 == len(omegas):
+        return None
+    # order non-negative frequencies first within each group
+    resort = np.lexsort((omegas[order] < 0, group))
+    order = order[resort]
+    group = group[resort]
+    rep = order[np.flatnonzero(new_group)]
+    inverse = np.empty(len(omegas), dtype=int)
+    inverse[order] = group
+    conj = (omegas < 0) != (omegas[rep][inverse] < 0)
+    return rep, inverse, conj
+
+
+# relative tolerance of absolute frequencies considered equal by _mirror_map
+_MIRROR_RTOL = 1e-10
+
+
+def _unfold_mirrored(values, inverse, conj, axis=0, out=None):
+    """
+    Expand values computed at the representatives of _mirror_map to the
+    full frequency grid along axis.
+    """
+    values = np.take(values, inverse, axis=axis, out=out)
+    index = [slice(None)] * values.ndim
+    index[axis] = conj
+    index = tuple(index)
+    values[index] = np.conjugate(values[index])
+    return values
+
+
+def effective_connectivity(omega, transfer_function, tau_m, J, K, dimension,
+                           delay_term=1):
+    """
+    Effective connectivity.
+
+    Parameters:
+    -----------
+    omega: float
+        Input angular frequency to population in Hz.
+    transfer_function: np.ndarray
+        Transfer_function for given frequency omega in hertz/mV, or stack of
+        transfer functions with shape (n_omega, dimension).
+    tau_m: float
+        Membrane time constant in s.
+    J: np.ndarray
+        Weight matrix in mV.
+    K: np.ndarray
+        Indegree matrix.
+    dimension: int
+        Number of populations.
+    delay_term: 1 or np.ndarray
+        optional delay_dist_matrix, unitless, or stack of delay_dist_matrices.
+
+    Returns:
+    --------
+    np.ndarray
+        Effective connectivity matrix, or stack of matrices.
+    """
+    # matrix of equal columns, for each frequency if transfer_function is a
+    # stack with frequencies along the first axis
+    tf = np.asarray(transfer_function)[..., np.newaxis]
+
+    eff_conn = tau_m * J * K * tf * delay_term
+
+    return eff_conn
+
+
+def power_spectra(tau_m, dimension, J, K, delay_dist_matrix, N, firing_rates,
+                  transfer_function, omegas):
+    """
+    Power spectra of all populations at all omegas.
+
+    Solves for the propagators Q = (1 - MH)^-1 of all frequencies at once and
+    computes diag(Q D Q^H) with D = diag(firing_rates / N) as row-wise
+    weighted sums of |Q|**2, without forming the full covariance matrices.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in s.
+    dimension: int
+        Number of populations.
+    J: np.ndarray
+        Weight matrix in mV.
+    K: np.ndarray
+        Indegree matrix.
+    delay_dist_matrix: np.ndarray
+        Delay distribution matrices with shape (n_omega, dimension,
+        dimension).
+    N: np.ndarray
+        Population sizes.
+    firing_rates: np.ndarray
+        Firing rates in Hz.
+    transfer_function: np.ndarray
+        Transfer functions in Hz/mV with shape (n_omega, dimension).
+    omegas: np.ndarray
+        Input angular frequencies in Hz.
+
+    Returns:
+    --------
+    np.ndarray
+        Power spectra in Hz**2 with shape (dimension, n_omega).
+    """
+    mirror = _mirror_map(omegas)
+    if mirror is not None:
+        rep, inverse, conj = mirror
+        half = power_spectra(tau_m, dimension, J, K, delay_dist_matrix[rep],
+                             N, firing_rates, transfer_function[rep],
+                             np.asarray(omegas)[rep])
+        # power spectra are real, conjugation is not needed
+        return half[:, inverse]
+
+    MH = effective_connectivity(omegas, transfer_function, tau_m, J, K,
+                                dimension, delay_dist_matrix)
+    identity = np.identity(int(dimension))
+    Q = np.linalg.solve(identity - MH, np.broadcast_to(identity, MH.shape))
+    power = np.dot(Q.real**2 + Q.imag**2, firing_rates / N)
+    return np.transpose(power)
+
+
+# eigenvalues with shape (dimension, n_omega), right and left eigenvectors
+# with shape (dimension, dimension, n_omega), laid out as returned by
+# meanfield_calcs.eigen_spectra
+EigenDecomposition = namedtuple('EigenDecomposition',
+                                ['eigvals', 'reigvecs', 'leigvecs'])
+
+
+def eigen_decomposition(tau_m, dimension, J, K, delay_dist_matrix,
+                        transfer_function, omegas, matrix):
+    """
+    Eigendecomposition of matrix at all omegas.
+
+    The matrices of all frequencies are stacked and decomposed with a single
+    call to np.linalg.eig, so that eigenvalues, right and left eigenvectors
+    are obtained together.
+
+    Parameters:
+    -----------
+    tau_m: float
+        Membrane time constant in s.
+    dimension: int
+        Number of populations.
+    J: np.ndarray
+        Weight matrix in mV.
+    K: np.ndarray
+        Indegree matrix.
+    delay_dist_matrix: np.ndarray
+        Delay distribution matrices with shape (n_omega, dimension,
+        dimension).
+    transfer_function: np.ndarray
+        Transfer functions in Hz/mV with shape (n_omega, dimension).
+    omegas: np.ndarray
+        Input angular frequencies in Hz.
+    matrix: str
+        String specifying which matrix is analysed. Options are the effective
+        connectivity matrix 'MH', the propagator 'prop' and the inverse
+        propagator 'prop_inv'.
+
+    Returns:
+    --------
+    EigenDecomposition
+    """
+    mirror = _mirror_map(omegas)
+    if mirror is not None:
+        rep, inverse, conj = mirror
+        half = eigen_decomposition(tau_m, dimension, J, K,
+                                   delay_dist_matrix[rep],
+                                   transfer_function[rep],
+                                   np.asarray(omegas)[rep], matrix)
+        return EigenDecomposition(*[_unfold_mirrored(field, inverse, conj,
+                                                     axis=-1)
+                                    for field in half])
+
+    MH = effective_connectivity(omegas, transfer_function, tau_m, J, K,
+                                dimension, delay_dist_matrix)
+
+    if matrix == 'MH':
+        M = MH
+    elif matrix in ['prop', 'prop_inv']:
+        Q = np.linalg.inv(np.identity(int(dimension)) - MH)
+        M = np.matmul(Q, MH)
+        if matrix == 'prop_inv':
+            M = np.linalg.inv(M)
+    else:
+        raise ValueError('Matrix {} not implemented!'.format(matrix))
+
+    eig, vr = np.linalg.eig(M)
+    vl = np.linalg.inv(vr)
+
+    return EigenDecomposition(np.transpose(eig),
+                              np.transpose(vr, (1, 2, 0)),
+                              np.transpose(vl, (2, 1, 0)))
@@ -12,12 +12,21 @@ Options:
 
 from __future__ import print_function
 
+import os
+import json
+import shutil
+import tempfile
+import warnings
+from collections import OrderedDict
+from collections.abc import Mapping
 import numpy as np
 import yaml
-import hashlib as hl
+import h5py
 import h5py_wrapper.wrapper as h5
 
-from . import ureg
+from . import ureg, __version__
+from . import cache
+from .cache import content_hash
 
 def val_unit_to_quantities(dict_of_val_unit_dicts):
     """
@@ -67,7 +76,9 @@ def quantities_to_val_unit(dict_of_quantities):
     Split up value and unit of each quantiy and save them in a dictionary
     of the structure: {'<parameter1>:{'val':<value>, 'unit':<unit>}, ...}
 
-    Lists of quantities are handled seperately. Anything else but quantities, is
+    Lists of quantities are handled seperately. Lists of quantities or arrays
+    are stacked along a leading axis and lists of named tuples are stored
+    field by field, like named tuples. Anything else but quantities, is
     stored just the way it is given.
 
     Parameters:
@@ -90,8 +101,23 @@ def quantities_to_val_unit(dict_of_quantities):
             if any(isinstance(part, str) for part in quantity):
                 converted_dict[quantity_key] = quantity
             elif any(isinstance(part, ureg.Quantity) for part in quantity):
-                converted_dict[quantity_key]['val'] = np.stack([array.magnitude for array in quantity])
-                converted_dict[quantity_key]['unit'] = str(quantity[0].units)
+                unit = quantity[0].units
+                converted_dict[quantity_key]['val'] = np.stack(
+                    [array.to(unit).magnitude for array in quantity])
+                converted_dict[quantity_key]['unit'] = str(unit)
+            elif quantity and all(isinstance(part, tuple)
+                                  and hasattr(part, '_fields')
+                                  for part in quantity):
+                fields = quantity[0]._fields
+                converted_dict[quantity_key] = quantities_to_val_unit(
+                    OrderedDict((field, [part[i] for part in quantity])
+                                for i, field in enumerate(fields)))
+            elif quantity:
+                converted_dict[quantity_key] = np.stack(quantity)
+        # named tuples of results are stored like dictionaries
+        elif isinstance(quantity, tuple) and hasattr(quantity, '_asdict'):
+            converted_dict[quantity_key] = quantities_to_val_unit(
+                quantity._asdict())
         # quantities are converted to val unit dictionary
         elif isinstance(quantity, ureg.Quantity):
             converted_dict[quantity_key]['val'] = quantity.magnitude
@@ -102,7 +128,14 @@ def quantities_to_val_unit(dict_of_quantities):
     return converted_dict
 
 
-def load_params(file_path):
+# whether load_params stores parsed parameters in sidecar files by default
+PARAMS_SIDECAR = False
+
+# parsed parameters of each yaml file: {path: (stamp, params)}
+_params_cache = {}
+
+
+def load_params(file_path, sidecar=None):
     """
     Load and convert parameters from yaml file
 
@@ -110,6 +143,14 @@ def load_params(file_path):
     (used in yaml file) to quantities (used in implementation of functions in
     meanfield_calcs.py).
 
+    Converted parameters are cached per file, keyed by path, size and
+    modification time, such that loading an unchanged file again neither
+    parses the yaml file nor the units. Each call returns a new dictionary
+    with copies of all arrays, so the returned parameters can be modified
+    without affecting the cache. If sidecar is True, the converted
+    parameters are additionally stored in the binary file
+    <file_path>.lmt.npz, which is used by other processes.
+
     Parameters:
     -----------
     file_path : str
@@ -118,31 +159,107 @@ def load_params(file_path):
             val: <value1>
             unit: <unit1>
         ...
+    sidecar : bool
+        whether to read and write the sidecar file; PARAMS_SIDECAR if None
 
     Returns:
     --------
     dict
         dictionary containing all converted parameters as quantities
     """
+    if sidecar is None:
+        sidecar = PARAMS_SIDECAR
+    path = os.path.abspath(file_path)
+    stamp = _file_stamp(path)
+    cached = _params_cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        if sidecar and not os.path.exists(path + '.lmt.npz'):
+            _write_params_sidecar(path, stamp, cached[1])
+        return _copy_params(cached[1])
 
-    # try to load yaml file
-    with open(file_path, 'r') as stream:
-        try:
-            params = yaml.safe_load(stream)
-        except yaml.YAMLError as exc:
-            print(exc)
+    params_converted = _read_params_sidecar(path, stamp) if sidecar else None
+    if params_converted is None:
+        # try to load yaml file
+        with open(file_path, 'r') as stream:
+            try:
+                params = yaml.safe_load(stream)
+            except yaml.YAMLError as exc:
+                print(exc)
+
+        # convert parameters to quantities
+        params_converted = val_unit_to_quantities(params)
+        if sidecar:
+            _write_params_sidecar(path, stamp, params_converted)
 
-    # convert parameters to quantities
-    params_converted = val_unit_to_quantities(params)
+    _params_cache[path] = (stamp, _copy_params(params_converted))
 
     # return converted network parameters
     return params_converted
 
 
+def _copy_params(params):
+    """ Returns copy of params with copies of all array values. """
+    return {key: value.copy() if isinstance(value, np.ndarray)
+            or isinstance(getattr(value, 'magnitude', None), np.ndarray)
+            else value
+            for key, value in params.items()}
+
+
+def _file_stamp(path):
+    """ Returns (size, modification time in ns) of file. """
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _read_params_sidecar(path, stamp):
+    """
+    Returns parameters stored in sidecar file of yaml file path, or None if
+    it does not exist or belongs to a different version of the file.
+    """
+    try:
+        with np.load(path + '.lmt.npz', allow_pickle=False) as data:
+            arrays = dict(data)
+        header = json.loads(str(arrays.pop('__header__')))
+    except (OSError, ValueError, KeyError):
+        return None
+    if header['stamp'] != list(stamp) or header['version'] != __version__:
+        return None
+    return cache._decode(header['structure'], arrays)
+
+
+def _write_params_sidecar(path, stamp, params):
+    """
+    Store parameters in sidecar file of yaml file path. Parameters that
+    cannot be stored, or a read-only directory, are silently skipped.
+    """
+    arrays = {}
+    try:
+        structure = cache._encode(params, arrays)
+    except TypeError:
+        return
+    arrays['__header__'] = np.array(json.dumps(
+        {'stamp': list(stamp), 'version': __version__,
+         'structure': structure}))
+    try:
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path),
+                                             suffix='.tmp')
+    except OSError:
+        return
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temporary, path + '.lmt.npz')
+    except OSError:
+        os.remove(temporary)
+
+
 def create_hash(params, param_keys):
     """
     Create unique hash from values of parameters specified in param_keys.
 
+    The hash is calculated by cache.content_hash, so it does not depend on the
+    units the parameters are given in, nor on numpy's print options.
+
     Parameters:
     -----------
     params : dict
@@ -155,18 +272,12 @@ def create_hash(params, param_keys):
     str
         Hash string.
     """
-
-    label = ''
-    # add all param values to one string
-    for key in sorted(list(param_keys)):
-        label += str(params[key])
-    # create and return hash (label must be encoded)
-    return hl.md5(label.encode('utf-8')).hexdigest()
+    return content_hash({key: params[key] for key in param_keys})
 
 
-def save(output_key, output, file_name):
+def save(output_key, output, file_name, backend=None):
     """
-    Save data and given parameters in h5 file.
+    Save data and given parameters in h5 file or another storage backend.
 
     By default the output name will be <label>_<hash>.h5, where the hash is
     created using network_params. But you can either specify an ouput_name
@@ -174,26 +285,390 @@ def save(output_key, output, file_name):
 
     Parameters:
     -----------
-    results_dict : dict
-        Dictionary containing all calculated results.
-    network_params : dict
-        Dictionary containing network parameters as quantities.
-    analysis_params: dict
-        Dictionary containing analysis parameters as quantities.
+    output_key: str
+        Key under which output is stored.
+    output: dict
+        Dictionary containing quantities, arrays and parameters.
+    file_name: str
+        String specifying output file name.
+    backend: str or object
+        Storage backend, see get_backend. HDF5 by default.
+
+    Returns:
+    --------
+    None
+    """
+    get_backend(backend, file_name).save(output_key, output, file_name)
+
+
+def save_incremental(output_key, output, file_name, start={},
+                     compression=None):
+    """
+    Write outputs into chunked, resizable datasets of an h5 file.
+
+    Quantities are stored as groups containing the dataset 'val', which
+    carries its unit as attribute 'unit', and the dataset 'unit', such that
+    the file can be read with load_h5. Named tuples are stored as groups of
+    their fields and lists of results are stacked along a leading axis.
+    Outputs listed in start are lists of which the first start[key] items
+    have already been written by a previous call: if the stored dataset still
+    has this length, only the new items are appended, otherwise the dataset
+    is rewritten.
+
+    Parameters:
+    -----------
+    output_key: str
+        Group under which the outputs are stored.
+    output: dict
+        Dictionary containing the outputs to be written, given as quantities,
+        arrays, named tuples or lists of these.
+    file_name: str
+        String specifying output file name.
+    start: dict
+        Dictionary containing the number of items of list outputs already
+        stored in the file.
+    compression: str
+        Optional compression filter of new datasets, e.g. 'gzip' or 'lzf'.
+
+    Returns:
+    --------
+    None
+    """
+    with h5py.File(file_name, 'a') as f:
+        group = f.require_group(output_key)
+        group.attrs['_key_type'] = 'str'
+        for key, value in output.items():
+            if isinstance(value, list) and not value:
+                continue
+            _write_incremental(group, key, value, start.get(key), compression)
+
+
+def _write_incremental(parent, key, value, start, compression):
+    """ Write value into parent[key], see save_incremental. """
+    items = value if isinstance(value, list) else None
+    first = items[0] if items else value
+    if isinstance(first, tuple) and hasattr(first, '_fields'):
+        group = parent.require_group(key)
+        group.attrs['_key_type'] = 'str'
+        for i, field in enumerate(first._fields):
+            _write_incremental(group, field,
+                               [item[i] for item in items]
+                               if items is not None else value[i],
+                               start, compression)
+        return
+
+    if isinstance(first, ureg.Quantity):
+        group = parent.require_group(key)
+        group.attrs['_key_type'] = 'str'
+        unit = str(first.units)
+        if start and 'val' in group and 'unit' in group['val'].attrs:
+            unit = group['val'].attrs['unit']
+        if items is None:
+            magnitudes = value.to(unit).magnitude
+        else:
+            magnitudes = [item.to(unit).magnitude for item in items]
+        dataset = _write_dataset(group, 'val', magnitudes, items is not None,
+                                 start, compression)
+        dataset.attrs['unit'] = unit
+        if 'unit' in group:
+            del group['unit']
+        unit_dataset = group.create_dataset('unit', data=unit)
+        unit_dataset.attrs['_key_type'] = 'str'
+        unit_dataset.attrs['_value_type'] = 'str'
+    else:
+        _write_dataset(parent, key, value, items is not None, start,
+                       compression)
+
+
+def _write_dataset(parent, name, value, stacked, start, compression):
+    """
+    Write value, a list of items if stacked, into dataset parent[name].
+
+    Items after start are appended if the dataset contains exactly start
+    items, otherwise the dataset is created anew.
+    """
+    if (stacked and start and name in parent
+            and parent[name].maxshape[0] is None
+            and parent[name].shape[0] == start
+            and parent[name].shape[1:] == np.shape(value[0])):
+        dataset = parent[name]
+        new = np.stack(value[start:])
+        dataset.resize(start + len(new), axis=0)
+        dataset[start:] = new
+        return dataset
+
+    data = np.stack(value) if stacked else np.asarray(value)
+    if name in parent:
+        del parent[name]
+    if data.ndim == 0:
+        # scalar datasets cannot be chunked
+        dataset = parent.create_dataset(name, data=data)
+    else:
+        maxshape = ((None,) + data.shape[1:] if stacked else data.shape)
+        dataset = parent.create_dataset(name, data=data, chunks=True,
+                                        maxshape=maxshape,
+                                        compression=compression)
+    dataset.attrs['_key_type'] = 'str'
+    dataset.attrs['_value_type'] = 'ndarray'
+    return dataset
+
+
+def save_block(output_key, block, file_name, selections, shapes,
+               overwrite=False):
+    """
+    Write one block of outputs into slices of preallocated h5 datasets.
+
+    The datasets are laid out like the ones written by save, i.e. quantities
+    are stored as groups containing the datasets 'val' and 'unit', and can be
+    read with load_h5. Datasets are created with their full shapes when they
+    do not exist yet (or overwrite is set), such that outputs can be written
+    block by block without holding the complete arrays in memory.
+
+    Parameters:
+    -----------
+    output_key: str
+        Group under which the outputs are stored.
+    block: dict
+        Dictionary containing the block of each output as quantity or array.
+    file_name: str
+        String specifying output file name.
+    selections: dict
+        Dictionary containing the index (tuple of slices) of the block of
+        each output within its complete dataset.
+    shapes: dict
+        Dictionary containing the complete shape of each output.
+    overwrite: bool
+        Whether existing datasets are replaced by new, empty ones.
+
+    Returns:
+    --------
+    None
+    """
+    with h5py.File(file_name, 'a') as f:
+        group = f.require_group(output_key)
+        group.attrs['_key_type'] = 'str'
+        for key, value in block.items():
+            if isinstance(value, ureg.Quantity):
+                parent = group.require_group(key)
+                parent.attrs['_key_type'] = 'str'
+                name = 'val'
+                if 'unit' in parent:
+                    del parent['unit']
+                unit = parent.create_dataset('unit', data=str(value.units))
+                unit.attrs['_key_type'] = 'str'
+                unit.attrs['_value_type'] = 'str'
+                value = value.magnitude
+            else:
+                parent = group
+                name = key
+            value = np.asarray(value)
+
+            if name in parent and (overwrite
+                                   or parent[name].shape != shapes[key]
+                                   or parent[name].dtype != value.dtype):
+                del parent[name]
+            if name not in parent:
+                dataset = parent.create_dataset(name, shape=shapes[key],
+                                                dtype=value.dtype)
+                dataset.attrs['_key_type'] = 'str'
+                dataset.attrs['_value_type'] = 'ndarray'
+            parent[name][selections[key]] = value
+
+
+def save_frequency_slices(output_key, output, file_name, positions):
+    """
+    Insert slices of new frequencies into datasets of existing h5 file.
+
+    Only the datasets of outputs already stored under output_key are
+    extended. If the new frequencies are appended at the end of a resizable
+    dataset, only the new slices are written. Otherwise the dataset is
+    rewritten once as resizable, chunked dataset, such that following
+    extensions only need to write the new slices. Datasets whose shape does
+    not match the new slices are deleted with a warning, such that the file
+    never contains results on different frequency grids.
+
+    Parameters:
+    -----------
+    output_key: str
+        Group under which the outputs are stored.
+    output: dict
+        Dictionary of format {'<key>': (<new slices>, <frequency axis>)}, the
+        new slices given as quantity, array or named tuple of these. Outputs
+        with frequency axis None are overwritten.
     file_name: str
         String specifying output file name.
+    positions: np.ndarray
+        Sorted positions of the new frequencies in the extended frequency
+        grid.
 
     Returns:
     --------
     None
     """
-    # convert data into format usable in h5 file
-    output = quantities_to_val_unit(output)
-    output_dict = {}
-    output_dict[output_key] = output
+    with h5py.File(file_name, 'a') as f:
+        if output_key not in f:
+            return
+        group = f[output_key]
+        for key, (value, axis) in output.items():
+            if key in group:
+                _insert_frequency_slices(group, key, value, axis, positions)
+
+
+def _insert_frequency_slices(group, name, value, axis, positions):
+    """ Insert new slices into dataset group[name], see save_frequency_slices. """
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        for field, field_value in zip(value._fields, value):
+            if field in group[name]:
+                _insert_frequency_slices(group[name], field, field_value,
+                                         axis, positions)
+        return
+    if isinstance(value, ureg.Quantity):
+        if 'val' not in group[name] or 'unit' not in group[name]:
+            return
+        unit = _read_string(group[name]['unit'][()])
+        value = value.to(unit).magnitude
+        name = '{}/val'.format(name)
+    dataset = group[name]
+    if not isinstance(dataset, h5py.Dataset):
+        # nothing stored for this output, e.g. an empty group
+        return
+    value = np.asarray(value)
+
+    if axis is None:
+        dataset[...] = value
+        return
+
+    axis = axis % dataset.ndim
+    n_old = dataset.shape[axis]
+    n_new = len(positions)
+    if value.shape[axis] != n_new:
+        raise ValueError('Number of new slices of {} does not match '
+                         'positions.'.format(name))
+    other_axes_match = (dataset.ndim == value.ndim
+                        and all(dataset.shape[i] == value.shape[i]
+                                for i in range(value.ndim) if i != axis))
+    if not other_axes_match or (n_new and positions[-1] >= n_old + n_new):
+        warnings.warn('Stored {} does not match the frequencies before '
+                      'extension and is deleted.'.format(dataset.name))
+        del group[name]
+        return
+    shape = list(dataset.shape)
+    shape[axis] = n_old + n_new
+
+    if (dataset.maxshape[axis] is None
+            and np.array_equal(positions, np.arange(n_old, n_old + n_new))):
+        dataset.resize(n_old + n_new, axis=axis)
+        selection = [slice(None)] * dataset.ndim
+        selection[axis] = slice(n_old, None)
+        dataset[tuple(selection)] = value
+        return
+
+    old_positions = np.setdiff1d(np.arange(n_old + n_new), positions)
+    data = np.empty(shape, dtype=np.result_type(dataset.dtype, value.dtype))
+    selection = [slice(None)] * dataset.ndim
+    selection[axis] = old_positions
+    data[tuple(selection)] = dataset[()]
+    selection[axis] = positions
+    data[tuple(selection)] = value
 
-    # save output
-    h5.save(file_name, output_dict, overwrite_dataset=True)
+    attrs = dict(dataset.attrs)
+    maxshape = list(shape)
+    maxshape[axis] = None
+    del group[name]
+    dataset = group.create_dataset(name, data=data, chunks=True,
+                                   maxshape=tuple(maxshape))
+    dataset.attrs.update(attrs)
+
+
+def save_sweep(file_name, grid, results):
+    """
+    Write results of parameter sweep points into an indexed h5 file.
+
+    The file contains the swept values of each parameter in group 'grid',
+    one dataset per output in group 'outputs', with the grid axes leading,
+    and the boolean dataset 'done' marking the points already calculated.
+    Datasets are created when the first result of an output is written, with
+    units stored as attributes.
+
+    Parameters:
+    -----------
+    file_name: str
+        String specifying output file name.
+    grid: dict
+        Ordered dictionary of format {'<param>': <values>} with the values
+        given as quantities or arrays.
+    results: list
+        List of (index, output) of calculated points, with index being the
+        index of the point in the grid and output a dictionary of format
+        {'<output>': <quantity or array>}.
+
+    Returns:
+    --------
+    None
+    """
+    shape = tuple(len(values) for values in grid.values())
+    with h5py.File(file_name, 'a') as f:
+        if 'grid' not in f:
+            group = f.create_group('grid')
+            group.attrs['names'] = [str(name) for name in grid]
+            for name, values in grid.items():
+                if isinstance(values, ureg.Quantity):
+                    dataset = group.create_dataset(name, data=values.magnitude)
+                    dataset.attrs['unit'] = str(values.units)
+                else:
+                    group.create_dataset(name, data=np.asarray(values))
+            f.create_dataset('done', shape=shape, dtype=bool)
+        outputs = f.require_group('outputs')
+
+        for index, output in results:
+            for name, value in output.items():
+                unit = None
+                if isinstance(value, ureg.Quantity):
+                    unit = str(value.units)
+                    value = value.magnitude
+                value = np.asarray(value)
+                if name not in outputs:
+                    dataset = outputs.create_dataset(
+                        name, shape=shape + value.shape, dtype=value.dtype,
+                        chunks=(1,) * len(shape) + value.shape,
+                        fillvalue=np.nan if value.dtype.kind in 'fc' else 0)
+                    if unit is not None:
+                        dataset.attrs['unit'] = unit
+                outputs[name][index] = value
+            f['done'][index] = True
+
+
+def load_sweep(file_name):
+    """
+    Load parameter sweep written by save_sweep.
+
+    Parameters:
+    -----------
+    file_name: str
+        String specifying input file name.
+
+    Returns:
+    --------
+    grid: dict
+        Ordered dictionary containing swept values of each parameter.
+    outputs: dict
+        Dictionary containing all outputs, with grid axes leading.
+    done: np.ndarray
+        Boolean array marking the points already calculated.
+    """
+    def read(dataset):
+        """ Read dataset and attach unit, if stored. """
+        if 'unit' in dataset.attrs:
+            return dataset[()] * ureg.parse_expression(dataset.attrs['unit'])
+        return dataset[()]
+
+    with h5py.File(file_name, 'r') as f:
+        grid = OrderedDict((str(name), read(f['grid'][name]))
+                           for name in f['grid'].attrs['names'])
+        outputs = {name: read(dataset)
+                   for name, dataset in f.get('outputs', {}).items()}
+        done = f['done'][()]
+    return grid, outputs, done
 
 
 def load_from_h5(network_params={}, param_keys=[], input_name=''):
@@ -255,11 +730,26 @@ def load_from_h5(network_params={}, param_keys=[], input_name=''):
     return analysis_params, results
 
 
-def load_h5(filename):
+def load_h5(filename, lazy=False):
     """
+    Load h5 file and convert its contents to quantities.
+
+    Parameters:
+    -----------
     filename: str
         default filename format is ''<label>_<hash>.h5'
+    lazy: bool
+        If True, nothing is read up front. Instead a LazyGroup is returned,
+        whose datasets are read slice by slice when indexed.
+
+    Returns:
+    --------
+    dict or LazyGroup
+        Contents of the file.
     """
+    if lazy:
+        return LazyGroup(LazyFile(filename), '/')
+
     try:
         raw_data = h5.load(filename)
     except OSError:
@@ -269,3 +759,335 @@ def load_h5(filename):
     for key in sorted(raw_data.keys()):
         data[key] = val_unit_to_quantities(raw_data[key])
     return data
+
+
+class LazyFile(object):
+    """
+    h5 file that is opened when one of its datasets is accessed first.
+
+    Parameters:
+    -----------
+    filename: str
+        Name of the h5 file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = None
+
+    @property
+    def file(self):
+        """ Opened h5py.File. """
+        if self._file is None:
+            self._file = h5py.File(self.filename, 'r')
+        return self._file
+
+    def close(self):
+        """ Close file. """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class LazyGroup(Mapping):
+    """
+    Read-only mapping of the members of a group of a LazyFile.
+
+    Members are LazyGroups or LazyDatasets. Groups containing the datasets
+    'val' and 'unit', as written by save, appear as a single LazyDataset
+    with unit.
+
+    Parameters:
+    -----------
+    lazy_file: LazyFile
+        File containing the group.
+    path: str
+        Path of the group within the file.
+    """
+
+    def __init__(self, lazy_file, path):
+        self.lazy_file = lazy_file
+        self.path = path
+
+    def __getitem__(self, key):
+        path = '{}/{}'.format(self.path.rstrip('/'), key)
+        obj = self.lazy_file.file[path]
+        if isinstance(obj, h5py.Dataset):
+            return LazyDataset(self.lazy_file, path)
+        if 'val' in obj and 'unit' in obj and len(obj) == 2:
+            return LazyDataset(self.lazy_file, path + '/val',
+                               unit=_read_string(obj['unit'][()]))
+        return LazyGroup(self.lazy_file, path)
+
+    def __iter__(self):
+        return iter(self.lazy_file.file[self.path])
+
+    def __len__(self):
+        return len(self.lazy_file.file[self.path])
+
+    def close(self):
+        """ Close the underlying file. """
+        self.lazy_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class LazyDataset(object):
+    """
+    Proxy of an h5 dataset, reading only the indexed slices.
+
+    Indexing returns the selected slice as quantity, if the dataset has a
+    unit, and as array otherwise. Contiguous, uncompressed datasets are read
+    through a memory map of the file, such that slices are not copied.
+
+    Parameters:
+    -----------
+    lazy_file: LazyFile
+        File containing the dataset.
+    path: str
+        Path of the dataset within the file.
+    unit: str
+        Unit of the dataset. If None, the attribute 'unit' of the dataset is
+        used, if existing.
+    """
+
+    def __init__(self, lazy_file, path, unit=None):
+        self.lazy_file = lazy_file
+        self.path = path
+        dataset = self.dataset
+        if unit is None and 'unit' in dataset.attrs:
+            unit = _read_string(dataset.attrs['unit'])
+        self.unit = unit
+        self.shape = dataset.shape
+        self.dtype = dataset.dtype
+        self._memmap = None
+
+    @property
+    def dataset(self):
+        """ Underlying h5py.Dataset. """
+        return self.lazy_file.file[self.path]
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _data(self):
+        """ Memory map of the dataset if possible, else the dataset. """
+        if self._memmap is None:
+            dataset = self.dataset
+            offset = dataset.id.get_offset()
+            if (offset is None or dataset.chunks is not None
+                    or dataset.compression is not None or not self.shape
+                    or self.dtype.kind not in 'biufc'):
+                return dataset
+            self._memmap = np.memmap(self.lazy_file.filename, mode='r',
+                                     dtype=self.dtype, shape=self.shape,
+                                     offset=offset)
+        return self._memmap
+
+    def __getitem__(self, selection):
+        value = self._data()[selection]
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        if self.unit is not None:
+            return ureg.Quantity(value, self.unit)
+        return value
+
+    def read(self):
+        """ Read complete dataset. """
+        return self[()]
+
+    def __array__(self, dtype=None):
+        return np.asarray(self._data()[()], dtype=dtype)
+
+    def __repr__(self):
+        return '<LazyDataset {} shape={} dtype={} unit={}>'.format(
+            self.path, self.shape, self.dtype, self.unit)
+
+
+def _read_string(value):
+    """ Decode string read from h5 file. """
+    return value.decode('utf-8') if isinstance(value, bytes) else str(value)
+
+
+class HDF5Backend(object):
+    """
+    Storage backend writing outputs into h5 files using h5py_wrapper.
+
+    Quantities are stored as groups containing the datasets 'val' and 'unit'.
+    Named tuples, like fast.EigenDecomposition, and lists of them are stored
+    as groups of their fields, see quantities_to_val_unit.
+    """
+
+    name = 'hdf5'
+
+    def save(self, output_key, output, file_name):
+        """ Save output under output_key in h5 file file_name. """
+        # convert data into format usable in h5 file
+        output = quantities_to_val_unit(output)
+        output_dict = {}
+        output_dict[output_key] = output
+
+        # save output
+        h5.save(file_name, output_dict, overwrite_dataset=True)
+
+    def load(self, file_name, lazy=False):
+        """ Load contents of h5 file file_name, see load_h5. """
+        return load_h5(file_name, lazy=lazy)
+
+
+class NpyDirectoryBackend(object):
+    """
+    Storage backend writing outputs into a directory of .npy files.
+
+    Each array is stored in its own file <output_key>/<key>.npy, which can be
+    memory-mapped with np.load(..., mmap_mode='r') without h5py. Units,
+    scalars, strings and the structure of the outputs are stored in the JSON
+    file manifest.json. Each entry of the manifest is a dictionary with
+    'type' 'array' (with 'file' and 'unit'), 'value' (with 'value' and
+    'unit') or 'group' (with 'items').
+    """
+
+    name = 'npy'
+    manifest_name = 'manifest.json'
+
+    def _read_manifest(self, directory):
+        try:
+            with open(os.path.join(directory, self.manifest_name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, output_key, output, file_name):
+        """ Save output under output_key in directory file_name. """
+        os.makedirs(file_name, exist_ok=True)
+        output_directory = os.path.join(file_name, output_key)
+        if os.path.isdir(output_directory):
+            shutil.rmtree(output_directory)
+        manifest = self._read_manifest(file_name)
+        manifest[output_key] = self._encode(
+            quantities_to_val_unit(output), file_name, output_key)
+        # replace manifest atomically
+        handle, temporary = tempfile.mkstemp(dir=file_name, suffix='.tmp')
+        with os.fdopen(handle, 'w') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(temporary, os.path.join(file_name, self.manifest_name))
+
+    def _encode(self, value, directory, path, unit=None):
+        """
+        Write arrays of value into directory and return its manifest entry.
+        """
+        if isinstance(value, dict) and set(value) == {'val', 'unit'}:
+            return self._encode(value['val'], directory, path,
+                                unit=str(value['unit']))
+        if isinstance(value, dict):
+            return {'type': 'group',
+                    'items': {str(key): self._encode(
+                                  item, directory,
+                                  '{}/{}'.format(path, key))
+                              for key, item in value.items()}}
+        if isinstance(value, np.ndarray) and value.ndim > 0:
+            file_path = path + '.npy'
+            os.makedirs(os.path.dirname(os.path.join(directory, file_path)),
+                        exist_ok=True)
+            np.save(os.path.join(directory, file_path), value,
+                    allow_pickle=False)
+            return {'type': 'array', 'file': file_path, 'unit': unit}
+        if isinstance(value, (np.ndarray, np.generic)):
+            value = value.item()
+        if isinstance(value, complex):
+            value = [value.real, value.imag]
+            return {'type': 'value', 'value': value, 'unit': unit,
+                    'complex': True}
+        return {'type': 'value', 'value': value, 'unit': unit}
+
+    def load(self, file_name, lazy=False):
+        """
+        Load contents of directory file_name. If lazy, arrays are memory-mapped
+        instead of read.
+        """
+        manifest = self._read_manifest(file_name)
+        return {key: self._decode(entry, file_name, lazy)
+                for key, entry in sorted(manifest.items())}
+
+    def _decode(self, entry, directory, lazy):
+        """ Inverse of _encode. """
+        if entry['type'] == 'group':
+            return {key: self._decode(item, directory, lazy)
+                    for key, item in entry['items'].items()}
+        if entry['type'] == 'array':
+            value = np.load(os.path.join(directory, entry['file']),
+                            mmap_mode='r' if lazy else None,
+                            allow_pickle=False)
+        else:
+            value = entry['value']
+            if entry.get('complex'):
+                value = complex(*value)
+            elif isinstance(value, list) and not any(
+                    isinstance(item, str) for item in value):
+                value = np.array(value)
+        if entry['unit'] is not None:
+            return ureg.Quantity(value, entry['unit'])
+        return value
+
+
+# available storage backends
+BACKENDS = {'hdf5': HDF5Backend, 'npy': NpyDirectoryBackend}
+
+
+def get_backend(backend=None, file_name=''):
+    """
+    Return storage backend.
+
+    Parameters:
+    -----------
+    backend: str or object
+        Name of a backend in BACKENDS, e.g. 'hdf5' or 'npy', or an object
+        providing the methods save(output_key, output, file_name) and
+        load(file_name, lazy). If None, 'npy' is used if file_name is an
+        existing directory and 'hdf5' otherwise.
+    file_name: str
+        File the backend is used for.
+
+    Returns:
+    --------
+    object
+        Storage backend.
+    """
+    if backend is None:
+        backend = 'npy' if os.path.isdir(file_name) else 'hdf5'
+    if isinstance(backend, str):
+        try:
+            return BACKENDS[backend]()
+        except KeyError:
+            raise ValueError('Unknown storage backend: {}'.format(backend))
+    return backend
+
+
+def load(file_name, lazy=False, backend=None):
+    """
+    Load all outputs stored in file_name.
+
+    Parameters:
+    -----------
+    file_name: str
+        h5 file or directory.
+    lazy: bool
+        If True, data is only read when accessed, see load_h5 and
+        NpyDirectoryBackend.
+    backend: str or object
+        Storage backend, see get_backend.
+
+    Returns:
+    --------
+    dict
+        Dictionary of format {'<output_key>': {'<key>': <quantity>, ...}}.
+    """
+    return get_backend(backend, file_name).load(file_name, lazy=lazy)
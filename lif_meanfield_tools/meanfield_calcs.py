@@ -7,6 +7,8 @@ executed.
 Functions:
 ----------
 firing_rates
+firing_rates_batch
+firing_rates_continuation
 mean
 standard_deviation
 transfer_function_1p_taylor
@@ -16,6 +18,7 @@ delay_dist_matrix
 delay_dist_matrix_single
 sensitivity_measure
 power_spectra
+eigen_decomposition
 eigen_spectra
 additional_rates_for_fixed_input
 fit_transfer_function
@@ -24,9 +27,6 @@ linear_interpolation_alpha
 eigenvals_branches_rate
 xi_of_k
 solve_chareq_rate_boxcar
-_standard_deviation
-_mean
-_effective_connectivity
 _effective_connectivity_rate
 _lambda_of_alpha_integral
 _d_lambda_d_alpha
@@ -35,6 +35,7 @@ _xi_eff_r
 _d_xi_eff_s_d_lambda
 _d_xi_eff_r_d_lambda
 _solve_chareq_numerically_alpha
+_omegas_in_hz
 """
 from __future__ import print_function
 import warnings
@@ -43,16 +44,18 @@ import pint
 import scipy.optimize as sopt
 import scipy.integrate as sint
 import scipy.misc as smisc
-from scipy.special import zetac, erf
 
 
 from . import ureg
 from . import aux_calcs
+from . import fast
 
 @ureg.wraps(ureg.Hz, (None, ureg.s, ureg.s, ureg.s, ureg.mV, ureg.mV, None,
-                      ureg.mV, ureg.mV, ureg.Hz, None, None, ureg.Hz, ureg.Hz))
+                      ureg.mV, ureg.mV, ureg.Hz, None, None, ureg.Hz, ureg.Hz,
+                      None, None, None, None, None))
 def firing_rates(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J, j,
-                 nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
+                 nu_ext, K_ext, g, nu_e_ext, nu_i_ext, solver='relaxation',
+                 tol=1e-5, maxiter=1000, siegert_table=None, nu_init=None):
     '''
     Returns vector of population firing rates in Hz.
 
@@ -86,42 +89,186 @@ def firing_rates(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J, j,
         firing rate of additional external excitatory Poisson input
     nu_i_ext: Quantity(float, 'hertz')
         firing rate of additional external inhibitory Poisson input
+    solver: str
+        Fixed-point iteration used to find the self-consistent rates. Options
+        are 'relaxation' (default), 'newton' and 'anderson'. If 'newton' or
+        'anderson' do not converge, the relaxation is used instead.
+    tol: float
+        Tolerance in Hz. The relaxation stops if the maximal change of the
+        rates within one step falls below tol, 'newton' and 'anderson' stop if
+        the maximal deviation from self-consistency does.
+    maxiter: int
+        Maximal number of iterations of 'newton' and 'anderson'.
+    siegert_table: aux_calcs.SiegertTable
+        Optional precomputed table used instead of the exact Siegert formula.
+    nu_init: Quantity(np.ndarray, 'hertz')
+        Optional initial rates of the iteration, e.g. the rates of a similar
+        network. Zero by default.
 
     Returns:
     --------
     Quantity(np.ndarray, 'hertz')
         Array of firing rates of each population in hertz.
     '''
-    def rate_function(mu, sigma):
-        """ calculate stationary firing rate with given parameters """
-        return aux_calcs.nu0_fb433(tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu,
-                                   sigma)
+    if isinstance(nu_init, ureg.Quantity):
+        nu_init = nu_init.to(ureg.Hz).magnitude
+    return fast.firing_rates(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K,
+                         J, j, nu_ext, K_ext, g, nu_e_ext, nu_i_ext,
+                         solver=solver, tol=tol, maxiter=maxiter,
+                         siegert_table=siegert_table, nu_init=nu_init)
 
-    def get_rate_difference(nu):
-        """ calculate difference between new iteration step and previous one """
-        ### new mean
-        mu = _mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext)
 
-        ### new std
-        sigma = _standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext,
-                                    g, nu_e_ext, nu_i_ext)
+@ureg.wraps(ureg.Hz, (None, ureg.s, ureg.s, ureg.s, ureg.mV, ureg.mV, None,
+                      ureg.mV, ureg.mV, ureg.Hz, None, None, ureg.Hz, ureg.Hz,
+                      None, None, None, None))
+def firing_rates_batch(dimension, tau_m, tau_s, tau_r, V_0_rel, V_th_rel, K, J,
+                       j, nu_ext, K_ext, g, nu_e_ext, nu_i_ext, tol=1e-5,
+                       siegert_table=None, nu_init=None, maxiter=10000):
+    '''
+    Returns population firing rates in Hz of many networks at once.
 
-        new_nu = np.array([x for x in list(map(rate_function, mu, sigma))])
+    All networks have the same dimension. Each parameter is either shared by
+    all networks or given for each network, stacked along a leading batch
+    axis, e.g. J of shape (B, dimension, dimension) or nu_ext of shape (B,).
+    The fixed points of all networks are found by a simultaneous relaxation
+    as in firing_rates, in which converged networks are not iterated any
+    more. Networks whose rates diverge or do not converge within maxiter
+    steps are reported by a warning.
 
-        return -nu + new_nu
+    Parameters:
+    -----------
+    dimension: int
+        Number of populations.
+    tau_m: Quantity(float or np.ndarray, 'second')
+        Membrane time constant.
+    tau_s: Quantity(float or np.ndarray, 'second')
+        Synaptic time constant.
+    tau_r: Quantity(float or np.ndarray, 'second')
+        Refractory time.
+    V_0_rel: Quantity(float or np.ndarray, 'millivolt')
+        Relative reset potential.
+    V_th_rel: Quantity(float or np.ndarray, 'millivolt')
+        Relative threshold potential.
+    K: np.ndarray
+        Indegree matrix.
+    J: Quantity(np.ndarray, 'millivolt')
+        Weight matrix.
+    j: Quantity(float or np.ndarray, 'millivolt')
+        Weight.
+    nu_ext: Quantity(float or np.ndarray, 'hertz')
+        Firing rate of external input.
+    K_ext: np.ndarray
+        Numbers of external input neurons to each population.
+    g: float or np.ndarray
+        relative inhibitory weight
+    nu_e_ext: Quantity(np.ndarray, 'hertz')
+        firing rate of additional external excitatory Poisson input
+    nu_i_ext: Quantity(np.ndarray, 'hertz')
+        firing rate of additional external inhibitory Poisson input
+    tol: float
+        Tolerance in Hz. The relaxation of a network stops if the maximal
+        change of its rates within one step falls below tol.
+    siegert_table: aux_calcs.SiegertTable
+        Optional precomputed table used instead of the exact Siegert formula.
+    nu_init: Quantity(np.ndarray, 'hertz')
+        Optional initial rates, either shared or for each network.
+    maxiter: int
+        Maximal number of relaxation steps.
 
-    # do iteration procedure, until stationary firing rates are found
-    dt = 0.05
-    y = np.zeros((2, int(dimension)))
-    eps = 1.0
-    while eps >= 1e-5:
-        delta_y = get_rate_difference(y[0])
-        y[1] = y[0] + delta_y*dt
-        epsilon = (y[1] - y[0])
-        eps = max(np.abs(epsilon))
-        y[0] = y[1]
+    Returns:
+    --------
+    Quantity(np.ndarray, 'hertz')
+        Array of firing rates with shape (B, dimension).
+    '''
+    if isinstance(nu_init, ureg.Quantity):
+        nu_init = nu_init.to(ureg.Hz).magnitude
+    return fast.firing_rates_batch(dimension, tau_m, tau_s, tau_r, V_0_rel,
+                                   V_th_rel, K, J, j, nu_ext, K_ext, g,
+                                   nu_e_ext, nu_i_ext, tol=tol,
+                                   siegert_table=siegert_table,
+                                   nu_init=nu_init, maxiter=maxiter)
 
-    return y[1]
+
+# units of the arguments dimension, ..., nu_i_ext of firing_rates
+_FIRING_RATES_UNITS = (None, ureg.s, ureg.s, ureg.s, ureg.mV, ureg.mV, None,
+                       ureg.mV, ureg.mV, ureg.Hz, None, None, ureg.Hz,
+                       ureg.Hz)
+
+
+def firing_rates_continuation(get_network_params, lambda_start, lambda_stop,
+                              nu_init=None, step=None, min_step=None,
+                              max_step=None, tol=1e-9, maxiter=10,
+                              max_points=1000, siegert_table=None):
+    '''
+    Follows the self-consistent firing rates along a path in parameter space.
+
+    The path is parametrized by a scalar parameter lambda, which is varied
+    from lambda_start to lambda_stop by pseudo-arclength continuation: each
+    point is predicted along the tangent of the solution curve and corrected
+    by Newton's method perpendicular to the tangent. In contrast to sweeping
+    lambda, this follows the fixed point around folds, at which the curve
+    turns back in lambda and the network has several fixed points.
+
+    Parameters:
+    -----------
+    get_network_params: func
+        Function returning the arguments dimension, ..., nu_i_ext of
+        firing_rates as tuple for a given value of lambda.
+    lambda_start: float or Quantity(float)
+        Value of lambda at the start of the path.
+    lambda_stop: float or Quantity(float)
+        Value of lambda at the end of the path.
+    nu_init: Quantity(np.ndarray, 'hertz')
+        Optional initial guess of the rates at lambda_start.
+    step: float
+        Initial arclength step, measured in Hz and the units of lambda.
+        (lambda_stop - lambda_start) / 50 by default.
+    min_step: float
+        Continuation stops if the step has to be reduced below min_step.
+        1e-4 * step by default.
+    max_step: float
+        Maximal step, 10 * step by default.
+    tol: float
+        Maximal deviation from self-consistency of each point in Hz.
+    maxiter: int
+        Maximal number of Newton corrections per step. Steps needing more
+        than half of them are reduced.
+    max_points: int
+        Maximal number of points of the path.
+    siegert_table: aux_calcs.SiegertTable
+        Optional precomputed table used instead of the exact Siegert formula.
+
+    Returns:
+    --------
+    fast.Continuation
+        Named tuple containing lambdas, firing_rates (Quantity(np.ndarray,
+        'hertz') of shape (points, dimension)), max_eigenvalues, the largest
+        real part of the eigenvalues of the linearized rate dynamics in units
+        of its time constant, stable, whether max_eigenvalues is negative, and
+        folds, the indices of the points at which lambda changes direction.
+    '''
+    units = getattr(lambda_start, 'units', None)
+    if units is not None:
+        lambda_start = lambda_start.magnitude
+        lambda_stop = lambda_stop.to(units).magnitude
+
+    def get_params(lam):
+        params = get_network_params(lam if units is None else lam * units)
+        return tuple(value if unit is None else value.to(unit).magnitude
+                     for value, unit in zip(params, _FIRING_RATES_UNITS))
+
+    if isinstance(nu_init, ureg.Quantity):
+        nu_init = nu_init.to(ureg.Hz).magnitude
+    path = fast.firing_rates_continuation(get_params, lambda_start,
+                                          lambda_stop, nu_init=nu_init,
+                                          step=step, min_step=min_step,
+                                          max_step=max_step, tol=tol,
+                                          maxiter=maxiter,
+                                          max_points=max_points,
+                                          siegert_table=siegert_table)
+    return path._replace(
+        lambdas=path.lambdas if units is None else path.lambdas * units,
+        firing_rates=path.firing_rates * ureg.Hz)
 
 
 @ureg.wraps(ureg.mV, (ureg.Hz, None, ureg.mV, ureg.mV, ureg.s, ureg.Hz, None,
@@ -160,21 +307,7 @@ def mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
     Quantity(np.ndarray, 'millivolt')
         array of mean inputs to each population in millivolt
     '''
-    return _mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext)
-
-
-def _mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
-    """ Compute mean() without quantities. """
-    # contribution from within the network
-    m0 = tau_m * np.dot(K * J, nu)
-    # contribution from external sources
-    m_ext = tau_m * j * K_ext * nu_ext
-    # contribution from additional excitatory and inhibitory Poisson input
-    m_ext_add =  tau_m * j * (nu_e_ext - g * nu_i_ext)
-    # add them up
-    m = m0 + m_ext + m_ext_add
-
-    return m
+    return fast.mean(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext)
 
 
 @ureg.wraps(ureg.mV, (ureg.Hz, None, ureg.mV, ureg.mV, ureg.s, ureg.Hz, None,
@@ -213,25 +346,10 @@ def standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext)
     Quantity(np.ndarray, 'millivolt')
         array of standard dev of inputs to each population in millivolt
     '''
-    return _standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext,
+    return fast.standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext,
                                g, nu_e_ext, nu_i_ext)
 
 
-def _standard_deviation(nu, K, J, j, tau_m, nu_ext, K_ext, g, nu_e_ext, nu_i_ext):
-    """ Compute standard_deviation() without quantities. """
-    # contribution from within the network to variance
-    var0 = tau_m * np.dot(K * J**2, nu)
-    # contribution from external sources to variance
-    var_ext = tau_m * j**2 * K_ext * nu_ext
-    # contribution from additional excitatory and inhibitory Poisson input
-    var_ext_add =  tau_m * j**2 * (nu_e_ext + g**2 * nu_i_ext)
-    # add them up
-    var = var0 + var_ext + var_ext_add
-    # standard deviation is square root of variance
-    sigma = np.sqrt(var)
-    return sigma
-
-
 @ureg.wraps(ureg.Hz/ureg.mV, (ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s,
                               ureg.mV, ureg.mV, ureg.Hz))
 def transfer_function_1p_taylor(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
@@ -263,35 +381,15 @@ def transfer_function_1p_taylor(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
     V_0_rel: Quantity(float, 'millivolt')
         Relative reset potential.
     omega: Quantity(flaot, 'hertz')
-        Input frequency to population.
+        Input frequency to population. mu, sigma and omega may be arrays,
+        which are broadcast against each other.
 
     Returns:
     --------
     Quantity(float, 'hertz/millivolt')
     """
-
-    # for frequency zero the exact expression is given by the derivative of
-    # f-I-curve
-    if np.abs(omega - 0.) < 1e-15:
-        result = aux_calcs.d_nu_d_mu_fb433(tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
-                                           mu, sigma)
-    else:
-        nu0 = aux_calcs.nu_0(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
-        nu0_fb = aux_calcs.nu0_fb433(tau_m, tau_s, tau_r, V_th_rel, V_0_rel, mu,
-                                     sigma)
-        x_t = np.sqrt(2.) * (V_th_rel - mu) / sigma
-        x_r = np.sqrt(2.) * (V_0_rel - mu) / sigma
-        z = complex(-0.5, complex(omega * tau_m))
-        alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
-        k = np.sqrt(tau_s / tau_m)
-        A = alpha * tau_m * nu0 * k / np.sqrt(2)
-        a0 = aux_calcs.Psi_x_r(z, x_t, x_r)
-        a1 = aux_calcs.dPsi_x_r(z, x_t, x_r) / a0
-        a3 = A / tau_m / nu0_fb * (-a1**2 + aux_calcs.d2Psi_x_r(z, x_t, x_r)/a0)
-        result = (np.sqrt(2.) / sigma * nu0_fb / complex(1., omega * tau_m)* (a1 + a3))
-
-    # additional low-pass filter due to perturbation to the input current
-    return result / complex(1., omega * tau_s)
+    return fast.transfer_function_1p_taylor(mu, sigma, tau_m, tau_s, tau_r,
+                                        V_th_rel, V_0_rel, omega)
 
 
 @ureg.wraps(ureg.Hz/ureg.mV, (ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s, ureg.mV,
@@ -328,48 +426,20 @@ def transfer_function_1p_shift(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
     V_0_rel: Quantity(float, 'millivolt')
         Relative reset potential.
     omega: Quantity(float, 'hertz')
-        Input frequency to population.
+        Input frequency to population. mu, sigma and omega may be arrays,
+        which are broadcast against each other.
 
     Returns:
     --------
     Quantity(float, 'hertz/millivolt')
     """
-    return _transfer_function_1p_shift(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
+    return fast.transfer_function_1p_shift(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
                                        V_0_rel, omega)
 
 
-def _transfer_function_1p_shift(mu, sigma, tau_m, tau_s, tau_r, V_th_rel,
-                                V_0_rel, omega):
-    """ Compute transfer_function_1p_shift() without quantities """
-
-    # effective threshold and reset
-    alpha = np.sqrt(2) * abs(zetac(0.5) + 1)
-    V_th_rel += sigma * alpha / 2. * np.sqrt(tau_s / tau_m)
-    V_0_rel += sigma * alpha / 2. * np.sqrt(tau_s / tau_m)
-
-    # for frequency zero the exact expression is given by the derivative of
-    # f-I-curve
-    if np.abs(omega - 0.) < 1e-15:
-        result = aux_calcs.d_nu_d_mu(tau_m, tau_r, V_th_rel, V_0_rel, mu,
-                                     sigma)
-    else:
-        nu = aux_calcs.nu_0(tau_m, tau_r, V_th_rel, V_0_rel, mu, sigma)
-
-        x_t = np.sqrt(2.) * (V_th_rel - mu) / sigma
-        x_r = np.sqrt(2.) * (V_0_rel - mu) / sigma
-        z = complex(-0.5, complex(omega * tau_m))
-
-        frac = aux_calcs.dPsi_x_r(z, x_t, x_r) / aux_calcs.Psi_x_r(z, x_t, x_r)
-
-        result = (np.sqrt(2.) / sigma * nu
-                  / (1. + complex(0., complex(omega*tau_m))) * frac)
-
-    # additional low-pass filter due to perturbation to the input current
-    return result / complex(1., omega * tau_s)
-
-
 def transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
-                      dimension, omegas, method='shift'):
+                      dimension, omegas, method='shift', workers=1,
+                      executor=None):
     """
     Returns transfer functions for all populations based on
     transfer_function_1p_shift() (default) or transfer_function_1p_taylor()
@@ -396,6 +466,12 @@ def transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
         Input frequencies to population.
     method: str
         String specifying transfer function to use ('shift', 'taylor').
+    workers: int
+        Number of processes evaluating chunks of the (omega, population) grid
+        in parallel. The result is identical to the serial evaluation.
+    executor: concurrent.futures.Executor
+        Optional executor used instead of a new process pool, e.g. to avoid
+        the start up of worker processes for repeated calls.
 
     Returns:
     --------
@@ -404,27 +480,17 @@ def transfer_function(mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
         contain the values of the transfer function corresponding to the
         given omegas.
     """
+    # strip units once, such that no quantities are sent to the workers
+    transfer_functions = fast.transfer_function(
+        mu.to(ureg.mV).magnitude[:dimension],
+        sigma.to(ureg.mV).magnitude[:dimension], tau_m.to(ureg.s).magnitude,
+        tau_s.to(ureg.s).magnitude, tau_r.to(ureg.s).magnitude,
+        V_th_rel.to(ureg.mV).magnitude, V_0_rel.to(ureg.mV).magnitude,
+        _omegas_in_hz(omegas), method=method, workers=workers,
+        executor=executor)
 
-    if method == 'shift':
-        transfer_functions = [[transfer_function_1p_shift(mu[i], sigma[i], tau_m,
-                                                          tau_s, tau_r, V_th_rel,
-                                                          V_0_rel, omega)
-                               for i in range(dimension)]
-                              for omega in omegas]
-    if method == 'taylor':
-        transfer_functions = [[transfer_function_1p_taylor(mu[i], sigma[i], tau_m,
-                                                          tau_s, tau_r, V_th_rel,
-                                                          V_0_rel, omega)
-                               for i in range(dimension)]
-                              for omega in omegas]
-
+    return transfer_functions * ureg.Hz / ureg.mV
 
-    # convert list of list of quantities to list of quantities containing np.ndarray
-    tf_magnitudes = np.array([np.array([tf.magnitude for tf in tf_population])
-                     for tf_population in transfer_functions])
-    tf_unit = transfer_functions[0][0].units
-
-    return tf_magnitudes * tf_unit
 
 @ureg.wraps(ureg.dimensionless, (None, ureg.s, ureg.s, None, ureg.Hz))
 def delay_dist_matrix_single(dimension, Delay, Delay_sd, delay_dist, omega):
@@ -458,69 +524,52 @@ def delay_dist_matrix_single(dimension, Delay, Delay_sd, delay_dist, omega):
         Matrix of delay distribution specific pre-factors at frequency omega.
     '''
 
-    if delay_dist == 'none':
-        D = np.ones((int(dimension), int(dimension)))
-        return D*np.exp(-np.complex(0,omega)*Delay)
-
-    elif delay_dist == 'truncated_gaussian':
-        a0 = 0.5 * (1 + erf((-Delay/Delay_sd+1j*omega*Delay_sd) / np.sqrt(2)))
-        a1 = 0.5 * (1 + erf((-Delay/Delay_sd) / np.sqrt(2)))
-        b0 = np.exp(-0.5*np.power(Delay_sd*omega,2))
-        b1 = np.exp(-np.complex(0,omega)*Delay)
-        return (1.0-a0)/(1.0-a1)*b0*b1
-
-    elif delay_dist == 'gaussian':
-        b0 = np.exp(-0.5*np.power(Delay_sd*omega,2))
-        b1 = np.exp(-np.complex(0,omega)*Delay)
-        return b0*b1
-
-
-def delay_dist_matrix(dimension, Delay, Delay_sd, delay_dist, omegas):
-    """ Calculates delay distribution matrices for all omegas. """
-    ddms = [delay_dist_matrix_single(dimension, Delay, Delay_sd,
-                                             delay_dist, omega)
-                           for omega in omegas]
+    return fast.delay_dist_matrix(Delay, Delay_sd, delay_dist, omega)[0]
 
-    # convert list of list of quantities to list of quantities containing np.ndarray
-    delay_dist_matrices = np.array([ddm.magnitude for ddm in ddms])
-    ddm_unit = ddms[0].units
 
-    return delay_dist_matrices * ddm_unit
-
-
-def _effective_connectivity(omega, transfer_function, tau_m, J, K, dimension,
-                            delay_term=1):
+def delay_dist_matrix(dimension, Delay, Delay_sd, delay_dist, omegas,
+                      out=None, chunk_size=None):
     """
-    Effective connectivity.
+    Calculates delay distribution matrices for all omegas.
 
     Parameters:
     -----------
-    omega: float
-        Input angular frequency to population in Hz.
-    transfer_function: np.ndarray
-        Transfer_function for given frequency omega in hertz/mV.
-    tau_m: float
-        Membrane time constant in s.
-    J: np.ndarray
-        Weight matrix in mV.
-    K: np.ndarray
-        Indegree matrix.
     dimension: int
-        Number of populations.
-    delay_term: 1 or np.ndarray
-        optional delay_dist_matrix, unitless.
+        Dimension of the system / number of populations
+    Delay: Quantity(np.ndarray, 's')
+        Delay matrix.
+    Delay_sd: Quantity(np.ndarray, 's')
+        Delay standard deviation matrix.
+    delay_dist: str
+        String specifying delay distribution.
+    omegas: Quantity(np.ndarray, 'hertz')
+        Frequencies.
+    out: np.ndarray
+        Optional complex buffer of shape (len(omegas), dimension, dimension)
+        the result is written to.
+    chunk_size: int
+        If given, the matrices are computed for at most chunk_size omegas at a
+        time, which bounds the memory of intermediate results.
 
     Returns:
     --------
-    np.ndarray
-        Effective connectivity matrix.
+    Quantity(np.ndarray, 'dimensionless')
+        Delay distribution matrices with omegas along the first axis.
     """
-    # matrix of equal columns
-    tf = np.tile(transfer_function, (dimension,1)).T
+    delay_dist_matrices = fast.delay_dist_matrix(Delay.to(ureg.s).magnitude,
+                                                 Delay_sd.to(ureg.s).magnitude,
+                                                 delay_dist,
+                                                 _omegas_in_hz(omegas),
+                                                 out=out,
+                                                 chunk_size=chunk_size)
+    return ureg.Quantity(delay_dist_matrices, ureg.dimensionless)
 
-    eff_conn = tau_m * J * K * tf * delay_term
 
-    return eff_conn
+def _omegas_in_hz(omegas):
+    """ Magnitudes in Hz of Quantity array or list of Quantities omegas. """
+    if isinstance(omegas, list):
+        return np.array([omega.to(ureg.Hz).magnitude for omega in omegas])
+    return omegas.to(ureg.Hz).magnitude
 
 
 def _effective_connectivity_rate(omega, tau, W_rate, delay_term=1):
@@ -580,7 +629,7 @@ def sensitivity_measure(transfer_function, delay_dist_matrix, J, K, tau_m, tau_s
         Sensitivity measure.
     """
 
-    MH = _effective_connectivity(omega, transfer_function, tau_m, J, K,
+    MH = fast.effective_connectivity(omega, transfer_function, tau_m, J, K,
                                  dimension, delay_dist_matrix)
 
     e, U = np.linalg.eig(MH)
@@ -633,32 +682,54 @@ def power_spectra(tau_m, tau_s, dimension, J, K, delay_dist_matrix, N,
     Quantity(np.ndarray, 'hertz**2')
     """
 
-    def power_spectra_single_freq(tau_m, tau_s, transfer_function, dimension,
-                                  J, K, delay_dist_matrix, firing_rates, N,
-                                  omega):
-        """ Calculate power spectrum for single frequency. """
+    return fast.power_spectra(tau_m, dimension, J, K, delay_dist_matrix, N,
+                              firing_rates, transfer_function, omegas)
 
-        MH = _effective_connectivity(omega, transfer_function, tau_m, J, K,
-                                     dimension, delay_dist_matrix)
 
-        Q = np.linalg.inv(np.identity(dimension)-MH)
-        D = (np.diag(np.ones(dimension)) * firing_rates / N)
-        C = np.dot(Q, np.dot(D, np.transpose(np.conjugate(Q))))
-        spec = np.absolute(np.diag(C))
-        return spec
+@ureg.wraps(None, (ureg.s, ureg.s, ureg.Hz/ureg.mV, None, ureg.dimensionless,
+                   ureg.mV, None, ureg.Hz, None))
+def eigen_decomposition(tau_m, tau_s, transfer_function, dimension,
+                        delay_dist_matrix, J, K, omegas, matrix):
+    """
+    Calcs eigenvals, left and right eigenvecs of matrix at all frequencies.
 
-    power = np.array([power_spectra_single_freq(tau_m, tau_s, transfer_function[i],
-                                       dimension, J, K, delay_dist_matrix[i],
-                                       firing_rates, N, omega)
-             for i,omega in enumerate(omegas)])
+    All frequencies are decomposed at once, such that eigenvalues, right and
+    left eigenvectors can be obtained from a single calculation.
 
+    Parameters:
+    -----------
+    tau_m: Quantity(float, 'millisecond')
+        Membrane time constant.
+    tau_s: Quantity(float, 'millisecond')
+        Synaptic time constant.
+    transfer_function: Quantity(np.ndarray, 'hertz/mV')
+        Transfer_function for given frequencies omegas.
+    dimension: int
+        Number of populations.
+    delay_dist_matrix: Quantity(np.ndarray, 'dimensionless')
+        Delay distribution matrix at given frequencies.
+    J: Quantity(np.ndarray, 'millivolt')
+        Weight matrix.
+    K: np.ndarray
+        Indegree matrix.
+    omegas: Quantity(np.ndarray, 'hertz')
+        Input angular frequency to population.
+    matrix: str
+        String specifying which matrix is analysed. Options are the effective
+        connectivity matrix 'MH', the propagator 'prop' and the inverse
+        propagator 'prop_inv'.
 
-    return np.transpose(power)
+    Returns:
+    --------
+    fast.EigenDecomposition
+        Named tuple with fields eigvals, reigvecs and leigvecs, laid out as
+        returned by eigen_spectra.
+    """
 
+    return fast.eigen_decomposition(tau_m, dimension, J, K, delay_dist_matrix,
+                                    transfer_function, omegas, matrix)
 
 
-@ureg.wraps(None, (ureg.s, ureg.s, ureg.Hz/ureg.mV, None, None, ureg.mV, None,
-                   ureg.Hz, None, None))
 def eigen_spectra(tau_m, tau_s, transfer_function, dimension,
                   delay_dist_matrix, J, K, omegas, quantity, matrix):
     """
@@ -692,46 +763,18 @@ def eigen_spectra(tau_m, tau_s, transfer_function, dimension,
 
     Returns:
     --------
-    Quantity(np.ndarray, 'dimensionless')
+    np.ndarray
         Either eigenvalues corresponding to given frequencies or right or left
         eigenvectors corresponding to given frequencies.
     """
 
-    def eigen_spectra_single_freq(tau_m, tau_s, transfer_function, dimension,
-                                  delay_dist_matrix, J, K, omega, matrix):
-
-        MH = _effective_connectivity(omega, transfer_function, tau_m, J, K,
-                                     dimension, delay_dist_matrix).magnitude
-
-        if matrix == 'MH':
-            eig, vr = np.linalg.eig(MH)
-            vl = np.linalg.inv(vr)
-            return eig, np.transpose(vr), vl
+    if quantity not in fast.EigenDecomposition._fields:
+        raise ValueError('Quantity {} not implemented!'.format(quantity))
 
-        Q = np.linalg.inv(np.identity(dimension) - MH)
-        P = np.dot(Q, MH)
-        if matrix == 'prop':
-            eig, vr = np.linalg.eig(P)
-        elif matrix == 'prop_inv':
-            eig, vr = np.linalg.eig(np.linalg.inv(P))
-        vl = np.linalg.inv(vr)
-
-        return eig, np.transpose(vr), vl
-
-    if quantity == 'eigvals':
-        eig = [eigen_spectra_single_freq(tau_m, tau_s, transfer_function[i], dimension,
-                                         delay_dist_matrix[i], J, K, omega, matrix)[0]
-               for i,omega in enumerate(omegas)]
-    elif quantity == 'reigvecs':
-        eig = [eigen_spectra_single_freq(tau_m, tau_s, transfer_function[i], dimension,
-                                         delay_dist_matrix[i], J, K, omega, matrix)[1]
-                           for i,omega in enumerate(omegas)]
-    elif quantity == 'leigvecs':
-        eig = [eigen_spectra_single_freq(tau_m, tau_s, transfer_function[i], dimension,
-                                         delay_dist_matrix[i], J, K, omega, matrix)[2]
-                          for i,omega in enumerate(omegas)]
-
-    return np.transpose(eig)
+    decomposition = eigen_decomposition(tau_m, tau_s, transfer_function,
+                                        dimension, delay_dist_matrix, J, K,
+                                        omegas, matrix)
+    return getattr(decomposition, quantity)
 
 
 @ureg.wraps((ureg.Hz, ureg.Hz), (ureg.mV, ureg.mV, ureg.s, ureg.s, ureg.s,
@@ -784,18 +827,16 @@ def additional_rates_for_fixed_input(mu_set, sigma_set,
     nu_i_ext: Quantity(np.ndarray, 'hertz')
         additional external inhibitory rate needed for fixed input
     """
-    target_rates = np.zeros(len(mu_set))
-    for i in np.arange(len(mu_set)):
-        # target rates for set mean and standard deviation of input
-        target_rates[i] = aux_calcs.nu0_fb433(tau_m, tau_s, tau_r,
-                                              V_th_rel, V_0_rel,
-                                              mu_set[i], sigma_set[i])
+    # target rates for set mean and standard deviation of input
+    target_rates = aux_calcs.nu0_fb433_vec(tau_m, tau_s, tau_r,
+                                           V_th_rel, V_0_rel,
+                                           mu_set, sigma_set)
 
     # additional external rates set to 0 for local-only contributions
-    mu_loc =_mean(nu=target_rates, K=K, J=J, j=j, tau_m=tau_m,
+    mu_loc = fast.mean(nu=target_rates, K=K, J=J, j=j, tau_m=tau_m,
                   nu_ext=nu_ext, K_ext=K_ext,
                   g=g, nu_e_ext=0., nu_i_ext=0.)
-    sigma_loc = _standard_deviation(nu=target_rates, K=K, J=J, j=j, tau_m=tau_m,
+    sigma_loc = fast.standard_deviation(nu=target_rates, K=K, J=J, j=j, tau_m=tau_m,
                                     nu_ext=nu_ext, K_ext=K_ext,
                                     g=g, nu_e_ext=0., nu_i_ext=0.)
 
@@ -947,20 +988,22 @@ def scan_fit_transfer_function_mean_std_input(mean_inputs, std_inputs,
     errs_tau = np.zeros(dims)
     errs_h0 = np.zeros(dims)
 
-    for i,mu in enumerate(mean_inputs):
-        for j,sigma in enumerate(std_inputs):
-            tfs = [[transfer_function_1p_shift(mu, sigma, tau_m,
-                                              tau_s, tau_r, V_th_rel,
-                                              V_0_rel, omega)]
-                                    for omega in omegas]
-            tf_magnitudes = [[tf[0].magnitude] for tf in tfs]
-            tf_unit = tfs[0][0].units
-            transfer_function = tf_magnitudes * tf_unit
-
+    # stationary quantities of all combinations, with mu along first axis
+    state = fast.prepare_transfer_function(
+        mean_inputs.to(ureg.mV).magnitude[:, np.newaxis],
+        std_inputs.to(ureg.mV).magnitude[np.newaxis, :],
+        tau_m.to(ureg.s).magnitude, tau_s.to(ureg.s).magnitude,
+        tau_r.to(ureg.s).magnitude, V_th_rel.to(ureg.mV).magnitude,
+        V_0_rel.to(ureg.mV).magnitude, method='shift')
+    omegas = omegas.to(ureg.Hz).magnitude
+    transfer_functions = fast.transfer_function_kernel(
+        state, omegas[:, np.newaxis, np.newaxis])
+
+    for i in range(dims[0]):
+        for j in range(dims[1]):
             fit_tf, tau_rate, h0, err_tau, err_h0 = \
-                _fit_transfer_function( \
-                    transfer_function.to(ureg.Hz / ureg.mV).magnitude,
-                    omegas.to(ureg.Hz).magnitude)
+                _fit_transfer_function(transfer_functions[:, i, j, np.newaxis],
+                                       omegas)
 
             errs_tau[i,j] = err_tau[0]
             errs_h0[i,j] = err_h0[0]
@@ -999,13 +1042,10 @@ def effective_coupling_strength(tau_m, tau_s, tau_r, V_0_rel, V_th_rel, J,
         Numbers of external input neurons to each population.
     g: float
     """
-    dim = len(mean_input)
-    w_ecs = np.zeros((dim, dim))
-    for pre in np.arange(dim):
-        for post in np.arange(dim):
-            w_ecs[post][pre] = aux_calcs.d_nu_d_nu_in_fb(
-                tau_m, tau_s, tau_r, V_th_rel, V_0_rel, J[post][pre],
-                mean_input[pre], std_input[pre])[1] # linear (mu) contribution
+    # rows are post-, columns presynaptic populations
+    w_ecs = aux_calcs.d_nu_d_nu_in_fb_vec(
+        tau_m, tau_s, tau_r, V_th_rel, V_0_rel, J,
+        mean_input[np.newaxis, :], std_input[np.newaxis, :])[1] # linear (mu) contribution
     return w_ecs
 
 
@@ -1294,7 +1334,7 @@ def _d_lambda_d_alpha(l, alpha, k, delay,
 
 
 def _xi_eff_s(l, k, mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
-              J, K, dimension, width):
+              J, K, dimension, width, state=None):
     """
     Compute xi_eff for the lif neuron model.
     Requires a spatially organized network with boxcar connectivity profile.
@@ -1327,16 +1367,21 @@ def _xi_eff_s(l, k, mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
         Dimension of the system / number of populations.
     width: np.ndarray
         Spatial widths of boxcar connectivtiy profile in m.
+    state: fast.TransferFunctionState
+        Optional result of fast.prepare_transfer_function for the given
+        parameters, which is then not recomputed.
 
     Returns:
     --------
     xi_eff_s: complex
     """
     omega = complex(0, -l)
-    transfer_func = _transfer_function_1p_shift( \
-        mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel, omega)
+    if state is None:
+        state = fast.prepare_transfer_function(mu, sigma, tau_m, tau_s, tau_r,
+                                           V_th_rel, V_0_rel, method='shift')
+    transfer_func = fast.transfer_function_kernel(state, omega)
 
-    MH_s = _effective_connectivity(omega, transfer_func, tau_m, J, K, dimension)
+    MH_s = fast.effective_connectivity(omega, transfer_func, tau_m, J, K, dimension)
     P_hat = aux_calcs.p_hat_boxcar(k, width)
     xi_eff_s = aux_calcs.determinant(MH_s * P_hat)
     return xi_eff_s
@@ -1411,10 +1456,13 @@ def _d_xi_eff_s_d_lambda(l, k, mu, sigma, tau_m, tau_s, tau_r, Vth_rel, V_0_rel,
     --------
     deriv: complex
     """
+    state = fast.prepare_transfer_function(mu, sigma, tau_m, tau_s, tau_r,
+                                       Vth_rel, V_0_rel, method='shift')
+
     def f(x):
         omega = complex(0, -l)
         return _xi_eff_s(l, k, mu, sigma, tau_m, tau_s, tau_r, Vth_rel, V_0_rel,
-                         J, K, dimension, width)
+                         J, K, dimension, width, state=state)
 
     deriv = smisc.derivative(func=f, x0=l, dx=1e-10) # TODO: check precision
     return deriv
@@ -1499,11 +1547,14 @@ def _solve_chareq_numerically_alpha(lambda_guess, alpha, k, delay, mu, sigma,
     lamb: complex
 
     """
+    state = fast.prepare_transfer_function(mu, sigma, tau_m, tau_s, tau_r,
+                                       V_th_rel, V_0_rel, method='shift')
+
     def fsolve_complex(l_re_im):
         l = complex(l_re_im[0], l_re_im[1])
 
         xi_eff_s = _xi_eff_s(l, k, mu, sigma, tau_m, tau_s, tau_r, V_th_rel, V_0_rel,
-                             J, K, dimension, width)
+                             J, K, dimension, width, state=state)
         xi_eff_r = _xi_eff_r(l, k, tau, W_rate, width)
 
         xi_eff_alpha = alpha * xi_eff_s + (1.-alpha) * xi_eff_r
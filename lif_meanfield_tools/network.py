@@ -15,9 +15,12 @@ Network Methods:
 ----------------
 __init__
 save
+_save_incremental
 show
+cache_info
 change_parameters
 firing_rates
+firing_rates_continuation
 mean
 standard_deviation
 working_point
@@ -29,9 +32,12 @@ transfer_function_multi
 transfer_function_single
 sensitivity_measure
 power_spectra
+eigen_decomposition
 eigenvalue_spectra
 r_eigenvec_spectra
 l_eigenvec_spectra
+iter_spectra
+_spectra_block
 additional_rates_for_fixed_input
 fit_transfer_function
 scan_fit_transfer_function_mean_std_input
@@ -39,16 +45,118 @@ linear_interpolation_alpha
 _calculate_dependent_network_parameters
 _calculate_dependent_analysis_parameters
 _check_and_store
+_disk_key
+_evict_result
+_carry_over_results
 """
 
 from __future__ import print_function
+import os
+import inspect
 import numpy as np
 import functools
 from decorator import decorator
 
-from . import ureg
+from . import ureg, __version__
 from . import input_output as io
 from . import meanfield_calcs
+from . import cache
+
+# marks results that have not been found in the result cache
+_MISSING = object()
+
+# analysis keys used by _check_and_store
+_ANALYSIS_KEYS = set()
+
+
+def _bind_arguments(func, self, *args, **kwargs):
+    """
+    Returns list of (name, value) of all arguments of method func except self,
+    including default values.
+    """
+    bound = _signature(func).bind(self, *args, **kwargs)
+    bound.apply_defaults()
+    return list(bound.arguments.items())[1:]
+
+
+def _key_arguments(key):
+    """
+    Returns dictionary of the arguments of a key of the result cache.
+
+    Only arguments given as strings or scalars are recovered as given, all
+    others are returned in their canonical form.
+    """
+    return {argument[1]: argument[2] for argument in key[2][1:]}
+
+
+def _merge_frequencies(old, new, order, axis):
+    """
+    Concatenates old and new results along the frequency axis and sorts them
+    using order.
+    """
+    if isinstance(old, tuple) and hasattr(old, '_fields'):
+        return type(old)(*[_merge_frequencies(o, n, order, axis)
+                           for o, n in zip(old, new)])
+    if isinstance(old, ureg.Quantity):
+        return _merge_frequencies(old.magnitude, new.to(old.units).magnitude,
+                                  order, axis) * old.units
+    return np.take(np.concatenate([old, new], axis=axis), order, axis=axis)
+
+
+def _stack_results(results):
+    """
+    Stacks list of results, quantities, arrays or named tuples of these,
+    along a new leading axis.
+    """
+    first = results[0]
+    if isinstance(first, tuple) and hasattr(first, '_fields'):
+        return type(first)(*[_stack_results(list(fields))
+                             for fields in zip(*results)])
+    if isinstance(first, ureg.Quantity):
+        return np.stack([result.to(first.units).magnitude
+                         for result in results]) * first.units
+    return np.stack(results)
+
+
+def _append_analysis_param(params, param):
+    """
+    Returns array params, or None, with param appended. Quantities are
+    collected in quantity arrays in the unit of params.
+    """
+    if isinstance(param, ureg.Quantity):
+        if params is None:
+            return np.array([param.magnitude]) * param.units
+        return (np.append(params.magnitude, param.to(params.units).magnitude)
+                * params.units)
+    if params is None:
+        return np.array([param])
+    return np.append(params, param)
+
+
+def _delete_analysis_param(params, index):
+    """ Returns array params without the entry at index. """
+    if isinstance(params, ureg.Quantity):
+        return np.delete(params.magnitude, index) * params.units
+    return np.delete(params, index)
+
+
+@functools.lru_cache(maxsize=None)
+def _dependency_params(result_key):
+    """
+    Returns sorted list of all network and analysis parameters result_key
+    depends on, directly or via other results.
+    """
+    params, results = Network._result_dependencies[result_key]
+    params = set(params)
+    for result in results:
+        params.update(_dependency_params(result))
+    return sorted(params)
+
+
+@functools.lru_cache(maxsize=None)
+def _signature(func):
+    """ Cached inspect.signature. """
+    return inspect.signature(func)
 
 
 class Network(object):
@@ -75,10 +183,20 @@ class Network(object):
     derive_params: bool
         whether parameters shall be derived from existing ones
         can be false if a complete set of network parameters is given
+    cache_size: int
+        maximal memory in bytes used by cached results, least recently used
+        results are dropped first; unbounded if None
+    cache_dir: str or cache.DiskCache
+        if given, results are additionally stored in this directory and
+        reused by all networks and processes with the same relevant parameters
+    cache_dir_size: int
+        maximal size in bytes of the results stored in cache_dir; unbounded if
+        None
     """
 
     def __init__(self, network_params=None, analysis_params=None, new_network_params={},
-                 new_analysis_params={}, derive_params=True):
+                 new_analysis_params={}, derive_params=True, cache_size=None,
+                 cache_dir=None, cache_dir_size=None):
         """
         Initiate Network class.
 
@@ -124,44 +242,55 @@ class Network(object):
 
         # empty results
         self.results = {}
-
-        # TODO: LOAD RESULTS ONLY IF THE ANALYSIS PARAMS ARE THE SAME
-        # OTHERWISE DANGER THAT EITHER ANALYSIS PARAMS GET OVERWRITTEN OR DON'T
-        # CORRESPOND TO THE RESULTS
-
-        # load already existing results
-        # stored_analysis_params, self.results = io.load_from_h5(self.network_params)
-        # self.analysis_params.update(stored_analysis_params)
+        # results written by incremental saves, per file
+        self._saved = {}
+        self.result_cache = cache.ResultCache(max_bytes=cache_size,
+                                              on_evict=self._evict_result)
+
+        # persistent results, keyed by the parameters each result depends on
+        if cache_dir is None or isinstance(cache_dir, cache.DiskCache):
+            self.disk_cache = cache_dir
+        else:
+            self.disk_cache = cache.DiskCache(cache_dir,
+                                              max_bytes=cache_dir_size)
 
 
-    def _calculate_dependent_network_parameters(self):
+    def _calculate_dependent_network_parameters(self, network_params=None):
         """
         Calculate all network parameters derived from parameters in yaml file
 
+        Parameters:
+        -----------
+        network_params: dict
+            Optional network parameters used instead of self.network_params.
+
         Returns:
         --------
         dict
             dictionary containing all derived network parameters
         """
 
+        if network_params is None:
+            network_params = self.network_params
+
         derived_params = {}
 
         # calculate dimension of system
-        dim = len(self.network_params['populations'])
+        dim = len(network_params['populations'])
         derived_params['dimension'] = dim
 
         # reset reference potential to 0
         derived_params['V_0_rel'] = 0 * ureg.mV
-        derived_params['V_th_rel'] = (self.network_params['V_th_abs']
-                                      - self.network_params['V_0_abs'])
+        derived_params['V_th_rel'] = (network_params['V_th_abs']
+                                      - network_params['V_0_abs'])
 
         # convert weights in pA (current) to weights in mV (voltage)
-        tau_s_div_C = self.network_params['tau_s'] / self.network_params['C']
-        derived_params['j'] = (tau_s_div_C * self.network_params['w']).to(ureg.mV)
+        tau_s_div_C = network_params['tau_s'] / network_params['C']
+        derived_params['j'] = (tau_s_div_C * network_params['w']).to(ureg.mV)
 
         # weight matrix in pA (current)
-        W = np.ones((dim,dim))*self.network_params['w']
-        W[1:dim:2] *= -self.network_params['g']
+        W = np.ones((dim,dim))*network_params['w']
+        W[1:dim:2] *= -network_params['g']
         W = np.transpose(W)
         derived_params['W'] = W
 
@@ -169,14 +298,14 @@ class Network(object):
         derived_params['J'] = (tau_s_div_C * derived_params['W']).to(ureg.mV)
 
         # delay matrix
-        D = np.ones((dim,dim))*self.network_params['d_e']
-        D[1:dim:2] = np.ones(dim)*self.network_params['d_i']
+        D = np.ones((dim,dim))*network_params['d_e']
+        D[1:dim:2] = np.ones(dim)*network_params['d_i']
         D = np.transpose(D)
         derived_params['Delay'] = D
 
         # delay standard deviation matrix
-        D = np.ones((dim,dim))*self.network_params['d_e_sd']
-        D[1:dim:2] = np.ones(dim)*self.network_params['d_i_sd']
+        D = np.ones((dim,dim))*network_params['d_e_sd']
+        D[1:dim:2] = np.ones(dim)*network_params['d_i_sd']
         D = np.transpose(D)
         derived_params['Delay_sd'] = D
 
@@ -185,7 +314,7 @@ class Network(object):
         # (e.g. trigger execution of external script called <label>.py here)
         # Changing the label currently leads to difference which are hard to
         # track down.
-        if self.network_params['label'] == 'microcircuit':
+        if network_params['label'] == 'microcircuit':
             # larger weight for L4E->L23E connections
             derived_params['W'][0][2] *= 2.0
             derived_params['J'][0][2] *= 2.0
@@ -193,22 +322,31 @@ class Network(object):
         return derived_params
 
 
-    def _calculate_dependent_analysis_parameters(self):
+    def _calculate_dependent_analysis_parameters(self,
+                                                 analysis_params=None):
         """
         Calculate all analysis parameters derived from parameters in yaml file
 
+        Parameters:
+        -----------
+        analysis_params: dict
+            Optional analysis parameters used instead of self.analysis_params.
+
         Returns:
         --------
         dict
             dictionary containing derived parameters
         """
 
+        if analysis_params is None:
+            analysis_params = self.analysis_params
+
         derived_params = {}
 
         # convert regular to angular frequencies
-        w_min = 2*np.pi*self.analysis_params['f_min']
-        w_max = 2*np.pi*self.analysis_params['f_max']
-        dw = 2*np.pi*self.analysis_params['df']
+        w_min = 2*np.pi*analysis_params['f_min']
+        w_max = 2*np.pi*analysis_params['f_max']
+        dw = 2*np.pi*analysis_params['df']
 
         # enable usage of quantities
         @ureg.wraps(ureg.Hz, (ureg.Hz, ureg.Hz, ureg.Hz))
@@ -225,28 +363,36 @@ class Network(object):
             return np.arange(k_min, k_max, dk)
 
         derived_params['k_wavenumbers'] = calc_evaluated_wavenumbers( \
-                                          self.analysis_params['k_min'],
-                                          self.analysis_params['k_max'],
-                                          self.analysis_params['dk'])
+                                          analysis_params['k_min'],
+                                          analysis_params['k_max'],
+                                          analysis_params['dk'])
 
         return derived_params
 
 
-    def _check_and_store(result_key, analysis_key=''):
+    def _check_and_store(result_key, analysis_key='', ignore=()):
         """
         Decorator function that checks whether result are already existing.
 
         This decorator serves as a wrapper for functions that calculate
         quantities which are to be stored in self.results. First it checks,
-        whether the result already has been stored in self.results. If this is
-        the case, it returns that result. If not, the calculation is executed,
-        the result is stored in self.results and the result is returned.
+        whether the result already has been calculated with the same
+        arguments. If this is the case, it returns that result. If not, the
+        calculation is executed, the result is stored in self.results and the
+        result is returned.
+
+        Results are looked up in self.result_cache under a canonical key
+        built from result_key and all arguments of the wrapped function
+        (including defaults), with quantities normalized to base units. Thus,
+        lookups take constant time and e.g. results of different transfer
+        function methods are kept apart.
 
         If the wrapped function gets additional parameters passed, one should
         also include an analysis key, under which the new analysis parameters
-        should be stored in the dictionary self.analysis_params. Then, the
-        decorator first checks, whether the given parameters have been used
-        before and returns the corresponding results.
+        should be stored in the dictionary self.analysis_params. Then,
+        self.results[result_key] is a list of the results and
+        self.analysis_params[analysis_key] an array, or quantity array, of the
+        corresponding parameters.
 
         Parameters:
         -----------
@@ -254,84 +400,111 @@ class Network(object):
             Specifies under which key the result should be stored.
         analysis_key: str
             Specifies under which key the analysis_parameter should be stored.
+        ignore: tuple
+            Names of arguments which do not affect the result and are left out
+            of the key, e.g. number of workers.
 
         Returns:
         --------
         func
             decorator function
         """
+        if analysis_key:
+            _ANALYSIS_KEYS.add(analysis_key)
+
         @decorator
         def decorator_check_and_store(func, self, *args, **kwargs):
             """ Decorator with given parameters, returns expected results. """
-            # collect analysis_params
-            analysis_params = getattr(self, 'analysis_params')
-            # collect results
-            results = getattr(self, 'results')
+            arguments = _bind_arguments(func, self, *args, **kwargs)
+            key = (result_key, analysis_key,
+                   cache.canonical_key([(name, value)
+                                        for name, value in arguments
+                                        if name not in ignore]))
+
+            result = self.result_cache.get(key, _MISSING)
+            if result is not _MISSING:
+                return result
+
+            disk_key = self._disk_key(key, arguments, ignore)
+            if disk_key is not None:
+                result = self.disk_cache.get(disk_key, _MISSING)
+            if result is _MISSING:
+                # calculate new result
+                result = func(self, *args, **kwargs)
+                if disk_key is not None:
+                    try:
+                        self.disk_cache.put(disk_key, result)
+                    except TypeError:
+                        pass
+            self.result_cache.put(key, result)
+            if key not in self.result_cache:
+                # result alone exceeds the memory budget of the cache
+                return result
 
             if analysis_key:
-                # collect input
-                analysis_param = args[0]
-                # are analysis_keys and analysis_params already existing?
-                if analysis_key in analysis_params.keys():
-                    if analysis_param in analysis_params[analysis_key]:
-                        # get index of analysis_key
-                        index = list(analysis_params[analysis_key]).index(analysis_param)
-                        # return corresponding result
-                        return results[result_key][index]
-                    else:
-                        # store analysis_param in corresponding list
-                        if isinstance(analysis_param, ureg.Quantity):
-                            analysis_params[analysis_key] = (np.append(analysis_params[analysis_key].magnitude,
-                                                                       analysis_param.magnitude)
-                                                             * analysis_param.units)
-                        else:
-                            analysis_params[analysis_key] = (np.append(analysis_params[analysis_key],
-                                                                       analysis_param))
-
-                        setattr(self, 'analysis_params', analysis_params)
-                        # calculate new results
-                        new_result = func(self, *args, **kwargs)
-                        # save new results
-                        results[result_key] = list(results[result_key])
-                        results[result_key].append(new_result)
-                        setattr(self, 'results', results)
-                        # return new result
-                        return new_result
-
-                else:
-                    # store analysis_params
-                    if isinstance(analysis_param, ureg.Quantity):
-                        analysis_params[analysis_key] = (np.array([analysis_param.magnitude])
-                                                         * analysis_param.units)
-                    else:
-                        analysis_params[analysis_key] = np.array([analysis_param])
-                    setattr(self, 'analysis_params', analysis_params)
-                    # calculate new results
-                    new_result = func(self, *args, **kwargs)
-                    results[result_key] = [new_result]
-                    # save new results
-                    setattr(self, 'results', results)
-                    # return new result
-                    return new_result
-
+                # store analysis_param and result in corresponding lists
+                analysis_param = arguments[0][1]
+                self.analysis_params[analysis_key] = _append_analysis_param(
+                    self.analysis_params.get(analysis_key), analysis_param)
+                self.results.setdefault(result_key, [])
+                self.results[result_key].append(result)
             else:
-                # check if new result is already stored in self.results
-                if result_key in results.keys():
-                    # if so, return already calcualted result
-                    return results[result_key]
-                else:
-                    # if not, calculate new result
-                    results[result_key] = func(self, *args, **kwargs)
-                    # update self.results
-                    setattr(self, 'results', results)
-                    # return new_result
-                    return results[result_key]
-
-            # return wrapper_check_and_store
+                self.results[result_key] = result
+            return result
+
         return decorator_check_and_store
 
 
-    def save(self, output_key='', output={}, file_name=''):
+    def _disk_key(self, key, arguments, ignore):
+        """
+        Returns key of result in self.disk_cache, or None if the result is not
+        stored persistently.
+
+        The key is a content hash of the package version, the name of the
+        result, the arguments of the method and all network and analysis
+        parameters the result depends on according to _result_dependencies.
+        Results with unknown dependencies or arguments that cannot be hashed,
+        like a SiegertTable, are not stored.
+        """
+        result_key, analysis_key, _ = key
+        if (self.disk_cache is None
+                or result_key not in self._result_dependencies):
+            return None
+        params = {}
+        for name in _dependency_params(result_key):
+            if name in self.network_params:
+                params[name] = self.network_params[name]
+            elif name in self.analysis_params:
+                params[name] = self.analysis_params[name]
+        try:
+            return cache.content_hash(
+                (__version__, result_key, analysis_key, params,
+                 [(name, value) for name, value in arguments
+                  if name not in ignore]))
+        except TypeError:
+            return None
+
+
+    def _evict_result(self, key, value):
+        """
+        Removes result evicted from self.result_cache from self.results.
+        """
+        result_key, analysis_key, arguments = key
+        if analysis_key:
+            results = self.results.get(result_key, [])
+            for index, result in enumerate(results):
+                if result is value:
+                    del results[index]
+                    self.analysis_params[analysis_key] = \
+                        _delete_analysis_param(
+                            self.analysis_params[analysis_key], index)
+                    break
+        elif self.results.get(result_key) is value:
+            del self.results[result_key]
+
+
+    def save(self, output_key='', output={}, file_name='', incremental=False,
+             compression=None, backend=None):
         """
         Saves results and parameters to h5 file. If output is specified, this is
         saved to h5 file.
@@ -344,6 +517,16 @@ class Network(object):
             data that is stored in h5 file
         file_name: str
             if given, this is used as output file name
+        incremental: bool
+            if True, results are written to chunked datasets using
+            io.save_incremental, and only results calculated since the last
+            incremental save to the same file are written
+        compression: str
+            compression filter of datasets written in incremental mode, e.g.
+            'gzip' or 'lzf'
+        backend: str or object
+            storage backend, e.g. 'hdf5' (default) or 'npy' for a directory
+            of .npy files, see io.get_backend
 
         Returns:
         --------
@@ -352,18 +535,74 @@ class Network(object):
 
         # if no file name is specified use standard version
         if not file_name:
-            file_name = '{}_{}.h5'.format(self.network_params['label'],
-                                          str(self.hash))
+            file_name = '{}_{}'.format(self.network_params['label'],
+                                       str(self.hash))
+            if backend in (None, 'hdf5'):
+                file_name += '.h5'
+        backend = io.get_backend(backend, file_name)
 
         # if output is given, save it to h5 file
         if output_key:
-            io.save(output_key, output, file_name)
+            io.save(output_key, output, file_name, backend=backend)
+
+        elif incremental:
+            if not isinstance(backend, io.HDF5Backend):
+                raise ValueError('Incremental saving requires the hdf5 '
+                                 'backend.')
+            self._save_incremental(file_name, compression)
 
         # else save results and parameters to h5 file
         else:
-            io.save('results', self.results, file_name)
-            io.save('network_params', self.network_params, file_name)
-            io.save('analysis_params', self.analysis_params, file_name)
+            io.save('results', self.results, file_name, backend=backend)
+            io.save('network_params', self.network_params, file_name,
+                    backend=backend)
+            io.save('analysis_params', self.analysis_params, file_name,
+                    backend=backend)
+
+
+    def _save_incremental(self, file_name, compression):
+        """
+        Writes results and parameters changed since the last incremental save
+        to file_name.
+
+        For each file, the saved results are remembered by identity. Lists of
+        results of analysis keys, which only grow by appending, are extended
+        by their new items, unless items have been evicted in between.
+        """
+        path = os.path.abspath(file_name)
+        if not os.path.exists(path):
+            self._saved.pop(path, None)
+        saved = self._saved.setdefault(path, {})
+
+        changed = {}
+        start = {}
+        for key, value in self.results.items():
+            previous = saved.get(key)
+            if isinstance(value, list):
+                state = (value, len(value), value[0] if value else None,
+                         value[-1] if value else None)
+                if (previous is not None and previous[0] is value
+                        and 0 < previous[1] <= len(value)
+                        and value[0] is previous[2]
+                        and value[previous[1] - 1] is previous[3]):
+                    if previous[1] == len(value):
+                        continue
+                    start[key] = previous[1]
+            else:
+                state = (value,)
+                if previous is not None and previous[0] is value:
+                    continue
+            changed[key] = value
+            saved[key] = state
+        io.save_incremental('results', changed, file_name, start=start,
+                            compression=compression)
+
+        for params_key, params in [('network_params', self.network_params),
+                                   ('analysis_params', self.analysis_params)]:
+            params_state = cache.canonical_key(params)
+            if saved.get(params_key) != params_state:
+                io.save(params_key, params, file_name)
+                saved[params_key] = params_state
 
 
     def show(self):
@@ -371,6 +610,23 @@ class Network(object):
         return sorted(list(self.results.keys()))
 
 
+    def cache_info(self):
+        """
+        Returns statistics of the result cache.
+
+        Returns:
+        --------
+        dict
+            Number of hits, misses and evictions, number of stored results,
+            their memory in bytes and the byte budget. If results are stored
+            in a cache directory, its statistics are given under 'disk'.
+        """
+        info = self.result_cache.info()
+        if self.disk_cache is not None:
+            info['disk'] = self.disk_cache.info()
+        return info
+
+
     def change_parameters(self, changed_network_params={},
                           changed_analysis_params={}):
         """
@@ -386,33 +642,285 @@ class Network(object):
             New network with specified parameters.
         """
 
-        new_network_params = self.network_params
+        new_network_params = dict(self.network_params)
         new_network_params.update(changed_network_params)
-        new_analysis_params = self.analysis_params
+        new_analysis_params = {key: value
+                               for key, value in self.analysis_params.items()
+                               if key not in _ANALYSIS_KEYS}
         new_analysis_params.update(changed_analysis_params)
 
-        return Network(self.network_params_yaml, self.analysis_params_yaml,
-                       new_network_params, new_analysis_params)
+        network = Network(self.network_params_yaml, self.analysis_params_yaml,
+                          new_network_params, new_analysis_params,
+                          cache_size=self.result_cache.max_bytes,
+                          cache_dir=self.disk_cache)
+        network._carry_over_results(self)
+        return network
 
 
+    def _carry_over_results(self, network):
+        """
+        Takes over all results of network not affected by changed parameters.
+
+        Parameters of both networks are compared and all results depending on
+        changed parameters, directly or via other results as defined in
+        _result_dependencies, are invalidated. The remaining results are
+        stored in self.result_cache and self.results.
 
-    def extend_analysis_frequencies(self, f_min, f_max):
+        Parameters:
+        -----------
+        network: Network
+            Network whose results are carried over.
+        """
+        changed = set()
+        for old, new in [(network.network_params, self.network_params),
+                         (network.analysis_params, self.analysis_params)]:
+            for key in set(old) | set(new):
+                if key in _ANALYSIS_KEYS:
+                    continue
+                if (cache.canonical_key(old.get(key))
+                        != cache.canonical_key(new.get(key))):
+                    changed.add(key)
+
+        # results with unknown dependencies are always recalculated
+        invalid = {key[0] for key, value in network.result_cache.items()
+                   if key[0] not in self._result_dependencies}
+        for result_key, (params, results) in self._result_dependencies.items():
+            if changed & set(params):
+                invalid.add(result_key)
+        # propagate to dependent results until nothing changes
+        while True:
+            new_invalid = {result_key for result_key, (params, results)
+                           in self._result_dependencies.items()
+                           if invalid & set(results)} - invalid
+            if not new_invalid:
+                break
+            invalid |= new_invalid
+
+        for key, value in network.result_cache.items():
+            result_key, analysis_key, arguments = key
+            if result_key in invalid:
+                continue
+            self.result_cache.put(key, value)
+            if analysis_key:
+                self.results[result_key] = list(network.results[result_key])
+                self.analysis_params[analysis_key] = \
+                    network.analysis_params[analysis_key].copy()
+            else:
+                self.results[result_key] = network.results[result_key]
+
+    # network and analysis parameters and results each result depends on
+    _result_dependencies = {
+        'firing_rates': (['dimension', 'tau_m', 'tau_s', 'tau_r', 'V_0_rel',
+                          'V_th_rel', 'K', 'J', 'j', 'nu_ext', 'K_ext', 'g',
+                          'nu_e_ext', 'nu_i_ext'],
+                         []),
+        'mean_input': (['K', 'J', 'j', 'tau_m', 'nu_ext', 'K_ext', 'g',
+                        'nu_e_ext', 'nu_i_ext'],
+                       ['firing_rates']),
+        'std_input': (['K', 'J', 'j', 'tau_m', 'nu_ext', 'K_ext', 'g',
+                       'nu_e_ext', 'nu_i_ext'],
+                      ['firing_rates']),
+        'delay_dist': (['dimension', 'Delay', 'Delay_sd', 'delay_dist',
+                        'omegas'],
+                       []),
+        'delay_dist_single': (['dimension', 'Delay', 'Delay_sd',
+                               'delay_dist'],
+                              []),
+        'transfer_function': (['tau_m', 'tau_s', 'tau_r', 'V_th_rel',
+                               'V_0_rel', 'dimension', 'omegas'],
+                              ['mean_input', 'std_input']),
+        'transfer_function_single': (['tau_m', 'tau_s', 'tau_r', 'V_th_rel',
+                                      'V_0_rel', 'dimension'],
+                                     ['mean_input', 'std_input']),
+        'sensitivity_measure': (['tau_m', 'tau_s', 'tau_r', 'V_th_rel',
+                                 'V_0_rel', 'dimension', 'J', 'K'],
+                                ['mean_input', 'std_input',
+                                 'delay_dist_single']),
+        'power_spectra': (['tau_m', 'tau_s', 'dimension', 'J', 'K', 'N',
+                           'omegas'],
+                          ['delay_dist', 'firing_rates',
+                           'transfer_function']),
+        'eigen_decomposition': (['tau_m', 'tau_s', 'dimension', 'J', 'K',
+                                 'omegas'],
+                                ['transfer_function', 'delay_dist']),
+        'eigenvalue_spectra': ([], ['eigen_decomposition']),
+        'r_eigenvec_spectra': ([], ['eigen_decomposition']),
+        'l_eigenvec_spectra': ([], ['eigen_decomposition']),
+        }
+
+
+
+    def extend_analysis_frequencies(self, f_min, f_max, file_name=''):
         """
         Extend analysis frequencies and calculate all results for new ranges.
 
+        New omegas on the grid of analysis_params['df'] between f_min and
+        f_max, which are not analysed yet, are merged into
+        analysis_params['omegas'] in sorted order. All stored results which
+        depend on the analysis frequencies (transfer function, delay
+        distribution matrix, power spectra and eigen spectra) are only
+        calculated for the new omegas and merged into the existing results.
+        The new range has to overlap or adjoin the analysed range on its grid,
+        such that the extended omegas are the ones derived from the widened
+        f_min and f_max, otherwise a ValueError is raised.
+
         Paramters:
         ----------
         f_min: Quantity(float, 'Hz')
             Minimal frequency analysed.
         f_max: Quantity(float, 'Hz')
             Maximal frequency analysed.
+        file_name: str
+            If given, only the new slices of the results and omegas are
+            written into the datasets already saved in this h5 file.
         """
 
+        omegas = self.analysis_params['omegas']
+        units = omegas.units
+        old_omegas = omegas.magnitude
+        dw = (2 * np.pi * self.analysis_params['df']).to(units).magnitude
+
+        # the extended omegas are derived from the widened f_min and f_max,
+        # such that they stay the grid described by the analysis parameters
+        analysis_params = dict(self.analysis_params)
+        analysis_params['f_min'] = min(self.analysis_params['f_min'], f_min)
+        analysis_params['f_max'] = max(self.analysis_params['f_max'], f_max)
+        extended_omegas = self._calculate_dependent_analysis_parameters(
+            analysis_params)['omegas'].to(units).magnitude
+
+        # find omegas which are not analysed yet
+        new = np.ones(len(extended_omegas), dtype=bool)
+        if len(old_omegas):
+            sorted_omegas = np.sort(old_omegas)
+            pos = np.searchsorted(sorted_omegas, extended_omegas)
+            left = sorted_omegas[np.clip(pos - 1, 0, len(old_omegas) - 1)]
+            right = sorted_omegas[np.clip(pos, 0, len(old_omegas) - 1)]
+            distance = np.minimum(np.abs(extended_omegas - left),
+                                  np.abs(extended_omegas - right))
+            new = distance > 1e-6 * dw
+        candidates = extended_omegas[new]
+        w_min = (2 * np.pi * f_min).to(units).magnitude
+        w_max = (2 * np.pi * f_max).to(units).magnitude
+        if (len(extended_omegas) - len(candidates) != len(old_omegas)
+                or np.any((candidates < w_min - 1e-6 * dw)
+                          | (candidates >= w_max))):
+            raise ValueError('Frequencies between {} and {} are not adjacent '
+                             'to the analysed frequencies between {} and {} '
+                             'on their grid.'.format(
+                                 f_min, f_max, self.analysis_params['f_min'],
+                                 self.analysis_params['f_max']))
+
+        self.analysis_params['f_min'] = analysis_params['f_min']
+        self.analysis_params['f_max'] = analysis_params['f_max']
+        if not len(candidates):
+            return
+        new_omegas = candidates * units
+
+        # order of the merged omegas and positions of the new ones in it
+        order = np.argsort(np.concatenate([old_omegas, candidates]),
+                           kind='stable')
+        positions = np.empty_like(order)
+        positions[order] = np.arange(len(order))
+        positions = np.sort(positions[len(old_omegas):])
+
+        # calculate stored frequency dependent results for new omegas only,
+        # once for each combination of transfer function method and matrix
+        entries = [(key, value) for key, value in self.result_cache.items()
+                   if key[0] in self._frequency_results]
+        quantities = {}
+        for key, value in entries:
+            arguments = _key_arguments(key)
+            group = (arguments.get('method', 'shift'),
+                     arguments.get('matrix', 'MH'))
+            quantities.setdefault(group, set()).add(
+                self._frequency_results[key[0]])
+        blocks = {(method, matrix): self._spectra_block(new_omegas,
+                                                        quantities[(method,
+                                                                    matrix)],
+                                                        matrix, method)
+                  for (method, matrix) in quantities}
+
+        new_slices = {}
+        new_items = {}
+        for key, value in entries:
+            result_key, analysis_key, arguments = key
+            arguments = _key_arguments(key)
+            quantity = self._frequency_results[result_key]
+            new_value = blocks[(arguments.get('method', 'shift'),
+                                arguments.get('matrix', 'MH'))][quantity]
+            axis = self._spectra_frequency_axes.get(quantity, -1)
+            merged = _merge_frequencies(value, new_value, order, axis)
+
+            self.result_cache.put(key, merged)
+            if analysis_key:
+                results = self.results[result_key]
+                for index, result in enumerate(results):
+                    if result is value:
+                        results[index] = merged
+                new_items.setdefault(result_key, {})[id(merged)] = (new_value,
+                                                                    axis)
+            else:
+                self.results[result_key] = merged
+                new_slices[result_key] = (new_value, axis)
+
+        # lists of results of analysis keys are stored stacked along a
+        # leading axis, in the order of the list
+        for result_key, items in new_items.items():
+            slices = [items.get(id(result))
+                      for result in self.results[result_key]]
+            if any(item is None for item in slices):
+                continue
+            axis = slices[0][1]
+            new_slices[result_key] = (_stack_results([new_value for
+                                                      new_value, _ in slices]),
+                                      axis if axis < 0 else axis + 1)
+
+        self.analysis_params['omegas'] = extended_omegas * units
+
+        if file_name:
+            io.save_frequency_slices('results', new_slices, file_name,
+                                     positions)
+            io.save_frequency_slices('analysis_params',
+                                     {'omegas': (new_omegas, 0),
+                                      'f_min': (self.analysis_params['f_min'],
+                                                None),
+                                      'f_max': (self.analysis_params['f_max'],
+                                                None)},
+                                     file_name, positions)
+
+    # quantities of _spectra_block corresponding to the stored results which
+    # depend on the analysis frequencies
+    _frequency_results = {'transfer_function': 'transfer_function',
+                          'delay_dist': 'delay_dist_matrix',
+                          'power_spectra': 'power_spectra',
+                          'eigen_decomposition': 'eigen_decomposition',
+                          'eigenvalue_spectra': 'eigenvalue_spectra',
+                          'r_eigenvec_spectra': 'r_eigenvec_spectra',
+                          'l_eigenvec_spectra': 'l_eigenvec_spectra'}
+
+
+    @_check_and_store('firing_rates', ignore=('solver', 'maxiter', 'nu_init'))
+    def firing_rates(self, solver='relaxation', tol=1e-5, maxiter=1000,
+                     siegert_table=None, nu_init=None):
+        """
+        Calculates firing rates
 
-
-    @_check_and_store('firing_rates')
-    def firing_rates(self):
-        """ Calculates firing rates """
+        Parameters:
+        -----------
+        solver: str
+            Fixed-point iteration used ('relaxation', 'newton', 'anderson').
+        tol: float
+            Tolerance of the fixed-point iteration in Hz.
+        maxiter: int
+            Maximal number of iterations of 'newton' and 'anderson'.
+        siegert_table: aux_calcs.SiegertTable
+            Optional precomputed table replacing the exact Siegert formula.
+        nu_init: Quantity(np.ndarray, 'hertz')
+            Optional initial rates, e.g. the rates of a similar network.
+
+        The solver and its starting point do not change the fixed point, so
+        rates are stored independently of solver, maxiter and nu_init.
+        """
         return meanfield_calcs.firing_rates(self.network_params['dimension'],
                                             self.network_params['tau_m'],
                                             self.network_params['tau_s'],
@@ -426,7 +934,73 @@ class Network(object):
                                             self.network_params['K_ext'],
                                             self.network_params['g'],
                                             self.network_params['nu_e_ext'],
-                                            self.network_params['nu_i_ext'])
+                                            self.network_params['nu_i_ext'],
+                                            solver=solver, tol=tol,
+                                            maxiter=maxiter,
+                                            siegert_table=siegert_table,
+                                            nu_init=nu_init)
+
+
+    def firing_rates_continuation(self, param, stop, step=None, min_step=None,
+                                  max_step=None, tol=1e-9, maxiter=10,
+                                  max_points=1000, siegert_table=None):
+        """
+        Follows the firing rates while param is changed to stop.
+
+        Starting from the firing rates of this network, the self-consistent
+        rates are continued by pseudo-arclength continuation, see
+        meanfield_calcs.firing_rates_continuation. Dependent parameters, e.g.
+        J when changing g, are recalculated for each point of the path.
+
+        Parameters:
+        -----------
+        param: str
+            Name of a scalar network parameter, e.g. 'g' or 'nu_ext'.
+        stop: float or Quantity(float)
+            Final value of param.
+        step, min_step, max_step: float
+            Arclength steps, see meanfield_calcs.firing_rates_continuation.
+        tol: float
+            Maximal deviation from self-consistency of each point in Hz.
+        maxiter: int
+            Maximal number of Newton corrections per step.
+        max_points: int
+            Maximal number of points of the path.
+        siegert_table: aux_calcs.SiegertTable
+            Optional precomputed table replacing the exact Siegert formula.
+
+        Returns:
+        --------
+        fast.Continuation
+            Named tuple containing the values of param (lambdas), the
+            firing_rates, the largest real part of the eigenvalues of the
+            linearized rate dynamics (max_eigenvalues), the stability of each
+            point (stable) and the indices of folds of the path (folds).
+        """
+        start = self.network_params[param]
+        if np.ndim(start) != 0:
+            raise ValueError('{} is not a scalar parameter.'.format(param))
+        if param in self._calculate_dependent_network_parameters():
+            raise ValueError('{} is derived from other parameters and cannot '
+                             'be continued.'.format(param))
+
+        def get_network_params(value):
+            # only derive the parameters, building a Network for each
+            # evaluation would dominate the continuation
+            params = dict(self.network_params)
+            params[param] = value
+            params.update(self._calculate_dependent_network_parameters(params))
+            return tuple(params[key] for key in
+                         ('dimension', 'tau_m', 'tau_s', 'tau_r', 'V_0_rel',
+                          'V_th_rel', 'K', 'J', 'j', 'nu_ext', 'K_ext', 'g',
+                          'nu_e_ext', 'nu_i_ext'))
+
+        return meanfield_calcs.firing_rates_continuation(
+            get_network_params, start, stop,
+            nu_init=self.firing_rates(siegert_table=siegert_table),
+            step=step, min_step=min_step, max_step=max_step, tol=tol,
+            maxiter=maxiter, max_points=max_points,
+            siegert_table=siegert_table)
 
 
     @_check_and_store('mean_input')
@@ -552,6 +1126,8 @@ class Network(object):
         freq: Quantity(float, 'Hertz')
             Optional paramter. If given, transfer function is only calculated
             for this frequency.
+        method: str
+            Transfer function to use ('shift', 'taylor').
 
         Returns:
         --------
@@ -564,14 +1140,24 @@ class Network(object):
         if freq == None:
             return self.transfer_function_multi(method)
         else:
-            return self.transfer_function_single(freq)
+            return self.transfer_function_single(freq, method)
 
 
-    @_check_and_store('transfer_function')
-    def transfer_function_multi(self, method='shift'):
+    @_check_and_store('transfer_function', ignore=('workers', 'executor'))
+    def transfer_function_multi(self, method='shift', workers=1,
+                                executor=None):
         """
         Calculates transfer function for each population.
 
+        Parameters:
+        -----------
+        method: str
+            Transfer function to use ('shift', 'taylor').
+        workers: int
+            Number of processes evaluating the frequencies in parallel.
+        executor: concurrent.futures.Executor
+            Optional executor used instead of a new process pool.
+
         Returns:
         --------
         Quantity(np.ndarray, 'dimensionless'):
@@ -588,7 +1174,9 @@ class Network(object):
                                                  self.network_params['V_0_rel'],
                                                  self.network_params['dimension'],
                                                  self.analysis_params['omegas'],
-                                                 method=method)
+                                                 method=method,
+                                                 workers=workers,
+                                                 executor=executor)
 
         return transfer_functions
 
@@ -654,7 +1242,7 @@ class Network(object):
                                                               self.network_params['V_0_rel'],
                                                               self.network_params['dimension'],
                                                               [omega],
-                                                              method=method)
+                                                              method=method)[0]
         if omega.magnitude < 0:
             transfer_function = np.conjugate(transfer_function)
 
@@ -690,6 +1278,36 @@ class Network(object):
 
 
 
+    @_check_and_store('eigen_decomposition', 'eigen_decomposition_matrix')
+    def eigen_decomposition(self, matrix, method='shift'):
+        """
+        Calculates eigenvalues and eigenvecs of specified matrix at all freqs.
+
+        The result is shared by eigenvalue_spectra, r_eigenvec_spectra and
+        l_eigenvec_spectra, such that each matrix is only decomposed once.
+
+        Paramters:
+        ----------
+        matrix: str
+            Specifying matrix which is analysed. Options are the effective
+            connectivity matrix ('MH'), the propagator ('prop') and
+            the inverse of the propagator ('prop_inv').
+
+        Returns:
+        --------
+        EigenDecomposition
+            Named tuple with fields eigvals, reigvecs and leigvecs.
+        """
+        return meanfield_calcs.eigen_decomposition(self.network_params['tau_m'],
+                                                   self.network_params['tau_s'],
+                                                   self.transfer_function(method=method),
+                                                   self.network_params['dimension'],
+                                                   self.delay_dist_matrix(),
+                                                   self.network_params['J'],
+                                                   self.network_params['K'],
+                                                   self.analysis_params['omegas'],
+                                                   matrix)
+
     @_check_and_store('eigenvalue_spectra', 'eigenvalue_matrix')
     def eigenvalue_spectra(self, matrix, method='shift'):
         """
@@ -704,20 +1322,10 @@ class Network(object):
 
         Returns:
         --------
-        Quantity(np.ndarray, 'dimensionless')
+        np.ndarray
             Eigenvalues.
         """
-
-        return  meanfield_calcs.eigen_spectra(self.network_params['tau_m'],
-                                              self.network_params['tau_s'],
-                                              self.transfer_function(method=method),
-                                              self.network_params['dimension'],
-                                              self.delay_dist_matrix(),
-                                              self.network_params['J'],
-                                              self.network_params['K'],
-                                              self.analysis_params['omegas'],
-                                              'eigvals',
-                                              matrix)
+        return self.eigen_decomposition(matrix, method=method).eigvals
 
     @_check_and_store('r_eigenvec_spectra', 'r_eigenvec_matrix')
     def r_eigenvec_spectra(self, matrix):
@@ -733,21 +1341,10 @@ class Network(object):
 
         Returns:
         --------
-        Quantity(np.ndarray, 'dimensionless')
+        np.ndarray
             Right eigenvectors.
         """
-        return  meanfield_calcs.eigen_spectra(self.network_params['tau_m'],
-                                                   self.network_params['tau_s'],
-                                                   self.transfer_function(),
-                                                   self.network_params['dimension'],
-                                                   self.delay_dist_matrix(),
-                                                   self.network_params['J'],
-                                                   self.network_params['K'],
-                                                   self.analysis_params['omegas'],
-                                                   'reigvecs',
-                                                   matrix)
-
-
+        return self.eigen_decomposition(matrix).reigvecs
 
     @_check_and_store('l_eigenvec_spectra', 'l_eigenvec_matrix')
     def l_eigenvec_spectra(self, matrix):
@@ -763,19 +1360,174 @@ class Network(object):
 
         Returns:
         --------
-        Quantity(np.ndarray, 'dimensionless')
+        np.ndarray
             Left eigenvectors.
         """
-        return  meanfield_calcs.eigen_spectra(self.network_params['tau_m'],
-                                                   self.network_params['tau_s'],
-                                                   self.transfer_function(),
-                                                   self.network_params['dimension'],
-                                                   self.delay_dist_matrix(),
-                                                   self.network_params['J'],
-                                                   self.network_params['K'],
-                                                   self.analysis_params['omegas'],
-                                                   'leigvecs',
-                                                   matrix)
+        return self.eigen_decomposition(matrix).leigvecs
+
+
+    def iter_spectra(self, block=100, quantities=['power_spectra'],
+                     matrix='MH', method='shift', file_name='',
+                     output_key='spectra'):
+        """
+        Calculates spectra block by block along the analysis frequencies.
+
+        For each block of omegas the transfer function, the delay
+        distribution matrix and the requested quantities are calculated and
+        yielded, such that peak memory scales with the block size instead of
+        the number of analysed frequencies. Results are not stored in
+        self.results. Concatenating the yielded blocks along the frequency
+        axis gives the results of the corresponding methods.
+
+        Parameters:
+        -----------
+        block: int
+            Number of frequencies per block.
+        quantities: list
+            Quantities calculated for each block. Options are
+            'transfer_function', 'delay_dist_matrix', 'power_spectra',
+            'eigenvalue_spectra', 'r_eigenvec_spectra' and
+            'l_eigenvec_spectra'.
+        matrix: str
+            Specifying matrix which is analysed by the eigen spectra. Options
+            are the effective connectivity matrix ('MH'), the propagator
+            ('prop') and the inverse of the propagator ('prop_inv').
+        method: str
+            Transfer function to use ('shift', 'taylor').
+        file_name: str
+            If given, each block is written to the corresponding slices of
+            h5 datasets stored under output_key in this file.
+        output_key: str
+            Group under which the blocks are stored in the h5 file.
+
+        Yields:
+        -------
+        dict
+            Dictionary containing the omegas of the block and the requested
+            quantities for these omegas.
+        """
+
+        unknown = set(quantities) - set(self._spectra_frequency_axes)
+        if unknown:
+            raise ValueError('Quantities {} not implemented!'.format(
+                sorted(unknown)))
+        if block < 1:
+            raise ValueError('block must be a positive integer.')
+
+        omegas = self.analysis_params['omegas']
+        n_omegas = len(omegas)
+        shapes = {}
+
+        for start in range(0, n_omegas, block):
+            omegas_block = omegas[start:start + block]
+            spectra = self._spectra_block(omegas_block, quantities, matrix,
+                                          method)
+
+            if file_name:
+                selections = {}
+                for key, value in spectra.items():
+                    axis = self._spectra_frequency_axes[key] % np.ndim(value)
+                    if start == 0:
+                        shape = list(np.shape(value))
+                        shape[axis] = n_omegas
+                        shapes[key] = tuple(shape)
+                    selection = [slice(None)] * np.ndim(value)
+                    selection[axis] = slice(start, start + len(omegas_block))
+                    selections[key] = tuple(selection)
+                io.save_block(output_key, spectra, file_name, selections,
+                              shapes, overwrite=(start == 0))
+
+            yield spectra
+
+    # frequency axis of the outputs of iter_spectra
+    _spectra_frequency_axes = {'omegas': 0,
+                               'transfer_function': 0,
+                               'delay_dist_matrix': 0,
+                               'power_spectra': -1,
+                               'eigenvalue_spectra': -1,
+                               'r_eigenvec_spectra': -1,
+                               'l_eigenvec_spectra': -1}
+
+
+    def _spectra_block(self, omegas, quantities, matrix='MH',
+                       method='shift'):
+        """
+        Calculates the requested spectra for the given omegas only.
+
+        Parameters:
+        -----------
+        omegas: Quantity(np.ndarray, 'hertz')
+            Angular frequencies at which the quantities are calculated.
+        quantities: list
+            Quantities to be calculated, see iter_spectra. Additionally,
+            'eigen_decomposition' is available.
+        matrix: str
+            Specifying matrix which is analysed by the eigen spectra.
+        method: str
+            Transfer function to use ('shift', 'taylor').
+
+        Returns:
+        --------
+        dict
+            Dictionary containing omegas and the requested quantities.
+        """
+        eigen_keys = {'eigenvalue_spectra': 'eigvals',
+                      'r_eigenvec_spectra': 'reigvecs',
+                      'l_eigenvec_spectra': 'leigvecs'}
+
+        transfer_function = meanfield_calcs.transfer_function(
+            self.mean_input(),
+            self.std_input(),
+            self.network_params['tau_m'],
+            self.network_params['tau_s'],
+            self.network_params['tau_r'],
+            self.network_params['V_th_rel'],
+            self.network_params['V_0_rel'],
+            self.network_params['dimension'],
+            omegas,
+            method=method)
+        delay_dist_matrix = meanfield_calcs.delay_dist_matrix(
+            self.network_params['dimension'],
+            self.network_params['Delay'],
+            self.network_params['Delay_sd'],
+            self.network_params['delay_dist'],
+            omegas)
+
+        spectra = {'omegas': omegas}
+        if 'transfer_function' in quantities:
+            spectra['transfer_function'] = transfer_function
+        if 'delay_dist_matrix' in quantities:
+            spectra['delay_dist_matrix'] = delay_dist_matrix
+        if 'power_spectra' in quantities:
+            spectra['power_spectra'] = meanfield_calcs.power_spectra(
+                self.network_params['tau_m'],
+                self.network_params['tau_s'],
+                self.network_params['dimension'],
+                self.network_params['J'],
+                self.network_params['K'],
+                delay_dist_matrix,
+                self.network_params['N'],
+                self.firing_rates(),
+                transfer_function,
+                omegas)
+        if any(key in quantities
+               for key in ['eigen_decomposition'] + list(eigen_keys)):
+            decomposition = meanfield_calcs.eigen_decomposition(
+                self.network_params['tau_m'],
+                self.network_params['tau_s'],
+                transfer_function,
+                self.network_params['dimension'],
+                delay_dist_matrix,
+                self.network_params['J'],
+                self.network_params['K'],
+                omegas,
+                matrix)
+            if 'eigen_decomposition' in quantities:
+                spectra['eigen_decomposition'] = decomposition
+            for key, field in eigen_keys.items():
+                if key in quantities:
+                    spectra[key] = getattr(decomposition, field)
+        return spectra
 
 
     def additional_rates_for_fixed_input(self, mean_input_set, std_input_set):
@@ -0,0 +1,307 @@
+"""
+Parameter sweeps over grids of network parameters.
+
+Points of the grid are visited in an order in which consecutive points are
+neighbours in the grid, such that the self-consistent rates of each point
+can be used as initial rates of the next one. Chunks of consecutive points
+are calculated in parallel by a process pool and written to an indexed h5
+file, from which interrupted sweeps are resumed.
+
+Functions:
+----------
+sweep
+_equal_values
+_snake_order
+_has_done_neighbour
+_neighbour_rates
+_network_spec
+_sweep_chunk
+"""
+
+from __future__ import print_function
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+
+from . import ureg
+from . import input_output as io
+from .network import Network, _ANALYSIS_KEYS
+
+# parameters determining the number of populations, frequencies or
+# wavenumbers, which change the shapes of the outputs
+_SHAPE_PARAMS = ('populations', 'f_min', 'f_max', 'df', 'k_min', 'k_max',
+                 'dk')
+
+
+def sweep(network, grid, outputs=['firing_rates'], workers=1, file_name='',
+          chunk_size=None, solver='relaxation', executor=None):
+    """
+    Calculate outputs of network for all combinations of swept parameters.
+
+    Parameters:
+    -----------
+    network: Network
+        Network whose parameters are swept.
+    grid: dict
+        Dictionary of format {'<param>': <values>}, specifying the values of
+        each swept network or analysis parameter. All combinations of the
+        values are calculated. Values can be quantities or arrays, whose
+        first axis runs over the swept values. Parameters derived from other
+        parameters, like J or omegas, and parameters changing the shapes of
+        the outputs, like populations, f_min, f_max or df, cannot be swept.
+    outputs: list
+        Names of Network methods called without arguments for each point,
+        e.g. 'firing_rates', 'mean_input', 'transfer_function' or
+        'power_spectra'. The firing rates are always stored.
+    workers: int
+        Number of processes calculating chunks of points in parallel. The
+        first chunk of each process starts from zero rates, all further
+        chunks start from the rates of a calculated neighbouring point.
+    file_name: str
+        If given, results are written to this h5 file as soon as a chunk is
+        finished. If the file already contains results of the same grid, the
+        points already calculated are skipped.
+    chunk_size: int
+        Number of consecutive points calculated by one process. By default,
+        the points are split into 4 chunks per worker.
+    solver: str
+        Fixed-point iteration used for the firing rates, see
+        Network.firing_rates.
+    executor: concurrent.futures.Executor
+        Optional executor used instead of a new process pool.
+
+    Returns:
+    --------
+    dict
+        Dictionary containing the outputs with the grid axes leading. Points
+        which have not been calculated contain nan.
+    """
+    grid = OrderedDict(grid)
+    derived = (set(network._calculate_dependent_network_parameters())
+               | set(network._calculate_dependent_analysis_parameters()))
+    for name in grid:
+        if (name not in network.network_params
+                and name not in network.analysis_params):
+            raise ValueError('Unknown parameter: {}'.format(name))
+        if name in derived:
+            raise ValueError('{} is derived from other parameters and cannot '
+                             'be swept.'.format(name))
+        if name in _SHAPE_PARAMS:
+            raise ValueError('{} changes the shapes of the outputs and cannot '
+                             'be swept.'.format(name))
+    shape = tuple(len(values) for values in grid.values())
+    outputs = ['firing_rates'] + [output for output in outputs
+                                  if output != 'firing_rates']
+
+    results = {}
+    done = np.zeros(shape, dtype=bool)
+    if file_name and os.path.exists(file_name):
+        stored_grid, results, done = io.load_sweep(file_name)
+        if (list(stored_grid) != list(grid)
+                or any(not _equal_values(stored_grid[name], grid[name])
+                       for name in grid)):
+            raise ValueError('{} contains a different sweep.'.format(
+                file_name))
+
+    todo = [index for index in _snake_order(shape) if not done[index]]
+    if not todo:
+        return results
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(todo) // (4 * max(workers, 1))))
+    chunks = [todo[start:start + chunk_size]
+              for start in range(0, len(todo), chunk_size)]
+
+    def points(chunk):
+        """ Returns changed parameters of each point of chunk. """
+        return [(index, io.quantities_to_val_unit(
+                    {name: values[i] for (name, values), i
+                     in zip(grid.items(), index)}))
+                for index in chunk]
+
+    def store(chunk_results):
+        """ Collect results of finished chunk and write them to file. """
+        for index, output in chunk_results:
+            for name, value in io.val_unit_to_quantities(output).items():
+                if name not in results:
+                    magnitude = np.asarray(getattr(value, 'magnitude', value))
+                    empty = np.full(shape + magnitude.shape, np.nan,
+                                    dtype=np.result_type(magnitude, float))
+                    results[name] = (empty * value.units
+                                     if isinstance(value, ureg.Quantity)
+                                     else empty)
+                results[name][index] = value
+            done[index] = True
+        if file_name:
+            io.save_sweep(file_name, grid,
+                          [(index, io.val_unit_to_quantities(output))
+                           for index, output in chunk_results])
+
+    if executor is None and workers <= 1:
+        for chunk in chunks:
+            seed = _neighbour_rates(chunk[0], done, results)
+            store(_sweep_chunk(network, points(chunk), outputs, seed, solver))
+        return results
+
+    spec = _network_spec(network)
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    # the first chunks are spread over the grid, further chunks are submitted
+    # when a chunk is finished, starting next to a calculated point
+    n_first = min(max(workers, 1), len(chunks))
+    first = sorted({i * len(chunks) // n_first for i in range(n_first)})
+    pending = [chunk for i, chunk in enumerate(chunks) if i not in first]
+    running = set()
+
+    def submit(chunk):
+        seed = _neighbour_rates(chunk[0], done, results)
+        if seed is None:
+            seed = _neighbour_rates(chunk[-1], done, results)
+            if seed is not None:
+                chunk = chunk[::-1]
+        running.add(pool.submit(_sweep_chunk, spec, points(chunk), outputs,
+                                seed, solver))
+
+    try:
+        for i in first:
+            submit(chunks[i])
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                running.remove(future)
+                store(future.result())
+            while pending and len(running) < n_first:
+                index = next((i for i, chunk in enumerate(pending)
+                              if _has_done_neighbour(chunk[0], done)
+                              or _has_done_neighbour(chunk[-1], done)), None)
+                if index is None:
+                    if running:
+                        # wait for a neighbour instead of starting cold
+                        break
+                    index = 0
+                submit(pending.pop(index))
+    finally:
+        if executor is None:
+            pool.shutdown()
+    return results
+
+
+def _equal_values(a, b):
+    """ Whether swept values a and b, quantities or arrays, are equal. """
+    if isinstance(a, ureg.Quantity) != isinstance(b, ureg.Quantity):
+        return False
+    if isinstance(a, ureg.Quantity):
+        if a.dimensionality != b.dimensionality:
+            return False
+        a, b = a.magnitude, b.to(a.units).magnitude
+    return np.shape(a) == np.shape(b) and np.allclose(a, b, rtol=1e-12,
+                                                      atol=0)
+
+
+def _snake_order(shape):
+    """
+    Returns all indices of grid with given shape, ordered such that
+    consecutive indices differ by one in a single axis.
+    """
+    if not shape:
+        return [()]
+    order = []
+    inner = _snake_order(shape[1:])
+    for i in range(shape[0]):
+        order += [(i,) + index for index in (inner if i % 2 == 0
+                                             else inner[::-1])]
+    return order
+
+
+def _has_done_neighbour(index, done):
+    """ Whether a neighbour of the point at index is calculated. """
+    for axis in range(len(index)):
+        for step in (-1, 1):
+            neighbour = list(index)
+            neighbour[axis] += step
+            if 0 <= neighbour[axis] < done.shape[axis] and done[tuple(
+                    neighbour)]:
+                return True
+    return False
+
+
+def _neighbour_rates(index, done, results):
+    """
+    Returns rates in Hz of an already calculated neighbour of the point at
+    index, or None.
+    """
+    if 'firing_rates' not in results:
+        return None
+    for axis in range(len(index)):
+        for step in (-1, 1):
+            neighbour = list(index)
+            neighbour[axis] += step
+            neighbour = tuple(neighbour)
+            if 0 <= neighbour[axis] < done.shape[axis] and done[neighbour]:
+                return np.asarray(results['firing_rates'][neighbour]
+                                  .to(ureg.Hz).magnitude)
+    return None
+
+
+def _network_spec(network):
+    """
+    Returns picklable specification of network, which _sweep_chunk turns
+    into a Network again.
+    """
+    analysis_params = {key: value
+                       for key, value in network.analysis_params.items()
+                       if key not in _ANALYSIS_KEYS}
+    disk_cache = network.disk_cache
+    return (network.network_params_yaml, network.analysis_params_yaml,
+            io.quantities_to_val_unit(network.network_params),
+            io.quantities_to_val_unit(analysis_params),
+            None if disk_cache is None else (disk_cache.directory,
+                                             disk_cache.max_bytes))
+
+
+def _sweep_chunk(network, points, outputs, seed, solver):
+    """
+    Calculate outputs for consecutive points of a sweep.
+
+    The rates of each point are used as initial rates of the next one.
+
+    Parameters:
+    -----------
+    network: Network or tuple
+        Network whose parameters are swept, or its _network_spec.
+    points: list
+        List of (index, changed parameters as val unit dictionary).
+    outputs: list
+        Names of Network methods calculated for each point.
+    seed: np.ndarray
+        Initial rates in Hz of the first point, or None.
+    solver: str
+        Fixed-point iteration used for the firing rates.
+
+    Returns:
+    --------
+    list
+        List of (index, outputs as val unit dictionary).
+    """
+    if not isinstance(network, Network):
+        (yaml_network, yaml_analysis, network_params, analysis_params,
+         disk_cache) = network
+        cache_dir, cache_dir_size = disk_cache or (None, None)
+        network = Network(yaml_network, yaml_analysis,
+                          io.val_unit_to_quantities(network_params),
+                          io.val_unit_to_quantities(analysis_params),
+                          cache_dir=cache_dir, cache_dir_size=cache_dir_size)
+
+    results = []
+    nu = None if seed is None else seed * ureg.Hz
+    for index, changed in points:
+        changed = io.val_unit_to_quantities(changed)
+        changed_network_params = {key: value for key, value in changed.items()
+                                  if key in network.network_params}
+        changed_analysis_params = {key: value for key, value in changed.items()
+                                   if key not in network.network_params}
+        point = network.change_parameters(changed_network_params,
+                                          changed_analysis_params)
+        nu = point.firing_rates(solver=solver, nu_init=nu)
+        output = {name: getattr(point, name)() for name in outputs}
+        results.append((index, io.quantities_to_val_unit(output)))
+    return results
@@ -0,0 +1,37 @@
+import mpmath
+import numpy as np
+import pytest
+
+from lif_meanfield_tools import aux_calcs
+
+# Psi(z + n, x) is evaluated for z = -1/2 + i omega tau_m, n = 0, 1, 2 and
+# x = sqrt(2) (V - mu) / sigma at threshold and reset
+RE_A = [-0.5, 0.5, 1.5]
+IM_A = [-300., -10., 0.5, 1., 10., 100., 300.]
+X = np.linspace(-20., 20., 9)
+
+
+def mpmath_pcfu(a, x):
+    return np.array([complex(mpmath.pcfu(a_i, x_i))
+                     for a_i, x_i in zip(a.ravel(), x.ravel())]
+                    ).reshape(a.shape)
+
+
+@pytest.mark.parametrize('re_a', RE_A)
+def test_pcfu_matches_mpmath(re_a):
+    a, x = np.meshgrid(re_a + 1j * np.array(IM_A), X)
+    assert np.allclose(aux_calcs.pcfu(a, x), mpmath_pcfu(a, x), rtol=1e-10,
+                       atol=0)
+
+
+def test_pcfu_beyond_asymptotic_start_points_matches_mpmath():
+    a = np.array([-0.5 + 1111j, 0.5 - 1200j])
+    x = np.array([12., 20.])
+    assert np.allclose(aux_calcs.pcfu(a, x), mpmath_pcfu(a, x), rtol=1e-10,
+                       atol=0)
+
+
+def test_Psi_matches_mpmath():
+    z, x = np.meshgrid(-0.5 + 1j * np.array(IM_A), X)
+    expected = np.exp(x**2 / 4) * mpmath_pcfu(z, -x)
+    assert np.allclose(aux_calcs.Psi(z, x), expected, rtol=1e-10, atol=0)
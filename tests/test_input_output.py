@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pytest
+
+import lif_meanfield_tools as lmt
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+@pytest.fixture(scope='module')
+def network():
+    network = lmt.Network(
+        os.path.join(EXAMPLES, 'network_params_microcircuit.yaml'),
+        os.path.join(EXAMPLES, 'analysis_params.yaml'))
+    network.eigenvalue_spectra('MH')
+    network.r_eigenvec_spectra('MH')
+    network.eigenvalue_spectra('prop')
+    return network
+
+
+def check_eigen_results(network, results):
+    """ Compare stored eigen results to the results of network. """
+    for key in ['eigenvalue_spectra', 'r_eigenvec_spectra']:
+        assert np.array_equal(np.asarray(results[key]),
+                              np.stack(network.results[key]))
+    decompositions = network.results['eigen_decomposition']
+    for i, field in enumerate(decompositions[0]._fields):
+        assert np.array_equal(
+            np.asarray(results['eigen_decomposition'][field]),
+            np.stack([decomposition[i] for decomposition in decompositions]))
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_npy_backend_round_trip_of_eigen_results(network, tmp_path, lazy):
+    file_name = str(tmp_path / 'output')
+    network.save(file_name=file_name, backend='npy')
+    output = lmt.input_output.load(file_name, lazy=lazy)
+    check_eigen_results(network, output['results'])
+    assert list(output['analysis_params']['eigen_decomposition_matrix']) \
+        == ['MH', 'prop']
+
+
+def test_hdf5_output_contains_eigen_decomposition(network):
+    # HDF5Backend writes the output of quantities_to_val_unit with h5py_wrapper
+    converted = lmt.input_output.quantities_to_val_unit(network.results)
+    check_eigen_results(network, converted)
+    decomposition = lmt.input_output.quantities_to_val_unit(
+        {'decomposition': network.results['eigen_decomposition'][0]})
+    assert set(decomposition['decomposition']) == {'eigvals', 'reigvecs',
+                                                   'leigvecs'}
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pytest
+
+import lif_meanfield_tools as lmt
+
+ureg = lmt.ureg
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+@pytest.fixture
+def network():
+    return lmt.Network(
+        os.path.join(EXAMPLES, 'network_params_microcircuit.yaml'),
+        os.path.join(EXAMPLES, 'analysis_params.yaml'))
+
+
+def test_transfer_function_of_single_frequency_uses_method(network):
+    freq = 10 * ureg.Hz
+    shift = network.transfer_function(freq)
+    taylor = network.transfer_function(freq, method='taylor')
+    assert not np.allclose(shift, taylor)
+    single = network.transfer_function_single(freq, method='taylor')
+    assert np.array_equal(taylor.magnitude, single.to(taylor.units).magnitude)
+
+
+def test_analysis_params_of_analysis_keys_are_arrays(network):
+    network.transfer_function(10 * ureg.Hz)
+    network.transfer_function(0.02 * ureg.kHz)
+    network.eigenvalue_spectra('MH')
+    freqs = network.analysis_params['transfer_freqs']
+    assert isinstance(freqs, ureg.Quantity)
+    assert np.allclose(freqs.to(ureg.Hz).magnitude, [10, 20])
+    assert list(network.analysis_params['eigenvalue_matrix']) == ['MH']
+
+    changed = network.change_parameters()
+    assert isinstance(changed.analysis_params['eigenvalue_matrix'],
+                      np.ndarray)
+
+
+def test_evicted_results_are_removed_from_analysis_params():
+    network = lmt.Network(
+        os.path.join(EXAMPLES, 'network_params_microcircuit.yaml'),
+        os.path.join(EXAMPLES, 'analysis_params.yaml'), cache_size=10**6)
+    for freq in [10, 20, 30]:
+        network.sensitivity_measure(freq * ureg.Hz)
+    freqs = network.analysis_params['sensitivity_freqs']
+    assert isinstance(freqs, ureg.Quantity)
+    assert len(freqs) == len(network.results['sensitivity_measure'])
+
+
+def test_extend_analysis_frequencies_keeps_derived_grid():
+    network = lmt.Network(
+        os.path.join(EXAMPLES, 'network_params_microcircuit.yaml'),
+        os.path.join(EXAMPLES, 'analysis_params.yaml'),
+        new_analysis_params={'f_min': 1. * ureg.Hz, 'f_max': 10. * ureg.Hz,
+                             'df': 1. * ureg.Hz})
+    network.transfer_function()
+    network.power_spectra()
+    with pytest.raises(ValueError):
+        network.extend_analysis_frequencies(40 * ureg.Hz, 50 * ureg.Hz)
+    assert network.analysis_params['f_max'] == 10. * ureg.Hz
+
+    network.extend_analysis_frequencies(5 * ureg.Hz, 20 * ureg.Hz)
+    assert len(network.analysis_params['omegas']) == 19
+    changed = network.change_parameters(
+        {'N': 2 * network.network_params['N']})
+    assert 'transfer_function' in changed.results
+    assert 'power_spectra' not in changed.results
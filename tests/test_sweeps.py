@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+import lif_meanfield_tools as lmt
+
+ureg = lmt.ureg
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), '..', 'examples')
+
+
+@pytest.fixture
+def network():
+    return lmt.Network(
+        os.path.join(EXAMPLES, 'network_params_microcircuit.yaml'),
+        os.path.join(EXAMPLES, 'analysis_params.yaml'))
+
+
+@pytest.mark.parametrize('grid', [{'J': [1., 2.] * ureg.mV},
+                                  {'f_max': [5., 10.] * ureg.Hz},
+                                  {'df': [0.1, 0.2] * ureg.Hz}])
+def test_sweep_rejects_parameters_before_calculating(network, grid,
+                                                     monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError('chunk calculated')
+    monkeypatch.setattr(lmt.sweeps, '_sweep_chunk', fail)
+    with pytest.raises(ValueError):
+        lmt.sweep(network, grid, outputs=['transfer_function'])